@@ -1,6 +1,8 @@
 import uvicorn
 import re
-from typing import Optional
+import threading
+from datetime import datetime
+from typing import List, Optional
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -10,6 +12,11 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from main import OptimizedTripPlannerCrew
 from utils.cache_manager import cache
+from utils.budget_analyzer import BudgetAnalyzer
+from utils.http_client import http_client
+from utils.upstream_guard import upstreams
+from tools.booking_tools import flexible_dates, preload_destination_ids, search_flights, search_hotels
+from utils.price_calendar import price_calendar
 
 # =====================================================
 # FASTAPI APP SETUP
@@ -62,6 +69,7 @@ class TripRequest(BaseModel):
     conversation_id: Optional[str] = Field(None, max_length=100)
     ask_if_missing: bool = Field(default=True, description="Whether to ask for missing info or auto-fill")
     additional_answers: Optional[dict] = Field(default=None, description="Answers to previously asked questions")
+    flexible_dates: bool = Field(default=False, description="Also suggest cheaper departure dates nearby")
     
     # Updated to Pydantic V2 style validator
     @field_validator('query')
@@ -82,6 +90,32 @@ class TripRequest(BaseModel):
         
         return v.strip()
 
+class BudgetMatrixRequest(BaseModel):
+    budgets: List[float] = Field(..., min_length=1, max_length=200, description="Total budgets in USD (matrix rows)")
+    durations: List[int] = Field(default_factory=lambda: list(range(1, 22)), min_length=1, max_length=60, description="Trip lengths in days (matrix columns)")
+    flight_cost: float = Field(default=0, ge=0)
+    hotel_per_night: float = Field(default=0, ge=0)
+    activities_per_day: float = Field(default=0, ge=0)
+
+class PriceCalendarRequest(BaseModel):
+    destination: str = Field(..., min_length=2, max_length=100)
+    origin: Optional[str] = Field(None, max_length=100)
+    start_date: str = Field(..., description="Center of the date window (YYYY-MM-DD)")
+    end_date: Optional[str] = Field(None, description="Return / check-out date; trip length is kept fixed")
+    travelers: int = Field(default=1, ge=1, le=9)
+    days: int = Field(default=3, ge=0, le=7, description="Search +-days around start_date")
+
+    @field_validator('start_date', 'end_date')
+    @classmethod
+    def valid_date(cls, v):
+        """Reject malformed dates with a 422 instead of failing in the date sweep"""
+        if v is not None:
+            try:
+                datetime.strptime(v, "%Y-%m-%d")
+            except ValueError:
+                raise ValueError("Dates must be valid YYYY-MM-DD")
+        return v
+
 # =====================================================
 # GLOBAL CREW INSTANCE
 # =====================================================
@@ -101,13 +135,32 @@ def get_crew():
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
-    cache_stats = cache.get_stats()
+    cache_stats = cache.get_stats(top_n=0)  # hot keys are on /api/cache/stats
+    upstream_stats = upstreams.get_stats()
+    degraded = [name for name, stats in upstream_stats.items() if stats["state"] != "closed"]
     return {
-        "status": "active",
+        "status": "degraded" if degraded else "active",
         "service": "VoyageAI API v2.0",
-        "cache_stats": cache_stats
+        "cache_stats": cache_stats,
+        "http_stats": http_client.get_stats(),
+        "upstreams": upstream_stats
     }
 
+@app.on_event("startup")
+async def warm_destination_ids():
+    """Resolve popular Booking.com destination IDs in the background"""
+    threading.Thread(target=preload_destination_ids, name="dest-id-preload", daemon=True).start()
+
+@app.on_event("shutdown")
+def close_http_client():
+    """Release pooled upstream connections"""
+    http_client.session.close()
+
+@app.on_event("shutdown")
+def flush_disk_cache():
+    """Commit queued writes to the on-disk cache tier"""
+    cache.close()
+
 @app.post("/api/plan-trip")
 @limiter.limit("50/minute")
 async def generate_itinerary(request: Request, trip_request: TripRequest):
@@ -121,8 +174,6 @@ async def generate_itinerary(request: Request, trip_request: TripRequest):
     query_id = str(uuid.uuid4())[:8]
     request_time = datetime.now().isoformat()
     
-    cache.clear()
-    cache.cleanup_expired()
     print(f"\n📥 Received request [{query_id}]: {trip_request.query}")
     print(f"⏱️  Request Time: {request_time}")
     
@@ -134,7 +185,8 @@ async def generate_itinerary(request: Request, trip_request: TripRequest):
         result = await crew.run_async(
             trip_request.query, 
             ask_if_missing=trip_request.ask_if_missing,
-            additional_answers=trip_request.additional_answers
+            additional_answers=trip_request.additional_answers,
+            flexible=trip_request.flexible_dates
         )
         
         # Check if we need more information
@@ -205,6 +257,34 @@ async def websocket_itinerary(websocket: WebSocket):
     finally:
         await websocket.close()
 
+@app.post("/api/budget/matrix")
+def budget_matrix(matrix_request: BudgetMatrixRequest):
+    """Budget tier what-if grid (budgets x durations) computed in one vectorized pass"""
+    if any(d < 0 for d in matrix_request.durations) or any(b < 0 for b in matrix_request.budgets):
+        raise HTTPException(status_code=400, detail="Budgets and durations must be non-negative")
+    
+    return BudgetAnalyzer.budget_matrix(
+        budgets=matrix_request.budgets,
+        durations=matrix_request.durations,
+        flight_cost=matrix_request.flight_cost,
+        hotel_per_night=matrix_request.hotel_per_night,
+        activities_per_day=matrix_request.activities_per_day
+    )
+
+@app.post("/api/price-calendar")
+def flexible_date_prices(calendar_request: PriceCalendarRequest):
+    """Flight and hotel prices +-N days around the start date, served from the route x date matrix"""
+    query = calendar_request.model_dump()
+    days = query.pop("days")
+    # Sweeps both calendars concurrently; the per-source views below are then matrix hits
+    cheapest_dates = flexible_dates(query, days)
+    return {
+        "cheapest_dates": cheapest_dates,
+        "flights": search_flights.price_calendar(query, days),
+        "hotels": search_hotels.price_calendar(query, days),
+        "calendar_stats": price_calendar.get_stats()
+    }
+
 # =====================================================
 # ADMIN CACHE ENDPOINTS
 # =====================================================
@@ -213,9 +293,23 @@ def clear_cache():
     cache.clear()
     return {"status": "Cache cleared"}
 
+@app.post("/api/cache/clear/{namespace}")
+def purge_cache_namespace(namespace: str):
+    """Drop one namespace (e.g. "weather" or "flights") and leave the rest warm"""
+    removed = cache.purge_namespace(namespace)
+    return {"status": f"Namespace '{namespace}' purged", "removed": removed}
+
 @app.get("/api/cache/stats")
-def get_cache_stats():
-    return cache.get_stats()
+def get_cache_stats(top_n: int = 5):
+    return cache.get_stats(top_n=max(0, min(top_n, 100)))
+
+@app.get("/api/cache/stats/{namespace}")
+def get_cache_namespace_stats(namespace: str, top_n: int = 20):
+    """Hits, misses, evictions, size, p50/p99 lookup time and hottest keys of one namespace"""
+    stats = cache.get_namespace_stats(namespace, top_n=max(0, min(top_n, 100)))
+    if stats is None:
+        raise HTTPException(status_code=404, detail=f"Unknown cache namespace '{namespace}'")
+    return stats
 
 # =====================================================
 # ERROR HANDLERS (Must return JSONResponse)
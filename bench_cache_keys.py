@@ -0,0 +1,75 @@
+# bench_cache_keys.py
+# Cache key building for tool query dicts: canonical encoding + fast hash vs
+# the previous repr + MD5 path. Also lists argument pairs only the canonical
+# keys unify, and pairs the JSON fast path must keep apart.
+import hashlib
+import os
+import random
+import time
+from datetime import date
+
+os.environ.setdefault("CACHE_L2", "0")  # keep the benchmark off the disk tier
+
+from utils.cache_keys import KEY_HASH, make_key
+
+CITIES = ["Paris", "Dubai", "Lahore", "Tokyo", "New York", "Istanbul", "Bali", "Rome"]
+
+
+def legacy_key(prefix: str, *args, **kwargs) -> str:
+    """Previous CacheManager._generate_key"""
+    key_data = f"{prefix}:{args}:{sorted(kwargs.items())}"
+    return f"{prefix}:{hashlib.md5(key_data.encode()).hexdigest()}"
+
+
+def query(rng: random.Random) -> dict:
+    """Shape of the flight / hotel tool query dicts"""
+    return {
+        "origin": rng.choice(CITIES),
+        "destination": rng.choice(CITIES),
+        "start_date": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "end_date": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "travelers": rng.randint(1, 4),
+        "interests": rng.sample(["food", "museums", "beaches", "hiking", "nightlife"], 2),
+        "budget": {"total_usd": rng.randint(500, 5000), "currency": "USD"},
+    }
+
+
+def bench(label, fn, n, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):  # best of `repeat` runs, to damp scheduler noise
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<40} {n / best:>12,.0f} ops/s")
+
+
+if __name__ == "__main__":
+    rng = random.Random(7)
+    queries = [query(rng) for _ in range(50_000)]
+    scalars = [(q["origin"], q["destination"], q["start_date"], q["end_date"], q["travelers"]) for q in queries]
+
+    print(f"key hash: {KEY_HASH}")
+    bench("legacy repr+md5 (query dict)", lambda: [legacy_key("flights", q) for q in queries], len(queries))
+    bench("canonical (query dict)", lambda: [make_key("flights", q) for q in queries], len(queries))
+    bench("legacy repr+md5 (5 scalars)", lambda: [legacy_key("flights", *a) for a in scalars], len(scalars))
+    bench("canonical (5 scalars)", lambda: [make_key("flights", *a) for a in scalars], len(scalars))
+
+    print("\nEqual arguments the legacy keys treat as different:")
+    pairs = [
+        ("reordered dict", ({"origin": "LHE", "destination": "DXB"},), ({"destination": "DXB", "origin": "LHE"},)),
+        ("reordered set", ({"food", "museums", "hiking"},), ({"hiking", "museums", "food"},)),
+        ("date vs ISO string", (date(2026, 5, 1),), ("2026-05-01",)),
+    ]
+    for label, a, b in pairs:
+        legacy_same = legacy_key("q", *a) == legacy_key("q", *b)
+        canonical_same = make_key("q", *a) == make_key("q", *b)
+        print(f"  {label:<20} legacy same key: {legacy_same!s:<5}  canonical same key: {canonical_same}")
+
+    print("\nDifferent arguments that must not share a key:")
+    pairs = [
+        ("int vs str dict key", ({1: "a"},), ({"1": "a"},)),
+        ("bool vs str dict key", ({True: 1},), ({"true": 1},)),
+        ("int vs str value", (1,), ("1",)),
+    ]
+    for label, a, b in pairs:
+        print(f"  {label:<20} canonical same key: {make_key('q', *a) == make_key('q', *b)}")
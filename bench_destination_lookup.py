@@ -0,0 +1,65 @@
+# bench_destination_lookup.py
+# Destination -> accommodation cost: indexed resolver vs the previous linear
+# substring scan, plus the inputs on which the two disagree.
+import random
+import time
+
+from utils.destination_resolver import (
+    AVERAGE_ACCOMMODATION_COSTS,
+    destination_resolver,
+    estimate_accommodation_cost,
+)
+
+QUERIES = [
+    "Paris", "New York, USA", "Makkah", "Romania", "UAE", "Florence, Italy",
+    "Hunza Valley, Pakistan", "Saigon", "Tokyo, Japan", "Bali, Indonesia",
+    "Zurich", "kuala lumpur", "Cape Town, South Africa", "Reykjavik, Iceland",
+    "Giza", "Kyoto", "Lisbon", "Buenos Aires", "United Kingdom", "Mumbai, India",
+    "Santa Fe, New Mexico", "North Korea",
+]
+
+
+def legacy_lookup(destination: str, fallback: int = 75):
+    """Previous implementation: exact lookup, then a two-way substring scan"""
+    if not destination:
+        return None, fallback
+    destination_lower = destination.lower().strip()
+    if destination_lower in AVERAGE_ACCOMMODATION_COSTS:
+        return destination_lower, AVERAGE_ACCOMMODATION_COSTS[destination_lower]
+    for location, cost in AVERAGE_ACCOMMODATION_COSTS.items():
+        if location in destination_lower or destination_lower in location:
+            return location, cost
+    return None, fallback
+
+
+def legacy_estimate(destination: str, fallback: int = 75) -> int:
+    return legacy_lookup(destination, fallback)[1]
+
+
+def bench(label, fn, queries, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):  # best of `repeat` runs, to damp scheduler noise
+        start = time.perf_counter()
+        fn(queries)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<34} {len(queries) / best:>12,.0f} lookups/s")
+
+
+if __name__ == "__main__":
+    rng = random.Random(7)
+    # Mostly repeated destinations, as in real traffic
+    queries = [rng.choice(QUERIES) for _ in range(50_000)]
+    # Unique strings defeat memoization and measure the raw index (resolve() itself is uncached)
+    unique = [f"{rng.choice(QUERIES)} {i}" for i in range(50_000)]
+
+    bench("legacy scan (repeated)", lambda qs: [legacy_estimate(q) for q in qs], queries)
+    bench("resolver (repeated)", lambda qs: [estimate_accommodation_cost(q) for q in qs], queries)
+    bench("resolver batch (repeated)", lambda qs: destination_resolver.resolve_many(qs), queries)
+    bench("legacy scan (unique)", lambda qs: [legacy_estimate(q) for q in qs], unique)
+    bench("resolver (unique)", lambda qs: [destination_resolver.resolve(q) for q in qs], unique)
+
+    print("\nInputs where the answers differ:")
+    for q in QUERIES:
+        (old_key, old), new = legacy_lookup(q), destination_resolver.resolve(q)
+        if old_key != new.key:
+            print(f"  {q!r:<28} legacy=${old:<4} ({old_key})  resolver=${new.cost:<4} ({new.via}: {new.key})")
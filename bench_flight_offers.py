@@ -0,0 +1,85 @@
+# bench_flight_offers.py
+# Parsing/ranking 250 Amadeus flight offers: the dict-based
+# _parse_amadeus_response (one-way top 4) vs building the columnar
+# FlightOffers view, plus re-ranking an already parsed response, which is
+# what the round-trip parser does per leg.
+import random
+import time
+from datetime import datetime
+
+from utils.flight_offers import FlightOffers, duration_minutes
+
+AIRLINE_MAP = {"EK": "Emirates", "QR": "Qatar Airways", "PK": "PIA", "TK": "Turkish Airlines"}
+
+
+def make_response(n=250, seed=0):
+    rng = random.Random(seed)
+    offers = []
+    for i in range(n):
+        legs = rng.choice([1, 1, 2, 3])
+        hour = rng.randint(0, 20)
+        segments = [{
+            "carrierCode": rng.choice(list(AIRLINE_MAP)), "number": str(100 + i),
+            "departure": {"iataCode": "LHE", "at": f"2026-11-01T{hour:02d}:15:00"},
+            "arrival": {"iataCode": "DXB", "at": f"2026-11-01T{hour + 3:02d}:45:00"},
+        } for _ in range(legs)]
+        offers.append({
+            "price": {"total": f"{rng.uniform(100, 900):.2f}"},
+            "itineraries": [{"duration": f"PT{3 * legs}H30M", "segments": segments}],
+        })
+    return {"data": offers}
+
+
+def dict_based(data):
+    """Shape of FlightSearchTool._parse_amadeus_response"""
+    flights = []
+    all_offers = data.get("data", [])
+    sorted_offers = sorted(all_offers, key=lambda x: float(x.get("price", {}).get("total", 999999)))
+    direct_flights = [o for o in sorted_offers if len(o.get("itineraries", [{}])[0].get("segments", [])) == 1]
+    connecting_flights = [o for o in sorted_offers if len(o.get("itineraries", [{}])[0].get("segments", [])) > 1]
+    for offer in (direct_flights[:3] + connecting_flights[:1])[:4]:
+        itinerary = offer.get("itineraries", [{}])[0]
+        segments = itinerary.get("segments", [])
+        carrier_code = segments[0].get("carrierCode", "Unknown")
+        dep_time = segments[0].get("departure", {}).get("at", "")
+        arr_time = segments[-1].get("arrival", {}).get("at", "")
+        minutes = duration_minutes(itinerary.get("duration"))
+        if minutes < 0:
+            minutes = (datetime.fromisoformat(arr_time) - datetime.fromisoformat(dep_time)).total_seconds() / 60
+        flights.append({
+            "airline": AIRLINE_MAP.get(carrier_code, f"{carrier_code} Airlines"),
+            "price_usd": int(float(offer["price"]["total"])), "duration_hours": round(minutes / 60, 1),
+            "stops": len(segments) - 1,
+            "departure_time": dep_time.split("T")[1][:5], "arrival_time": arr_time.split("T")[1][:5],
+        })
+    return flights
+
+
+def columnar(data):
+    offers = FlightOffers.from_amadeus(data)
+    by_price = offers.order("price", "duration_min")
+    picks = list(by_price[offers.stops[by_price] == 0][:3]) + list(by_price[offers.stops[by_price] > 0][:1])
+    return [offers.option(i, airline_names=AIRLINE_MAP) for i in picks]
+
+
+def bench(label, fn, n=500, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):  # best of `repeat` runs, to damp scheduler noise
+        start = time.perf_counter()
+        for _ in range(n):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<40} {best / n * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    data = make_response()
+    assert [f["price_usd"] for f in dict_based(data)] == [f["price_usd"] for f in columnar(data)]
+
+    bench("dict-based parse + top 4", lambda: dict_based(data))
+    bench("columnar parse + top 4", lambda: columnar(data))
+
+    parsed = FlightOffers.from_amadeus(data)
+    bench("dict-based re-rank (stops, then price)", lambda: sorted(
+        data["data"], key=lambda o: (len(o["itineraries"][0]["segments"]), float(o["price"]["total"]))))
+    bench("columnar re-rank (stops, then price)", lambda: parsed.order("stops", "price"))
@@ -0,0 +1,68 @@
+# bench_gazetteer.py
+# Throughput of the attraction hallucination check on 10-day itineraries:
+# compiled Aho-Corasick gazetteer vs a per-landmark substring scan.
+import random
+import time
+
+from utils.attraction_gazetteer import attraction_gazetteer, tokenize
+
+WORDS = (
+    "explore the historic old town with a local guide and enjoy traditional food "
+    "at a family run restaurant before walking along the waterfront at sunset "
+    "visit the museum galleries and learn about the rich culture heritage"
+).split()
+
+
+def make_itinerary(rng, days=10, activities_per_day=5, words=170):
+    landmarks = [lm.name for lm in attraction_gazetteer.landmarks]
+    plans = []
+    for day in range(1, days + 1):
+        activities = []
+        for _ in range(activities_per_day):
+            text = [rng.choice(WORDS) for _ in range(words)]
+            text.insert(rng.randrange(len(text)), rng.choice(landmarks))
+            activities.append({
+                "title": f"Visit {rng.choice(landmarks)}",
+                "description": " ".join(text),
+            })
+        plans.append({"day": day, "activities": activities})
+    return plans
+
+
+def naive_check(plans, destination):
+    """Per-landmark substring scan (the previous approach, at dataset scale)"""
+    dest = destination.lower()
+    names = [(lm.name.lower(), lm.city.lower()) for lm in attraction_gazetteer.landmarks]
+    hits = 0
+    for day in plans:
+        for activity in day["activities"]:
+            text = f"{activity['title']} {activity['description']}".lower()
+            for name, city in names:
+                if name in text and city not in dest:
+                    hits += 1
+    return hits
+
+
+def bench(label, fn, itineraries, destination):
+    start = time.perf_counter()
+    for plans in itineraries:
+        fn(plans, destination)
+    elapsed = time.perf_counter() - start
+    n = len(itineraries)
+    activities = sum(len(d["activities"]) for d in itineraries[0]) * n
+    print(f"{label:<28} {n / elapsed:>10.1f} itineraries/s  {activities / elapsed:>10.0f} activities/s  ({elapsed * 1000 / n:.2f} ms each)")
+
+
+if __name__ == "__main__":
+    rng = random.Random(42)
+    itineraries = [make_itinerary(rng) for _ in range(50)]
+    chars = sum(len(a["description"]) for d in itineraries[0] for a in d["activities"])
+    print(f"Gazetteer: {len(attraction_gazetteer.landmarks)} landmarks | itinerary: 10 days x 5 activities, ~{chars // 1000}k chars")
+
+    bench("naive substring scan", naive_check, itineraries, "Dubai")
+    bench("aho-corasick gazetteer",
+          lambda plans, dest: attraction_gazetteer.check_itinerary(plans, dest, strip=False),
+          itineraries, "Dubai")
+    bench("tokenization only",
+          lambda plans, dest: [tokenize(a["description"]) for d in plans for a in d["activities"]],
+          itineraries, "Dubai")
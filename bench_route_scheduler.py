@@ -0,0 +1,38 @@
+# bench_route_scheduler.py
+# Route ordering speed and quality on each city's full landmark set:
+# nearest neighbour + 2-opt vs the order the landmarks were listed in.
+import time
+from collections import Counter
+
+from utils.attraction_gazetteer import attraction_gazetteer
+from utils.route_scheduler import order_route, route_length, route_scheduler
+
+if __name__ == "__main__":
+    counts = Counter(lm.city for lm in attraction_gazetteer.landmarks)
+    for city, n in counts.most_common(5):
+        points = [(lm.lat, lm.lon) for lm in attraction_gazetteer.landmarks_in(city)]
+        start = time.perf_counter()
+        order = order_route(points)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{city:<16} {n:>3} stops  {route_length(points, range(n)):>8.1f} km listed -> "
+              f"{route_length(points, order):>7.1f} km routed  ({elapsed:.2f} ms)")
+
+    # Synthetic 60-stop day to check the 50+ candidate case
+    city = counts.most_common(1)[0][0]
+    base = attraction_gazetteer.landmarks_in(city)
+    points = [(lm.lat + (i // len(base)) * 0.01, lm.lon) for i, lm in enumerate(base * (60 // len(base) + 1))][:60]
+    start = time.perf_counter()
+    order_route(points)
+    print(f"60 stops: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    day = {"day": 1, "activities": [
+        {"time": "09:00", "type": "Sightseeing", "title": "Visit the Eiffel Tower", "description": ""},
+        {"time": "11:00", "type": "Museum", "title": "Sacre-Coeur Basilica", "description": ""},
+        {"time": "13:00", "type": "Museum", "title": "Musee d'Orsay", "description": ""},
+        {"time": "15:00", "type": "Sightseeing", "title": "Arc de Triomphe", "description": ""},
+        {"time": "19:00", "type": "Dinner", "title": "Dinner near Notre-Dame Cathedral", "description": ""},
+    ]}
+    before, after = route_scheduler.schedule_day(day, "Paris, France")
+    print(f"Sample Paris day: {before:.1f} km -> {after:.1f} km")
+    for activity in day["activities"]:
+        print(f"  {activity['time']}  {activity['title']}")
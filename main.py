@@ -33,90 +33,21 @@ from schemas.itinerary_schemas import (
     DailyPlan,
     FinalItinerary,
     FlightOption,
-    HotelOption
+    HotelOption,
+    DatePriceOption
 )
 
 from utils.cache_manager import cache
 from utils.budget_analyzer import BudgetAnalyzer
+from utils.json_stream import parse_days
+from utils.attraction_gazetteer import attraction_gazetteer
+from utils.route_scheduler import route_scheduler
+from utils.destination_resolver import estimate_accommodation_cost
+from utils.trip_optimizer import best_combination
+from tools.booking_tools import flexible_dates
 
 load_dotenv()
 
-# Average hotel costs per night by region/country (in USD)
-AVERAGE_ACCOMMODATION_COSTS = {
-    # Middle East
-    "saudi arabia": 80, "riyadh": 90, "jeddah": 85, "mecca": 100, "medina": 95, "makkah": 100, "madinah": 95,
-    "united arab emirates": 120, "dubai": 150, "abu dhabi": 130, "uae": 120,
-    "qatar": 110, "doha": 110,
-    "kuwait": 90,
-    "bahrain": 85,
-    "oman": 75,
-    "jordan": 65, "amman": 70,
-    "turkey": 60, "istanbul": 75, "ankara": 55,
-    
-    # South Asia
-    "pakistan": 50, "lahore": 55, "karachi": 60, "islamabad": 65, "multan": 45, "sialkot": 40,
-    "india": 45, "delhi": 60, "mumbai": 70, "bangalore": 65, "new delhi": 60,
-    "bangladesh": 40, "dhaka": 45,
-    "sri lanka": 50, "colombo": 55,
-    "nepal": 35, "kathmandu": 40,
-    
-    # Southeast Asia
-    "thailand": 40, "bangkok": 50, "phuket": 60,
-    "malaysia": 45, "kuala lumpur": 55,
-    "singapore": 120,
-    "indonesia": 35, "bali": 50, "jakarta": 45,
-    "vietnam": 35, "hanoi": 40, "ho chi minh": 40,
-    "philippines": 40, "manila": 45,
-    
-    # Europe
-    "united kingdom": 120, "london": 150, "uk": 120,
-    "france": 100, "paris": 130,
-    "germany": 90, "berlin": 100, "munich": 95,
-    "spain": 80, "barcelona": 95, "madrid": 90,
-    "italy": 85, "rome": 100, "milan": 95,
-    "netherlands": 110, "amsterdam": 120,
-    "greece": 70, "athens": 80,
-    "portugal": 70, "lisbon": 80,
-    
-    # North America
-    "united states": 120, "new york": 180, "los angeles": 150, "usa": 120,
-    "canada": 100, "toronto": 110, "vancouver": 115,
-    "mexico": 60, "cancun": 80,
-    
-    # East Asia
-    "china": 70, "beijing": 85, "shanghai": 90,
-    "japan": 100, "tokyo": 120, "osaka": 100,
-    "south korea": 80, "seoul": 95,
-    
-    # Africa
-    "egypt": 50, "cairo": 60,
-    "south africa": 65, "cape town": 75,
-    "morocco": 55, "marrakech": 65,
-    "kenya": 60, "nairobi": 70,
-    
-    # Oceania
-    "australia": 110, "sydney": 130, "melbourne": 120,
-    "new zealand": 95, "auckland": 105,
-}
-
-def estimate_accommodation_cost(destination: str, fallback: int = 75) -> int:
-    """Estimate average accommodation cost per night based on destination"""
-    if not destination:
-        return fallback
-    
-    destination_lower = destination.lower().strip()
-    
-    # Direct match
-    if destination_lower in AVERAGE_ACCOMMODATION_COSTS:
-        return AVERAGE_ACCOMMODATION_COSTS[destination_lower]
-    
-    # Partial match (e.g., "New York, USA" matches "new york")
-    for location, cost in AVERAGE_ACCOMMODATION_COSTS.items():
-        if location in destination_lower or destination_lower in location:
-            return cost
-    
-    return fallback
-
 os.environ["CREWAI_TELEMETRY_OPT_OUT"] = "true"
 os.environ["CREWAI_REQUEST_TIMEOUT"] = "300" 
 
@@ -309,7 +240,18 @@ class OptimizedTripPlannerCrew:
                         pass
         return None
 
-    async def run_async(self, user_query: str, ask_if_missing: bool = True, additional_answers: dict = None) -> dict:
+    def _wants_flexible_dates(self, query: str) -> bool:
+        """True if the query asks for flexible / cheapest dates ("my dates are flexible", "give or take 2 days")"""
+        patterns = [
+            r'flexib\w*\s+(?:\w+\s+){0,2}dates?',
+            r'dates?\s+(?:\w+\s+){0,2}flexib',
+            r'cheapest\s+(?:dates?|days?|time)',
+            r'(?:give\s+or\s+take|plus\s+or\s+minus|\+/-|±)\s*\d*\s*days?',
+        ]
+        return any(re.search(pattern, query.lower()) for pattern in patterns)
+
+    async def run_async(self, user_query: str, ask_if_missing: bool = True, additional_answers: dict = None,
+                        flexible: bool = False) -> dict:
         """
         Main execution method
         
@@ -317,6 +259,7 @@ class OptimizedTripPlannerCrew:
             user_query: The user's trip request
             ask_if_missing: If True, return missing info questions instead of auto-filling
             additional_answers: Previously provided answers to missing info questions
+            flexible: Also look up cheaper departure dates nearby (implied when the query asks for it)
         
         Returns:
             Either a complete itinerary dict OR a dict with "missing_info" key
@@ -391,11 +334,16 @@ class OptimizedTripPlannerCrew:
         
         destination_task = self._run_destination_analysis(trip_details)
         logistics_task = self._run_logistics_search(trip_details)
+        tasks = [destination_task, logistics_task]
+        # The +-N day sweep costs several searches, so only run it when asked for
+        if flexible or self._wants_flexible_dates(user_query):
+            tasks.append(self._run_price_calendar(trip_details))
         
-        results = await asyncio.gather(destination_task, logistics_task, return_exceptions=True)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
         
         destination_output = results[0]
         logistics_output = results[1]
+        cheapest_dates = results[2] if len(results) > 2 and not isinstance(results[2], Exception) else []
         
         if isinstance(destination_output, Exception) or not destination_output:
             print(f"⚠️ Dest Error: {destination_output}")
@@ -424,6 +372,7 @@ class OptimizedTripPlannerCrew:
         # Add small delay to avoid rate limiting
         await asyncio.sleep(1)
         final_itinerary = await self._run_assembly(destination_output, logistics_output, daily_plans, trip_details)
+        final_itinerary.cheapest_dates = [DatePriceOption(**option) for option in cheapest_dates]
         
         end_time = datetime.now()
         print(f"\n🎉 COMPLETE! Time: {(end_time - start_time).total_seconds():.1f}s")
@@ -488,41 +437,54 @@ class OptimizedTripPlannerCrew:
         await loop.run_in_executor(self.executor, crew.kickoff)
         logistics_output = task.output.pydantic
         
-        # ✅ CRITICAL FIX: Ensure booking_link_flights is populated
-        # If agent didn't capture the booking URL, get it directly from the tool
-        # This ensures we ALWAYS have the Google Flights URL even when no flights are found
-        if not logistics_output.booking_link_flights and trip_details.origin:
+        # ✅ CRITICAL FIX: Ensure booking_link_flights and both flight directions are populated
+        # If the agent didn't capture them, get them directly from the tool in one round-trip
+        # search (one returnDate call, or outbound + return concurrently) off the event loop
+        if trip_details.origin and not (logistics_output.booking_link_flights and logistics_output.outbound_flight_options):
             try:
-                print("[DEBUG] Manually fetching outbound flight booking URL...")
-                flight_tool_result = search_flights._run({
+                print("[DEBUG] Manually fetching round-trip flights...")
+                flight_tool_result = await loop.run_in_executor(self.executor, search_flights._run, {
                     'origin': trip_details.origin,
                     'destination': trip_details.destination,
                     'start_date': trip_details.start_date,
                     'end_date': trip_details.end_date,
                     'travelers': trip_details.travelers
                 })
-                if 'booking_url' in flight_tool_result:
+                if not logistics_output.booking_link_flights and flight_tool_result.get('booking_url'):
                     # Use the outbound URL as the primary booking link
                     logistics_output.booking_link_flights = flight_tool_result['booking_url']
                     print(f"[DEBUG] Set booking_link_flights to: {flight_tool_result['booking_url']}")
-                    
-                    # Also try to get return flight URL if end_date exists
-                    if trip_details.end_date:
-                        print("[DEBUG] Manually fetching return flight booking URL...")
-                        return_result = search_flights._run({
-                            'origin': trip_details.destination,
-                            'destination': trip_details.origin,
-                            'start_date': trip_details.end_date,
-                            'travelers': trip_details.travelers
-                        })
-                        # Store return URL in booking_link_hotels temporarily (we can add a new field later)
-                        if 'booking_url' in return_result and not logistics_output.booking_link_hotels:
-                            print(f"[DEBUG] Return flight URL: {return_result['booking_url']}")
+                outbound = [FlightOption(**f) for f in flight_tool_result.get('outbound_flight_options', [])]
+                inbound = [FlightOption(**f) for f in flight_tool_result.get('return_flight_options', [])]
+                if outbound and not logistics_output.outbound_flight_options:
+                    logistics_output.outbound_flight_options = outbound
+                    logistics_output.flight_options = logistics_output.flight_options or outbound
+                if inbound and not logistics_output.return_flight_options:
+                    logistics_output.return_flight_options = inbound
+                if flight_tool_result.get('return_booking_url'):
+                    print(f"[DEBUG] Return flight URL: {flight_tool_result['return_booking_url']}")
             except Exception as e:
                 print(f"[DEBUG] Failed to get booking URL: {e}")
         
         return logistics_output
     
+    async def _run_price_calendar(self, trip_details):
+        """Cheapest nearby dates (+-FLEX_DATE_DAYS) from the shared price calendar"""
+        days = int(os.getenv("FLEX_DATE_DAYS", "2"))
+        if days <= 0 or not trip_details.start_date:
+            return []
+        loop = asyncio.get_event_loop()
+        cheapest = await loop.run_in_executor(self.executor, flexible_dates, {
+            'origin': trip_details.origin,
+            'destination': trip_details.destination,
+            'start_date': trip_details.start_date,
+            'end_date': trip_details.end_date,
+            'travelers': trip_details.travelers
+        }, days)
+        if cheapest:
+            print(f"📅 [CALENDAR] Cheapest dates: {[(o['date'], o['total_usd']) for o in cheapest]}")
+        return cheapest
+    
     async def _run_curation(self, trip_details, dest_data, log_data):
         try:
             s = datetime.strptime(trip_details.start_date, "%Y-%m-%d")
@@ -543,34 +505,28 @@ class OptimizedTripPlannerCrew:
             loop = asyncio.get_event_loop()
             result = await loop.run_in_executor(self.executor, crew.kickoff)
             
-            raw_json = str(result.raw).strip()
-            if "```json" in raw_json:
-                raw_json = raw_json.split("```json")[1].split("```")[0].strip()
-            elif "```" in raw_json:
-                raw_json = raw_json.split("```")[1].split("```")[0].strip()
-                
-            data = json.loads(raw_json)
-            daily_plans = [DailyPlan(**day) for day in data.get('days', [])]
-            
-            # ✅ VALIDATION: Check if activities mention wrong cities/attractions
-            requested_dest = trip_details.destination.lower()
-            wrong_attractions = {
-                'eiffel tower': 'Paris',
-                'louvre': 'Paris',
-                'notre dame': 'Paris',
-                'big ben': 'London',
-                'tower bridge': 'London',
-                'burj khalifa': 'Dubai',
-                'statue of liberty': 'New York'
-            }
-            
-            for day_plan in daily_plans:
-                for activity in day_plan.activities:
-                    activity_title = activity.get('title', '').lower() if isinstance(activity, dict) else getattr(activity, 'title', '').lower()
-                    for wrong_attraction, city in wrong_attractions.items():
-                        if wrong_attraction in activity_title and city.lower() not in requested_dest:
-                            print(f"⚠️ WRONG ATTRACTION DETECTED: '{activity_title}' is from {city}, but user requested {trip_details.destination}")
-                            print(f"🔧 This indicates LLM hallucination. Consider regenerating the itinerary.")
+            # ✅ Stream-parse the response: every complete day survives truncation
+            # or a malformed tail instead of dropping to the fallback plan
+            daily_plans = []
+            for day in parse_days(result.raw):
+                try:
+                    daily_plans.append(DailyPlan(**day))
+                except Exception as day_error:
+                    print(f"⚠️ Skipping invalid day {day.get('day', '?')}: {day_error}")
+            if not daily_plans:
+                raise ValueError("No complete days in curation output")
+            
+            # ✅ VALIDATION: Strip/flag activities naming landmarks from other destinations
+            findings = attraction_gazetteer.check_itinerary(daily_plans, trip_details.destination)
+            for finding in findings:
+                print(f"⚠️ WRONG ATTRACTION DETECTED ({finding['action']}): '{finding['activity']}' mentions {finding['landmark']} ({finding['city']}), but user requested {trip_details.destination}")
+            if findings:
+                print(f"🔧 This indicates LLM hallucination. Consider regenerating the itinerary.")
+            
+            # ✅ ROUTING: Reorder each day along a short route between known landmarks
+            km_before, km_after = route_scheduler.schedule_itinerary(daily_plans, trip_details.destination)
+            if km_after < km_before:
+                print(f"🗺️ Route scheduling: {km_before:.1f} km -> {km_after:.1f} km across {len(daily_plans)} days")
             
             return daily_plans
         except Exception as e:
@@ -590,19 +546,19 @@ class OptimizedTripPlannerCrew:
             itinerary = result.pydantic
             
             # ✅ VALIDATION: Check if destination matches
-            requested_dest = trip_details.destination.lower()
-            itinerary_dest = itinerary.destination.lower()
-            
-            # Check for common wrong cities that might appear
-            wrong_cities = ['paris', 'london', 'dubai', 'tokyo', 'new york', 'rome']
-            for wrong_city in wrong_cities:
-                if wrong_city in itinerary_dest and wrong_city not in requested_dest:
-                    print(f"⚠️ DESTINATION MISMATCH DETECTED: LLM generated '{itinerary.destination}' but user requested '{trip_details.destination}'")
-                    print(f"🔧 Correcting destination to: {trip_details.destination}")
-                    itinerary.destination = trip_details.destination
-                    # Also fix trip_title if it contains wrong city
-                    if wrong_city in itinerary.trip_title.lower():
-                        itinerary.trip_title = f"Trip to {trip_details.destination}"
+            # Check for cities from the gazetteer that don't belong to the request
+            wrong_cities = attraction_gazetteer.off_destination_cities(itinerary.destination, trip_details.destination)
+            if wrong_cities:
+                print(f"⚠️ DESTINATION MISMATCH DETECTED: LLM generated '{itinerary.destination}' but user requested '{trip_details.destination}'")
+                print(f"🔧 Correcting destination to: {trip_details.destination}")
+                itinerary.destination = trip_details.destination
+                # Also fix trip_title if it contains wrong city
+                if attraction_gazetteer.off_destination_cities(itinerary.trip_title, trip_details.destination):
+                    itinerary.trip_title = f"Trip to {trip_details.destination}"
+            
+            # The assembler may re-introduce hallucinated attractions
+            for finding in attraction_gazetteer.check_itinerary(itinerary.daily_plans, trip_details.destination):
+                print(f"⚠️ WRONG ATTRACTION IN ASSEMBLY ({finding['action']}): '{finding['activity']}' mentions {finding['landmark']} ({finding['city']})")
             
             # ✅ Ensure trip metadata is populated
             if not itinerary.origin:
@@ -670,8 +626,35 @@ class OptimizedTripPlannerCrew:
         
         # ✅ BUDGET ANALYSIS
         try:
+            trip_duration = len(daily_plans)
+            
+            # ✅ Choose the best flight + hotel combination that fits the user's budget,
+            # keeping the baseline daily spend (minus lodging) in reserve
+            combo = None
+            if trip_details.budget_usd and trip_details.budget_usd >= 100:
+                baseline = BudgetAnalyzer.BASELINE_COSTS["budget"]
+                combo = best_combination(
+                    outbound_flights=log_data.outbound_flight_options or log_data.flight_options,
+                    return_flights=log_data.return_flight_options,
+                    hotels=log_data.hotel_options,
+                    nights=trip_duration,
+                    budget_usd=trip_details.budget_usd,
+                    reserve_usd=(baseline["total_per_day"] - baseline["accommodation"]) * trip_duration
+                )
+            if combo:
+                itinerary.chosen_flight = combo.outbound
+                itinerary.chosen_outbound_flight = combo.outbound
+                if combo.return_flight:
+                    itinerary.chosen_return_flight = combo.return_flight
+                if combo.hotel:
+                    itinerary.chosen_hotel = combo.hotel
+                print(f"🧮 Optimizer picked ${combo.total_cost:,.0f} combo ({combo.stops} stop(s), hotel rating {combo.rating})")
+            
             # Estimate average round-trip flight cost if not available
-            actual_flight_cost = itinerary.chosen_flight.price_usd if itinerary.chosen_flight and itinerary.chosen_flight.price_usd > 0 else 0
+            if combo:
+                actual_flight_cost = combo.flight_cost
+            else:
+                actual_flight_cost = itinerary.chosen_flight.price_usd if itinerary.chosen_flight and itinerary.chosen_flight.price_usd > 0 else 0
             
             # If no actual flight cost, estimate based on typical costs
             if actual_flight_cost == 0:
@@ -683,7 +666,6 @@ class OptimizedTripPlannerCrew:
             
             flight_cost = estimated_flight_cost
             hotel_per_night = itinerary.chosen_hotel.price_per_night_usd if itinerary.chosen_hotel else 0
-            trip_duration = len(daily_plans)
             
             # If no hotel selected or price is 0, estimate based on destination
             if hotel_per_night == 0:
@@ -800,9 +782,10 @@ class OptimizedTripPlannerCrew:
     def _get_fallback_logistics(self):
         return LogisticsAnalysis(flight_options=[], hotel_options=[])
 
-    def run(self, user_query: str, ask_if_missing: bool = True, additional_answers: dict = None) -> dict:
+    def run(self, user_query: str, ask_if_missing: bool = True, additional_answers: dict = None,
+            flexible: bool = False) -> dict:
         """Synchronous wrapper for run_async"""
-        return asyncio.run(self.run_async(user_query, ask_if_missing, additional_answers))
+        return asyncio.run(self.run_async(user_query, ask_if_missing, additional_answers, flexible))
 
 if __name__ == "__main__":
     crew = OptimizedTripPlannerCrew()
@@ -75,6 +75,7 @@ class FlightOption(BaseModel):
     arrival_time: Optional[str] = None
     flight_type: Optional[str] = Field(None, description="Type of flight (direct, connecting, etc.)")
     segments: Optional[List[FlightSegment]] = Field(None, description="Detailed segments for connecting flights")
+    fare_id: Optional[str] = Field(None, description="Shared by the outbound and return flight of one round-trip fare (priced on the outbound)")
 
     @field_validator('booking_url', mode='before')
     @classmethod
@@ -227,6 +228,13 @@ class DailyPlan(BaseModel):
     activities: List[Activity] = Field(default_factory=list)
     daily_budget: Optional[int] = 0
 
+class DatePriceOption(BaseModel):
+    date: str = Field(..., description="Departure / check-in date (YYYY-MM-DD)")
+    return_date: Optional[str] = None
+    flight_price_usd: Optional[int] = None
+    hotel_price_usd: Optional[int] = None
+    total_usd: int = 0
+
 class FinalItinerary(BaseModel):
     trip_title: str
     destination: str
@@ -248,6 +256,7 @@ class FinalItinerary(BaseModel):
     all_outbound_flights: List[FlightOption] = Field(default_factory=list, description="All outbound flight options")
     all_return_flights: List[FlightOption] = Field(default_factory=list, description="All return flight options")
     all_hotels: List[HotelOption] = Field(default_factory=list, description="Full list of hotel options found")
+    cheapest_dates: List[DatePriceOption] = Field(default_factory=list, description="Cheapest nearby dates from the price calendar")
     
     budget_overview: str
     daily_plans: List[DailyPlan]
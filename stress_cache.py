@@ -0,0 +1,215 @@
+# stress_cache.py
+# Hammers CacheManager from many threads (mixed get/set/delete, eviction
+# pressure, stale refreshes, cleanup and stats running concurrently) and
+# asserts its invariants afterwards. Run: python stress_cache.py
+import asyncio
+import os
+import random
+import tempfile
+import threading
+import time
+
+from utils.cache_keys import namespace_of
+from utils.cache_manager import CacheManager, cached
+from utils.disk_cache import DiskCache
+
+THREADS = 16
+OPS = 20000
+NAMESPACES = ["flights", "hotels", "weather", "wikipedia", "web_search", "plan"]
+
+
+def check_invariants(cache: CacheManager):
+    """Bookkeeping matches contents; bounds and quotas hold in every shard"""
+    for shard in cache._shards:
+        with shard.lock:
+            assert shard.entries == sum(len(n.entries) for n in shard.namespaces.values())
+            assert shard.bytes == sum(n.bytes for n in shard.namespaces.values())
+            assert shard.entries <= shard.max_entries and shard.bytes <= shard.max_bytes
+            live = {id(e) for n in shard.namespaces.values() for e in n.entries.values()}
+            assert live <= {id(record[3]) for record in shard.heap}  # every entry can expire
+            for name, namespace in shard.namespaces.items():
+                assert namespace.bytes == sum(e.size for e in namespace.entries.values())
+                assert namespace.raw_bytes == sum(e.raw_size for e in namespace.entries.values())
+                assert namespace.compressed == sum(e.packed is not None for e in namespace.entries.values())
+                assert len(namespace.entries) <= namespace.max_entries
+                assert namespace.bytes <= namespace.max_bytes
+                assert all(namespace_of(key) == name for key in namespace.entries)
+
+
+def run_threads(target, n=THREADS):
+    errors = []
+
+    def guarded(i):
+        try:
+            target(i)
+        except BaseException as e:  # surface failures from worker threads
+            errors.append(e)
+
+    threads = [threading.Thread(target=guarded, args=(i,)) for i in range(n)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors, errors[:3]
+    return time.perf_counter() - start
+
+
+def mixed_workload(shards=16):
+    """get/set/delete across namespaces under eviction pressure; values must match their keys"""
+    cache = CacheManager(max_entries=2000, max_bytes=2_000_000, shards=shards)
+    gets = [0] * THREADS
+    stop = threading.Event()
+
+    def worker(i):
+        rng = random.Random(i)
+        for _ in range(OPS):
+            key = f"{rng.choice(NAMESPACES)}:{rng.randrange(5000)}"
+            op = rng.random()
+            if op < 0.6:
+                value = cache.get(key)
+                gets[i] += 1
+                assert value is None or value[0] == key, (key, value)
+            elif op < 0.95:
+                size = rng.randrange(10, 800) if rng.random() < 0.95 else rng.randrange(4096, 16384)  # some compressed
+                cache.set(key, (key, "x" * size), ttl_hours=1)
+            else:
+                cache.delete(key)
+
+    background_errors = []
+
+    def background():
+        try:
+            while not stop.is_set():
+                cache.cleanup_expired()
+                cache.get_stats()
+                check_invariants(cache)
+        except BaseException as e:
+            background_errors.append(e)
+
+    bg = threading.Thread(target=background)
+    bg.start()
+    elapsed = run_threads(worker)
+    stop.set()
+    bg.join()
+    assert not background_errors, background_errors
+
+    check_invariants(cache)
+    stats = cache.get_stats()
+    assert stats["hits"] + stats["misses"] == sum(gets), (stats, sum(gets))
+    assert stats["cache_size"] == len(cache) <= cache.max_entries
+    print(f"mixed workload ({shards:>2} shard(s)): {THREADS * OPS / elapsed:>10,.0f} ops/s, "
+          f"{stats['cache_size']} entries, {stats['evictions']} evictions, hit rate {stats['hit_rate']}")
+
+
+def counters_exact():
+    """Concurrent hits/misses on shared keys are counted exactly"""
+    cache = CacheManager()
+    for k in range(100):
+        cache.set(f"weather:{k}", k)
+
+    def worker(i):
+        for n in range(OPS):
+            cache.get(f"weather:{n % 200}")  # half hit, half miss
+
+    run_threads(worker)
+    stats = cache.get_stats()
+    assert stats["hits"] == stats["misses"] == THREADS * OPS // 2, stats
+    print(f"counters exact: {stats['hits']} hits / {stats['misses']} misses")
+
+
+def single_refresh_per_key():
+    """Stale reads from many threads start at most one background refresh per key at a time"""
+    cache = CacheManager()
+    running, calls, overlap = [0], [0], [False]
+    lock = threading.Lock()
+
+    def refresh():
+        with lock:
+            running[0] += 1
+            calls[0] += 1
+            overlap[0] |= running[0] > 1
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return "fresh"
+
+    cache.set("flights:hot", "stale", ttl_hours=0, stale_hours=1, refresh=refresh)
+
+    def worker(i):
+        for _ in range(200):
+            assert cache.get("flights:hot") in ("stale", "fresh")
+
+    run_threads(worker)
+    time.sleep(0.2)
+    assert not overlap[0] and calls[0] >= 1
+    assert cache.get("flights:hot") == "fresh"
+    print(f"single refresh per key: {calls[0]} refresh call(s), never concurrent")
+
+
+def two_tier_restart():
+    """Concurrent writes through L1 reach the disk tier; a fresh cache on the same file serves them"""
+    path = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+    cache = CacheManager(max_entries=500, l2=DiskCache(path, flush_interval=0.05))
+    expected = {}
+
+    def worker(i):
+        rng = random.Random(i)
+        for n in range(2000):
+            key = f"{NAMESPACES[i % len(NAMESPACES)]}:{i}-{rng.randrange(300)}"  # disjoint per thread
+            value = cache.get(key)
+            assert value is None or value[0] == key, (key, value)
+            if rng.random() < 0.1:
+                cache.delete(key)
+                expected[key] = None
+            else:
+                expected[key] = (key, n)
+                cache.set(key, expected[key], ttl_hours=1)
+
+    elapsed = run_threads(worker)
+    cache.close()
+
+    restarted = CacheManager(l2=DiskCache(path))
+    for key, value in expected.items():
+        assert restarted.get(key) == value, (key, restarted.get(key), value)
+    stats = restarted.get_stats()
+    assert stats["l1_hits"] == 0 and stats["l2_hits"] == sum(v is not None for v in expected.values())
+    restarted.close()
+    print(f"two-tier restart: {THREADS * 2000 / elapsed:,.0f} ops/s, "
+          f"{stats['l2_hits']} entries served from disk after restart")
+
+
+def cancelled_leader():
+    """Cancelling the task running a @cached coroutine doesn't fail the callers coalesced onto it"""
+    cache = CacheManager()
+    calls = [0]
+
+    @cached("plan", cache_instance=cache)
+    async def slow(x):
+        calls[0] += 1
+        await asyncio.sleep(0.05)
+        return x * 2
+
+    async def main():
+        for round_ in range(50):
+            leader = asyncio.ensure_future(slow(round_))
+            await asyncio.sleep(0)  # leader registers its in-flight future
+            followers = [asyncio.ensure_future(slow(round_)) for _ in range(20)]
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            assert await asyncio.gather(*followers) == [round_ * 2] * 20
+            assert await slow(round_) == round_ * 2  # cached by the follower that took over
+
+    asyncio.run(main())
+    assert calls[0] == 100, calls  # one cancelled + one completed call per round
+    print(f"cancelled leader: followers re-ran {calls[0] // 2} lookup(s) once each instead of failing")
+
+
+if __name__ == "__main__":
+    counters_exact()
+    single_refresh_per_key()
+    cancelled_leader()
+    mixed_workload(shards=1)
+    mixed_workload(shards=16)
+    two_tier_restart()
+    print("All cache invariants held ✅")
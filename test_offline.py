@@ -0,0 +1,62 @@
+# test_offline.py
+# Regression checks that need no API keys or network: run with pytest, or
+# directly (python test_offline.py) for a ✅/❌ summary.
+from tools.booking_tools import search_flights
+from utils.airport_gazetteer import airport_gazetteer
+
+
+def print_status(name, success, message):
+    icon = "✅" if success else "❌"
+    print(f"{icon} {name}: {message}")
+
+
+def test_gazetteer_rejects_contradicting_country():
+    # The city exists elsewhere; the Amadeus lookup has to find the right one
+    assert airport_gazetteer.lookup("Hyderabad, Pakistan") is None
+    assert airport_gazetteer.lookup("Paris, Texas") is None
+    assert airport_gazetteer.lookup("Sydney, Nova Scotia") is None
+    assert airport_gazetteer.lookup("Hyderabad, India") == "HYD"
+    assert airport_gazetteer.lookup("Paris, France") == "PAR"
+    assert airport_gazetteer.lookup("Atlanta, Georgia") == "ATL"
+
+
+
+def _round_trip_offer(offer_id, price, return_at, return_segments=True):
+    def leg(departure, arrival, carrier):
+        return {"duration": "PT3H", "segments": [
+            {"carrierCode": carrier, "departure": {"at": departure}, "arrival": {"at": arrival}}
+        ]}
+    inbound = leg(return_at, return_at[:11] + "23:00:00", "QR")
+    if not return_segments:
+        inbound["segments"] = []
+    return {"id": offer_id, "price": {"total": str(price)}, "itineraries": [
+        leg("2026-11-01T10:00:00", "2026-11-01T13:00:00", "EK"), inbound
+    ]}
+
+
+def test_round_trip_pairs_survive_malformed_return():
+    # Offer 2's return itinerary is broken: it is dropped and no later pair shifts
+    data = {"data": [
+        _round_trip_offer(str(k), 500 + k, f"2026-11-08T{10 + k:02d}:00:00", return_segments=k != 2)
+        for k in range(5)
+    ]}
+    outbound, returns = search_flights._parse_round_trip(data, "LHE", "DXB", "2026-11-01", "2026-11-08")
+    assert len(outbound) == len(returns) == 3
+    assert [o["price_usd"] for o in outbound] == [500, 501, 503]
+    for out, back in zip(outbound, returns):
+        offer_number = int(out["fare_id"].rsplit("#", 1)[1])
+        assert back["fare_id"] == out["fare_id"]
+        assert back["departure_time"] == f"{10 + offer_number:02d}:00"
+
+
+if __name__ == "__main__":
+    failed = 0
+    for name, check in list(globals().items()):
+        if name.startswith("test_") and callable(check):
+            try:
+                check()
+                print_status(name, True, "passed")
+            except AssertionError:
+                failed += 1
+                print_status(name, False, "assertion failed")
+    raise SystemExit(1 if failed else 0)
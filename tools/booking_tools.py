@@ -1,25 +1,26 @@
 import os
-import requests
-import time
+import re
+from concurrent.futures import ThreadPoolExecutor
 from crewai.tools import BaseTool
 from typing import Dict, List
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.cache_manager import cache
+from utils.cache_manager import cached
+from utils.http_client import http_client
+from utils.token_manager import OAuthTokenManager, client_credentials
+from utils.upstream_guard import upstreams
+from utils.destination_ids import TOP_DESTINATIONS, destination_ids
+from utils.price_calendar import date_window, price_calendar, shift_date
+from utils.airport_gazetteer import airport_gazetteer
+from utils.rate_limiter import amadeus_rate_limiter
+from utils.route_graph import leg_from_offer, parse_local_time, route_graph
+from utils.flight_offers import FlightOffers, duration_minutes
 
 load_dotenv()
 
 # --- Constants ---
-COMMON_IATA_CODES = {
-    "lahore": "LHE", "jeddah": "JED", "karachi": "KHI", "islamabad": "ISB",
-    "riyadh": "RUH", "dubai": "DXB", "london": "LON", "new york": "NYC",
-    "paris": "PAR", "tokyo": "TYO", "istanbul": "IST", 
-    "madinah": "MED", "medina": "MED", "makkah": "JED", "mecca": "JED", 
-    "dammam": "DMM", "multan": "MUX", "sialkot": "SKT"
-}
-
 AIRLINE_MAP = {
     "XY": "Flynas", "SV": "Saudia", "PK": "PIA", "EK": "Emirates",
     "QR": "Qatar Airways", "FZ": "FlyDubai", "PA": "Airblue",
@@ -44,6 +45,11 @@ def get_safe_date(date_str):
     next_friday = today + timedelta(days=days_ahead)
     return next_friday.strftime("%Y-%m-%d")
 
+def get_safe_travelers(value) -> int:
+    """Traveler count as an int (Amadeus "adults" accepts 1-9); "2 adults" -> 2"""
+    match = re.search(r"\d+", str(value or ""))
+    return min(max(int(match.group()), 1), 9) if match else 1
+
 # =====================================================
 # AMADEUS API HELPER
 # =====================================================
@@ -55,33 +61,26 @@ class AmadeusClient:
         # Test API: https://test.api.amadeus.com (limited mock data)
         # Production API: https://api.amadeus.com (real flight data)
         self.base_url = "https://api.amadeus.com" 
-        self._token = None
-        self._token_expiry = None
+        # One token shared by every executor thread: single-flight refresh, renewed ahead of expiry
+        self._tokens = OAuthTokenManager(
+            client_credentials(f"{self.base_url}/v1/security/oauth2/token", self.api_key, self.api_secret),
+            name="Amadeus"
+        )
 
     def get_access_token(self) -> str:
-        if self._token and self._token_expiry and datetime.now() < self._token_expiry: return self._token
-        try:
-            auth_url = f"{self.base_url}/v1/security/oauth2/token"
-            auth_data = {"grant_type": "client_credentials", "client_id": self.api_key, "client_secret": self.api_secret}
-            response = requests.post(auth_url, data=auth_data, timeout=30)
-            if response.status_code != 200: return None
-            data = response.json()
-            self._token = data.get("access_token")
-            expires_in = data.get("expires_in", 1800)
-            self._token_expiry = datetime.now() + timedelta(seconds=expires_in - 60)
-            return self._token
-        except: return None
+        return self._tokens.get()
 
     def get_iata_code(self, city_name: str) -> str:
-        clean_name = city_name.lower().strip()
-        if clean_name in COMMON_IATA_CODES: return COMMON_IATA_CODES[clean_name]
+        # Offline gazetteer first; the Amadeus lookup is only for places it doesn't know
+        code = airport_gazetteer.lookup(city_name)
+        if code: return code
         try:
             token = self.get_access_token()
             if not token: return city_name[:3].upper()
             url = f"{self.base_url}/v1/reference-data/locations"
             headers = {"Authorization": f"Bearer {token}"}
             params = {"subType": "CITY", "keyword": city_name, "view": "LIGHT"}
-            response = requests.get(url, headers=headers, params=params, timeout=10)
+            response = http_client.get(url, headers=headers, params=params, timeout=10)
             if response.status_code == 200:
                 data = response.json().get('data', [])
                 if data: return data[0].get('iataCode')
@@ -90,10 +89,34 @@ class AmadeusClient:
     
     def search_flights(self, origin: str, destination: str, departure_date: str, adults: int = 1, return_date: str = None) -> Dict:
         try:
-            token = self.get_access_token()
-            if not token: return {"error": "Auth failed"}
             origin_code = self.get_iata_code(origin)
             dest_code = self.get_iata_code(destination)
+            return self._search_offers(origin_code, dest_code, departure_date, adults, return_date)
+        except Exception as e: return {"error": str(e)}
+
+    def search_round_trip(self, origin_code: str, dest_code: str, departure_date: str, return_date: str, adults: int = 1) -> Dict:
+        """
+        Both directions of a trip as {"outbound": response, "return": response, "combined": bool}.
+
+        One returnDate search when Amadeus prices the pair together (each offer
+        then carries both itineraries and the round-trip fare); if that fails
+        or finds nothing, two one-way searches run concurrently.
+        """
+        combined = self._search_offers(origin_code, dest_code, departure_date, adults, return_date)
+        if combined.get("data"):
+            return {"outbound": combined, "return": combined, "combined": True}
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            outbound = pool.submit(self._search_offers, origin_code, dest_code, departure_date, adults)
+            inbound = pool.submit(self._search_offers, dest_code, origin_code, return_date, adults)
+            return {"outbound": outbound.result(), "return": inbound.result(), "combined": False}
+
+    def _search_offers(self, origin_code: str, dest_code: str, departure_date: str, adults: int = 1, return_date: str = None) -> Dict:
+        """Flight-offers search between resolved IATA codes, paced by the shared rate limiter"""
+        # Breaker open: fail fast so callers fall back to Google Flights links
+        if not upstreams.available("amadeus"): return {"error": "Amadeus unavailable (circuit open)"}
+        try:
+            token = self.get_access_token()
+            if not token: return {"error": "Auth failed"}
             
             search_url = f"{self.base_url}/v2/shopping/flight-offers"
             headers = {"Authorization": f"Bearer {token}"}
@@ -101,7 +124,9 @@ class AmadeusClient:
                 "originLocationCode": origin_code, "destinationLocationCode": dest_code,
                 "departureDate": departure_date, "adults": adults, "max": 10, "currencyCode": "USD"
             }
-            response = requests.get(search_url, headers=headers, params=params, timeout=30)
+            if return_date: params["returnDate"] = return_date
+            response = http_client.get(search_url, headers=headers, params=params, limiter=amadeus_rate_limiter)
+            if response.status_code == 401: self._tokens.invalidate(token)
             result = response.json() if response.status_code == 200 else {"error": f"API {response.status_code}"}
             
             # ✅ ADD IATA CODES TO RESULT FOR FRONTEND
@@ -112,73 +137,80 @@ class AmadeusClient:
             return result
         except Exception as e: return {"error": str(e)}
     
-    def search_connecting_flights(self, origin: str, destination: str, departure_date: str, adults: int = 1) -> List[Dict]:
-        """Find connecting flights through major hubs if no direct flights available"""
+    def search_connecting_flights(self, origin: str, destination: str, departure_date: str, adults: int = 1, max_options: int = 5) -> List[Dict]:
+        """
+        Find connecting flights through major hubs if no direct flights available.
+
+        All hubs are searched concurrently: first leg and same-day second leg
+        go out together, then next-day second legs only for hubs where no
+        same-day leg leaves after the minimum connection time. Every offer
+        is added to the shared route graph, which returns the cheapest valid
+        itineraries (including multi-hub ones from previously cached legs).
+        """
         major_hubs = ["DXB", "IST", "DOH", "AUH", "CAI"]  # Expanded hub list
-        connecting_options = []
         
         print(f"[CONNECTING] Searching for connecting flights from {origin} to {destination}")
         
         try:
             origin_code = self.get_iata_code(origin)
             dest_code = self.get_iata_code(destination)
+            day_start = parse_local_time(f"{departure_date}T00:00:00")
+            next_day = (datetime.strptime(departure_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
             
             print(f"[CONNECTING] Using codes: {origin_code} → {dest_code}")
             
-            for hub in major_hubs:
-                if hub == origin_code or hub == dest_code:
-                    continue
+            hubs = [hub for hub in major_hubs if hub not in (origin_code, dest_code)]
+            if not hubs or not upstreams.available("amadeus") or not self.get_access_token():
+                return []
+            
+            with ThreadPoolExecutor(max_workers=2 * len(hubs)) as pool:
+                legs = {}
+                def leg(from_code, to_code, date):
+                    key = (from_code, to_code, date)
+                    if key not in legs:
+                        legs[key] = pool.submit(self._search_offers, from_code, to_code, date, adults)
+                    return legs[key]
                 
-                print(f"[CONNECTING] Trying hub: {hub}")
-                    
-                # Add small delay to avoid rate limiting
-                time.sleep(0.5)
-                    
-                # Check if route via hub exists
-                leg1 = self.search_flights(origin, hub, departure_date, adults)
+                def offers(future):
+                    data = future.result().get("data") or []
+                    route_graph.add_offers(data)
+                    return [l for l in map(leg_from_offer, data) if l]
                 
-                if "data" in leg1 and len(leg1["data"]) > 0:
-                    print(f"[CONNECTING] Found leg1: {origin_code} → {hub} ({len(leg1['data'])} options)")
-                    
-                    # Try same-day connection first, then next day
-                    try:
-                        dep_date = datetime.strptime(departure_date, "%Y-%m-%d")
-                        
-                        # Try same-day first
-                        time.sleep(0.5)
-                        leg2_same_day = self.search_flights(hub, destination, departure_date, adults)
-                        
-                        if "data" in leg2_same_day and len(leg2_same_day["data"]) > 0:
-                            print(f"[CONNECTING] Found leg2 (same-day): {hub} → {dest_code} ({len(leg2_same_day['data'])} options)")
-                            connecting_options.append({
-                                "hub": hub,
-                                "leg1": leg1["data"][0],
-                                "leg2": leg2_same_day["data"][0],
-                                "total_price": float(leg1["data"][0]["price"]["total"]) + float(leg2_same_day["data"][0]["price"]["total"])
-                            })
-                        else:
-                            # Try next day
-                            next_day = (dep_date + timedelta(days=1)).strftime("%Y-%m-%d")
-                            time.sleep(0.5)
-                            leg2_next_day = self.search_flights(hub, destination, next_day, adults)
-                            
-                            if "data" in leg2_next_day and len(leg2_next_day["data"]) > 0:
-                                print(f"[CONNECTING] Found leg2 (next-day): {hub} → {dest_code} ({len(leg2_next_day['data'])} options)")
-                                connecting_options.append({
-                                    "hub": hub,
-                                    "leg1": leg1["data"][0],
-                                    "leg2": leg2_next_day["data"][0],
-                                    "total_price": float(leg1["data"][0]["price"]["total"]) + float(leg2_next_day["data"][0]["price"]["total"])
-                                })
-                            else:
-                                print(f"[CONNECTING] No leg2 found for hub {hub}")
-                    except Exception as e:
-                        print(f"[CONNECTING] Error checking hub {hub}: {e}")
+                first = {hub: leg(origin_code, hub, departure_date) for hub in hubs}
+                same_day = {hub: leg(hub, dest_code, departure_date) for hub in hubs}
+                
+                for hub in hubs:
+                    leg1 = offers(first[hub])
+                    if not leg1:
+                        print(f"[CONNECTING] No leg1 found for hub {hub}")
                         continue
-                else:
-                    print(f"[CONNECTING] No leg1 found for hub {hub}")
+                    print(f"[CONNECTING] Found leg1: {origin_code} → {hub} ({len(leg1)} options)")
+                    
+                    ready = min(l.arrival for l in leg1) + route_graph.min_connection
+                    if not any(l.departure >= ready for l in offers(same_day[hub])):
+                        print(f"[CONNECTING] No same-day connection at {hub}, trying next day")
+                        offers(leg(hub, dest_code, next_day))
             
-            print(f"[CONNECTING] Total connecting options found: {len(connecting_options)}")
+            itineraries = route_graph.k_best(
+                airport_gazetteer.airport_codes(origin_code), airport_gazetteer.airport_codes(dest_code),
+                depart_after=day_start, depart_before=day_start + 86400 - 1,
+                k=max_options + 5, max_legs=3
+            )
+            connecting_options = [
+                {
+                    "hub": " + ".join(it.hubs),
+                    "hubs": it.hubs,
+                    "legs": [l.offer for l in it.legs],
+                    "leg1": it.legs[0].offer,
+                    "leg2": it.legs[-1].offer,
+                    "layover_minutes": [int((b.departure - a.arrival) // 60) for a, b in zip(it.legs, it.legs[1:])],
+                    "duration_hours": round(it.duration_hours, 1),
+                    "total_price": it.price
+                }
+                for it in itineraries if len(it.legs) > 1
+            ][:max_options]
+            
+            print(f"[CONNECTING] Total connecting options found: {len(connecting_options)} ({len(legs)} leg searches, {len(route_graph)} cached legs)")
             return connecting_options
         except Exception as e:
             print(f"[CONNECTING] Error in search_connecting_flights: {e}")
@@ -186,6 +218,10 @@ class AmadeusClient:
 
 amadeus_client = AmadeusClient()
 
+def _no_live_flights(result: dict) -> bool:
+    """Links-only result (no API key, circuit open or Amadeus failed): cached briefly, not for the full TTL"""
+    return not result or not (result.get("flight_options") or result.get("return_flight_options"))
+
 # =====================================================
 # FLIGHT SEARCH TOOL (Generates Google Flights URLs)
 # =====================================================
@@ -236,13 +272,15 @@ class FlightSearchTool(BaseTool):
         is_round_trip = raw_end and str(raw_end).lower() not in ["none", "", "null"]
         end_date = get_safe_date(raw_end) if is_round_trip else None
         
-        travelers = query.get('travelers', 1)
+        travelers = get_safe_travelers(query.get('travelers', 1))
         
         print(f"[Flight] Request: {origin}->{destination} on {date}")
-        
-        cache_key = cache._generate_key("flights", origin, destination, date, travelers)
-        if cache.get(cache_key): return cache.get(cache_key)
+        return self._search(origin, destination, date, end_date, travelers)
 
+    # Past 2h the result is served stale (up to 2h more) while a background search refreshes it
+    @cached("flights", ttl_hours=2, stale_hours=2, is_empty=_no_live_flights)
+    def _search(self, origin: str, destination: str, date: str, end_date: str, travelers: int) -> dict:
+        """Booking links and live options for one normalized query"""
         origin_iata = amadeus_client.get_iata_code(origin)
         dest_iata = amadeus_client.get_iata_code(destination)
         
@@ -251,7 +289,7 @@ class FlightSearchTool(BaseTool):
         print(f"[FLIGHT URL] Dates: start={date}, end={end_date if end_date else 'N/A'}")
         
         # Build Google Flights URL with proper date formatting for pre-fill
-        if is_round_trip and end_date and end_date != date:
+        if end_date and end_date != date:
             base_link = f"https://www.google.com/travel/flights?q=flights+from+{origin_iata}+to+{dest_iata}+on+{date}+return+{end_date}"
             print(f"[FLIGHT URL] Round-trip URL generated")
         else:
@@ -260,16 +298,62 @@ class FlightSearchTool(BaseTool):
         
         print(f"[FLIGHT URL] Generated URL: {base_link}")
 
+        outbound, inbound = [], []
+        if amadeus_client.api_key and upstreams.available("amadeus"):
+            outbound, inbound = self._live_options(origin_iata, dest_iata, date, end_date, travelers)
+            print(f"[FLIGHT] Amadeus: {len(outbound)} outbound, {len(inbound)} return options")
+
         print(f"[FLIGHT] Directing to Google Flights for live search: {origin} -> {destination} ({date} - {end_date if end_date else 'one-way'})")
         result = {
-            "flight_options": [], 
+            "flight_options": outbound, 
+            "outbound_flight_options": outbound,
+            "return_flight_options": inbound,
             "booking_url": base_link, 
-            "source": "Google Flights - Live Search",
+            "source": "Amadeus + Google Flights" if outbound or inbound else "Google Flights - Live Search",
             "message": f"Here are the cheapest flights from {origin} to {destination} on {date}."
         }
-        cache.set(cache_key, result, ttl_hours=2)
+        if end_date:
+            result["return_booking_url"] = f"https://www.google.com/travel/flights?q=flights+from+{dest_iata}+to+{origin_iata}+on+{end_date}"
         return result
     
+    def price_calendar(self, query: dict, days: int = 3) -> dict:
+        """
+        Cheapest fare for each departure date within +-days of start_date.
+
+        Round trips keep the trip length fixed (one returnDate search per
+        date). Dates are searched concurrently through the Amadeus rate
+        limiter and cached per route x date, so overlapping windows reuse cells.
+        """
+        origin, destination = query.get('origin'), query.get('destination')
+        date = get_safe_date(query.get('start_date'))
+        raw_end = query.get('end_date')
+        end_date = get_safe_date(raw_end) if raw_end and str(raw_end).lower() not in ["none", "", "null"] else None
+        nights = (datetime.strptime(end_date, "%Y-%m-%d") - datetime.strptime(date, "%Y-%m-%d")).days if end_date else None
+        travelers = get_safe_travelers(query.get('travelers', 1))
+        calendar = {"route": None, "nights": nights, "prices": {}, "cheapest": []}
+
+        if origin in [None, "None", "", "null"] or destination in [None, "None", "", "null"]:
+            return calendar
+        if not amadeus_client.api_key or not upstreams.available("amadeus"):
+            return calendar
+        origin_iata = amadeus_client.get_iata_code(origin)
+        dest_iata = amadeus_client.get_iata_code(destination)
+        calendar["route"] = f"{origin_iata}-{dest_iata}"
+
+        def cheapest_fare(day):
+            data = amadeus_client._search_offers(origin_iata, dest_iata, day, travelers,
+                                                 shift_date(day, nights) if nights is not None else None)
+            if "error" in data: raise RuntimeError(data["error"])
+            offers = FlightOffers.from_amadeus(data)
+            if not len(offers): return None
+            price = offers.price[offers.order("price")[0]]
+            return None if price != price else float(price)  # NaN: no priced offer
+
+        route = ("flight", origin_iata, dest_iata, nights, travelers)
+        calendar["prices"] = price_calendar.sweep(route, date_window(date, days), cheapest_fare)
+        calendar["cheapest"] = [dp._asdict() for dp in price_calendar.cheapest(calendar["prices"])]
+        return calendar
+
     def _parse_amadeus_response(self, data: dict, origin: str, dest: str, date: str, origin_iata: str, dest_iata: str) -> List[dict]:
         """Parse Amadeus response and return only the best 3-4 flight options"""
         flights = []
@@ -288,39 +372,89 @@ class FlightSearchTool(BaseTool):
         for offer in selected_offers:
             try:
                 price = float(offer.get("price", {}).get("total", 0))
-                segments = offer.get("itineraries", [{}])[0].get("segments", [])
+                itinerary = offer.get("itineraries", [{}])[0]
+                segments = itinerary.get("segments", [])
                 if not segments: continue
                 
                 carrier_code = segments[0].get("carrierCode", "Unknown")
                 airline_name = AIRLINE_MAP.get(carrier_code, f"{carrier_code} Airlines")
+                dep_time = segments[0].get("departure", {}).get("at", "")
+                arr_time = segments[-1].get("arrival", {}).get("at", "")
                 
-                specific_url = f"https://www.google.com/travel/flights?q=flights+from+{origin_iata}+to+{dest_iata}+on+{date}+{airline_name.replace(' ', '+')}"
-                
-                # Calculate duration
-                try:
-                    dep_time = segments[0].get("departure", {}).get("at", "")
-                    arr_time = segments[-1].get("arrival", {}).get("at", "")
-                    if dep_time and arr_time:
-                        dep_dt = datetime.fromisoformat(dep_time.replace('Z', '+00:00'))
-                        arr_dt = datetime.fromisoformat(arr_time.replace('Z', '+00:00'))
-                        duration = (arr_dt - dep_dt).total_seconds() / 3600
-                    else:
-                        duration = 0.0
-                except:
-                    duration = 0.0
+                # Elapsed time from the ISO duration; local wall-clock times differ by the time zone offset
+                minutes = duration_minutes(itinerary.get("duration"))
+                if minutes < 0 and dep_time and arr_time:
+                    try:
+                        minutes = (datetime.fromisoformat(arr_time[:19]) - datetime.fromisoformat(dep_time[:19])).total_seconds() / 60
+                    except ValueError:
+                        minutes = 0
                 
                 flights.append({
                     "airline": airline_name, 
                     "price_usd": int(price),
-                    "duration_hours": round(duration, 1), 
+                    "duration_hours": round(max(minutes, 0) / 60, 1), 
                     "stops": len(segments) - 1,
-                    "booking_url": specific_url,
-                    "departure_time": segments[0].get("departure", {}).get("at", "").split("T")[1][:5] if segments[0].get("departure", {}).get("at") else "N/A",
-                    "arrival_time": segments[-1].get("arrival", {}).get("at", "").split("T")[1][:5] if segments[-1].get("arrival", {}).get("at") else "N/A",
+                    "booking_url": self._airline_url(origin_iata, dest_iata, date, airline_name),
+                    "departure_time": dep_time.split("T")[1][:5] if "T" in dep_time else "N/A",
+                    "arrival_time": arr_time.split("T")[1][:5] if "T" in arr_time else "N/A",
                     "flight_type": "direct" if len(segments) == 1 else f"{len(segments)-1} stop(s)"
                 })
             except: continue
         return flights
+
+    def _parse_round_trip(self, data: dict, origin_iata: str, dest_iata: str, date: str, end_date: str):
+        """
+        (outbound, return) options from a combined returnDate response.
+
+        Each pair comes from one offer: the round-trip fare is shown on the
+        outbound option and the return option is priced 0 so it isn't counted
+        twice. Both carry the offer's fare_id, which the trip optimizer uses
+        to keep them together.
+        """
+        # Offers whose return leg can't be parsed are dropped before ranking, and
+        # each outbound row looks up its own offer's return row, so pairs never shift
+        inbound = FlightOffers.from_amadeus([o for o in data.get("data", []) if len(o.get("itineraries", [])) > 1], leg=1)
+        return_row = {id(inbound.offer(j)): j for j in range(len(inbound))}
+        outbound = FlightOffers.from_amadeus([inbound.offer(j) for j in range(len(inbound))])
+        outbound_options, return_options = [], []
+        for i in self._best_rows(outbound):
+            offer = outbound.offer(i)
+            fare_id = f"{date}/{end_date}#{offer.get('id', i)}"
+            outbound_options.append({**self._option(outbound, i, origin_iata, dest_iata, date), "fare_id": fare_id})
+            option = inbound.option(return_row[id(offer)], airline_names=AIRLINE_MAP)
+            option.update(price_usd=0, flight_type=f"{option['flight_type']} (included in round-trip fare)",
+                          booking_url=self._airline_url(dest_iata, origin_iata, end_date, option["airline"]),
+                          fare_id=fare_id)
+            return_options.append(option)
+        return outbound_options, return_options
+
+    @staticmethod
+    def _best_rows(offers: FlightOffers) -> List[int]:
+        """Prioritize: 2-3 direct flights + 1-2 connecting flights (total max 4)"""
+        by_price = offers.order("price", "duration_min")
+        direct_flights = by_price[offers.stops[by_price] == 0]
+        connecting_flights = by_price[offers.stops[by_price] > 0]
+        return (list(direct_flights[:3]) + list(connecting_flights[:1]))[:4]
+
+    @staticmethod
+    def _airline_url(origin_iata: str, dest_iata: str, date: str, airline_name: str) -> str:
+        return f"https://www.google.com/travel/flights?q=flights+from+{origin_iata}+to+{dest_iata}+on+{date}+{airline_name.replace(' ', '+')}"
+
+    def _option(self, offers: FlightOffers, i: int, origin_iata: str, dest_iata: str, date: str) -> dict:
+        carrier_code = str(offers.carrier[i]) or "Unknown"
+        airline_name = AIRLINE_MAP.get(carrier_code, f"{carrier_code} Airlines")
+        return offers.option(i, booking_url=self._airline_url(origin_iata, dest_iata, date, airline_name), airline_names=AIRLINE_MAP)
+
+    def _live_options(self, origin_iata: str, dest_iata: str, date: str, end_date: str, travelers: int):
+        """Amadeus (outbound, return) options; return is empty for one-way trips"""
+        if not end_date:
+            data = amadeus_client._search_offers(origin_iata, dest_iata, date, travelers)
+            return self._parse_amadeus_response(data, None, None, date, origin_iata, dest_iata), []
+        found = amadeus_client.search_round_trip(origin_iata, dest_iata, date, end_date, travelers)
+        if found["combined"]:
+            return self._parse_round_trip(found["outbound"], origin_iata, dest_iata, date, end_date)
+        return (self._parse_amadeus_response(found["outbound"], None, None, date, origin_iata, dest_iata),
+                self._parse_amadeus_response(found["return"], None, None, end_date, dest_iata, origin_iata))
     
     def _parse_connecting_flights(self, connecting_options: List[Dict], origin: str, dest: str, date: str, origin_iata: str, dest_iata: str) -> List[dict]:
         """Parse connecting flight options and return only best 3-4 options"""
@@ -334,92 +468,81 @@ class FlightSearchTool(BaseTool):
         
         print(f"[DEBUG] Parsing {len(best_options)} best connecting flight options")
         
+        def clock(segment, side):
+            at = segment.get(side, {}).get("at", "")
+            return at.split("T")[1][:5] if "T" in at else "N/A"
+        
         for idx, option in enumerate(best_options):
             try:
-                hub = option["hub"]
-                leg1 = option["leg1"]
-                leg2 = option["leg2"]
+                hubs = option.get("hubs") or [option["hub"]]
+                legs = option.get("legs") or [option["leg1"], option["leg2"]]
                 total_price = option["total_price"]
                 
-                # Get airline info for both legs
-                segments1 = leg1.get("itineraries", [{}])[0].get("segments", [])
-                segments2 = leg2.get("itineraries", [{}])[0].get("segments", [])
-                
-                if not segments1 or not segments2:
+                # Get airline info for every leg
+                leg_segments = [leg.get("itineraries", [{}])[0].get("segments", []) for leg in legs]
+                if not all(leg_segments):
                     print(f"[DEBUG] Skipping option {idx}: missing segments")
                     continue
                 
                 # Extract carrier codes and map to airline names
-                carrier1 = segments1[0].get("carrierCode", "Unknown")
-                carrier2 = segments2[0].get("carrierCode", "Unknown")
-                airline1 = AIRLINE_MAP.get(carrier1, f"{carrier1} Airlines")
-                airline2 = AIRLINE_MAP.get(carrier2, f"{carrier2} Airlines")
-                
-                # Get flight numbers
-                flight_num1 = segments1[0].get("number", "")
-                flight_num2 = segments2[0].get("number", "")
+                carriers = [segments[0].get("carrierCode", "Unknown") for segments in leg_segments]
+                airlines = [AIRLINE_MAP.get(c, f"{c} Airlines") for c in carriers]
                 
-                # Calculate total duration
-                try:
-                    dep1_time = segments1[0].get("departure", {}).get("at", "")
-                    arr2_time = segments2[-1].get("arrival", {}).get("at", "")
-                    
-                    if dep1_time and arr2_time:
+                # Total duration (flying + layovers) comes from the route graph when available
+                total_duration = option.get("duration_hours")
+                if total_duration is None:
+                    try:
+                        dep1_time = leg_segments[0][0].get("departure", {}).get("at", "")
+                        arr2_time = leg_segments[-1][-1].get("arrival", {}).get("at", "")
                         dep1_dt = datetime.fromisoformat(dep1_time.replace('Z', '+00:00'))
                         arr2_dt = datetime.fromisoformat(arr2_time.replace('Z', '+00:00'))
                         total_duration = (arr2_dt - dep1_dt).total_seconds() / 3600
-                    else:
+                    except:
                         total_duration = 0.0
-                except:
-                    total_duration = 0.0
                 
                 # Get departure and arrival times
-                dep_time = segments1[0].get("departure", {}).get("at", "").split("T")[1][:5] if segments1[0].get("departure", {}).get("at") else "N/A"
-                arr_time = segments2[-1].get("arrival", {}).get("at", "").split("T")[1][:5] if segments2[-1].get("arrival", {}).get("at") else "N/A"
+                dep_time = clock(leg_segments[0][0], "departure")
+                arr_time = clock(leg_segments[-1][-1], "arrival")
                 
-                specific_url = f"https://www.google.com/travel/flights?q=flights+from+{origin_iata}+to+{hub}+to+{dest_iata}+on+{date}"
+                route = "+to+".join([origin_iata] + hubs + [dest_iata])
+                specific_url = f"https://www.google.com/travel/flights?q=flights+from+{route}+on+{date}"
                 
                 # Build detailed airline display
-                airline_display = f"{airline1}"
-                if airline1 != airline2:
-                    airline_display = f"{airline1} → {airline2}"
-                airline_display += f" (via {hub})"
+                distinct_airlines = list(dict.fromkeys(airlines))
+                airline_display = " → ".join(distinct_airlines) + f" (via {', '.join(hubs)})"
+                
+                stops = [origin_iata] + hubs + [dest_iata]
+                segments_info = []
+                for leg_num, (segments, airline, carrier) in enumerate(zip(leg_segments, airlines, carriers), start=1):
+                    flight_num = segments[0].get("number", "")
+                    segments_info.append({
+                        "leg": leg_num,
+                        "airline": airline,
+                        "flight_number": f"{carrier}{flight_num}" if flight_num else carrier,
+                        "from": segments[0].get("departure", {}).get("iataCode", stops[leg_num - 1]),
+                        "to": segments[-1].get("arrival", {}).get("iataCode", stops[leg_num]),
+                        "departure": clock(segments[0], "departure"),
+                        "arrival": clock(segments[-1], "arrival")
+                    })
                 
                 # Create flight option with detailed segment info
                 flight_option = {
                     "airline": airline_display,
                     "price_usd": int(total_price),
                     "duration_hours": round(total_duration, 1) if total_duration > 0 else 0.0,
-                    "stops": 1,
+                    "stops": sum(len(segments) for segments in leg_segments) - 1,
                     "booking_url": specific_url,
                     "departure_time": dep_time,
                     "arrival_time": arr_time,
-                    "flight_type": f"connecting via {hub}",
-                    "segments": [
-                        {
-                            "leg": 1,
-                            "airline": airline1,
-                            "flight_number": f"{carrier1}{flight_num1}" if flight_num1 else carrier1,
-                            "from": origin_iata,
-                            "to": hub,
-                            "departure": dep_time,
-                            "arrival": segments1[-1].get("arrival", {}).get("at", "").split("T")[1][:5] if segments1[-1].get("arrival", {}).get("at") else "N/A"
-                        },
-                        {
-                            "leg": 2,
-                            "airline": airline2,
-                            "flight_number": f"{carrier2}{flight_num2}" if flight_num2 else carrier2,
-                            "from": hub,
-                            "to": dest_iata,
-                            "departure": segments2[0].get("departure", {}).get("at", "").split("T")[1][:5] if segments2[0].get("departure", {}).get("at") else "N/A",
-                            "arrival": arr_time
-                        }
-                    ]
+                    "flight_type": f"connecting via {', '.join(hubs)}",
+                    "segments": segments_info
                 }
+                if option.get("layover_minutes"):
+                    flight_option["layover_minutes"] = option["layover_minutes"]
                 
                 flights.append(flight_option)
                 
-                print(f"[DEBUG] Connecting flight {idx+1}: {origin_iata}→{hub}→{dest_iata} via {airline_display} - ${total_price}")
+                print(f"[DEBUG] Connecting flight {idx+1}: {'→'.join(stops)} via {airline_display} - ${total_price}")
                 
             except Exception as e:
                 print(f"[DEBUG] Error parsing connecting flight {idx}: {e}")
@@ -428,6 +551,31 @@ class FlightSearchTool(BaseTool):
         print(f"[DEBUG] Successfully parsed {len(flights)} connecting flights")
         return flights
 
+# =====================================================
+# BOOKING.COM DESTINATION IDS
+# =====================================================
+def _fetch_destination_info(city_name: str, api_key: str) -> dict:
+    """Booking.com locations lookup: None if the name is unknown, raises if the API fails"""
+    url = "https://booking-com.p.rapidapi.com/v1/hotels/locations"
+    headers = {"X-RapidAPI-Key": api_key, "X-RapidAPI-Host": "booking-com.p.rapidapi.com"}
+    res = http_client.get(url, headers=headers, params={"name": city_name, "locale": "en-gb"}, timeout=10)
+    res.raise_for_status()
+    data = res.json()
+    for item in data:
+        if item.get("dest_type") == "city": return {"dest_id": item.get("dest_id"), "dest_type": item.get("dest_type")}
+    if data: return {"dest_id": data[0].get("dest_id"), "dest_type": data[0].get("dest_type")}
+    return None
+
+def preload_destination_ids(names=TOP_DESTINATIONS) -> int:
+    """Resolve popular destinations ahead of time (only those not already indexed)"""
+    api_key = os.getenv("RAPIDAPI_KEY")
+    if not api_key or not upstreams.available("rapidapi"): return 0
+    return destination_ids.preload(names, lambda name: _fetch_destination_info(name, api_key))
+
+def _hotel_fallback(result: dict) -> bool:
+    """Google Hotels placeholders: cached briefly so Booking.com is retried soon"""
+    return not result or result.get("source") == "Google Hotels Fallback"
+
 # =====================================================
 # HOTEL SEARCH TOOL (Fallback to Google Hotels)
 # =====================================================
@@ -451,19 +599,22 @@ class HotelSearchTool(BaseTool):
             checkout = (cin + timedelta(days=1)).strftime("%Y-%m-%d")
 
         print(f"[Hotel] Request: {destination} ({checkin} to {checkout})")
-        
+        return self._search(destination, checkin, checkout)
+
+    # Past 4h the result is served stale (up to 4h more) while a background search refreshes it
+    @cached("hotels", ttl_hours=4, stale_hours=4, is_empty=_hotel_fallback)
+    def _search(self, destination: str, checkin: str, checkout: str) -> dict:
+        """Booking.com results, or Google Hotels fallback options"""
         # 🚀 GOOGLE HOTELS DEEP LINK WITH DATES
         # Format: https://www.google.com/travel/hotels?q=hotels+in+Tokyo&checkin=2026-01-02&checkout=2026-01-06
         google_hotels_link = f"https://www.google.com/travel/hotels?q=hotels+in+{destination.replace(' ', '+')}&checkin={checkin}&checkout={checkout}"
-        
-        # Check Cache
-        cache_key = cache._generate_key("hotels", destination, checkin)
-        if cache.get(cache_key): return cache.get(cache_key)
 
         rapidapi_key = os.getenv("RAPIDAPI_KEY")
         hotel_options = []
 
-        if rapidapi_key:
+        if rapidapi_key and not upstreams.available("rapidapi"):
+            print(f"[HOTEL] ⚠️ Booking.com API circuit open, skipping to Google Hotels")
+        elif rapidapi_key:
             dest_info = self._get_destination_info(destination, rapidapi_key)
             if dest_info:
                 # Attempt Search (Relaxed)
@@ -507,22 +658,11 @@ class HotelSearchTool(BaseTool):
                 "booking_url": google_hotels_link, 
                 "source": "Booking.com API"
             }
-            
-        cache.set(cache_key, result, ttl_hours=4)
         return result
     
     def _get_destination_info(self, city_name: str, api_key: str) -> dict:
-        try:
-            url = "https://booking-com.p.rapidapi.com/v1/hotels/locations"
-            headers = {"X-RapidAPI-Key": api_key, "X-RapidAPI-Host": "booking-com.p.rapidapi.com"}
-            res = requests.get(url, headers=headers, params={"name": city_name, "locale": "en-gb"}, timeout=10)
-            if res.status_code == 200:
-                data = res.json()
-                for item in data:
-                    if item.get("dest_type") == "city": return {"dest_id": item.get("dest_id"), "dest_type": item.get("dest_type")}
-                if data: return {"dest_id": data[0].get("dest_id"), "dest_type": data[0].get("dest_type")}
-            return None
-        except: return None
+        # Persistent index: dest_ids practically never change, so most searches skip this call
+        return destination_ids.lookup(city_name, lambda name: _fetch_destination_info(name, api_key))
 
     def _search_booking_api(self, dest_id: str, dest_type: str, checkin: str, checkout: str, api_key: str) -> dict:
         try:
@@ -530,9 +670,9 @@ class HotelSearchTool(BaseTool):
             headers = {"X-RapidAPI-Key": api_key, "X-RapidAPI-Host": "booking-com.p.rapidapi.com"}
             # Minimal Params to ensure results
             params = {"dest_id": dest_id, "dest_type": dest_type, "checkin_date": checkin, "checkout_date": checkout, "units": "metric", "sort_order": "popularity", "locale": "en-gb"}
-            response = requests.get(url, headers=headers, params=params, timeout=15)
-            return response.json() if response.status_code == 200 else {}
-        except: return {}
+            response = http_client.get(url, headers=headers, params=params)
+            return response.json() if response.status_code == 200 else {"error": f"API {response.status_code}"}
+        except Exception as e: return {"error": str(e)}
     
     def _parse_booking_response(self, data: dict, destination_name: str) -> List[dict]:
         hotels = []
@@ -566,13 +706,7 @@ class HotelSearchTool(BaseTool):
                     link = f"https://www.booking.com/searchresults.html?ss={destination_name.replace(' ', '+')}&aid=304142"
                 
                 # Get pricing
-                price_val = 0
-                if "min_total_price" in hotel: 
-                    price_val = hotel.get("min_total_price")
-                elif "composite_price_breakdown" in hotel: 
-                    price_val = hotel["composite_price_breakdown"].get("gross_amount", {}).get("value", 0)
-                elif "price_breakdown" in hotel:
-                    price_val = hotel["price_breakdown"].get("all_inclusive_price", 0)
+                price_val = self._hotel_price(hotel)
                 
                 # Get address
                 address = hotel.get("address", "")
@@ -607,5 +741,74 @@ class HotelSearchTool(BaseTool):
         
         return hotels
 
+    @staticmethod
+    def _hotel_price(hotel: dict) -> float:
+        price_val = 0
+        if "min_total_price" in hotel: 
+            price_val = hotel.get("min_total_price")
+        elif "composite_price_breakdown" in hotel: 
+            price_val = hotel["composite_price_breakdown"].get("gross_amount", {}).get("value", 0)
+        elif "price_breakdown" in hotel:
+            price_val = hotel["price_breakdown"].get("all_inclusive_price", 0)
+        return float(price_val or 0)
+
+    def price_calendar(self, query: dict, days: int = 3) -> dict:
+        """
+        Cheapest hotel price for each check-in date within +-days of start_date,
+        keeping the stay length fixed. Served from the shared route x date matrix.
+        """
+        destination = query.get('destination')
+        checkin = get_safe_date(query.get('start_date'))
+        raw_end = query.get('end_date')
+        checkout = get_safe_date(raw_end) if raw_end and str(raw_end).lower() not in ["none", "", "null"] else shift_date(checkin, 1)
+        nights = max(1, (datetime.strptime(checkout, "%Y-%m-%d") - datetime.strptime(checkin, "%Y-%m-%d")).days)
+        calendar = {"destination": destination, "nights": nights, "prices": {}, "cheapest": []}
+
+        rapidapi_key = os.getenv("RAPIDAPI_KEY")
+        if not destination or not rapidapi_key or not upstreams.available("rapidapi"):
+            return calendar
+        dest_info = self._get_destination_info(destination, rapidapi_key)
+        if not dest_info:
+            return calendar
+
+        def cheapest_stay(day):
+            data = self._search_booking_api(dest_info['dest_id'], dest_info['dest_type'], day, shift_date(day, nights), rapidapi_key)
+            if "error" in data: raise RuntimeError(data["error"])  # not cached as "no offers"
+            prices = [p for p in map(self._hotel_price, data.get("result", [])) if p > 0]
+            return min(prices) if prices else None
+
+        route = ("hotel", dest_info['dest_id'], nights)
+        calendar["prices"] = price_calendar.sweep(route, date_window(checkin, days), cheapest_stay)
+        calendar["cheapest"] = [dp._asdict() for dp in price_calendar.cheapest(calendar["prices"])]
+        return calendar
+
 search_flights = FlightSearchTool()
-search_hotels = HotelSearchTool()
\ No newline at end of file
+search_hotels = HotelSearchTool()
+def flexible_dates(query: dict, days: int = 3, top: int = 3) -> List[Dict]:
+    """
+    Cheapest departure dates within +-days of start_date, flight and hotel
+    calendars swept concurrently. A date is ranked only when every source
+    that returned prices has a price for it.
+    """
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        flights = pool.submit(search_flights.price_calendar, query, days)
+        hotels = pool.submit(search_hotels.price_calendar, query, days)
+        flight_prices, hotel_prices = flights.result()["prices"], hotels.result()["prices"]
+        nights = flights.result()["nights"]
+
+    sources = [prices for prices in (flight_prices, hotel_prices) if any(p is not None for p in prices.values())]
+    if not sources:
+        return []
+    options = []
+    for date in sorted(set().union(*sources)):
+        if any(prices.get(date) is None for prices in sources):
+            continue
+        flight, hotel = flight_prices.get(date), hotel_prices.get(date)
+        options.append({
+            "date": date,
+            "return_date": shift_date(date, nights) if nights is not None else None,
+            "flight_price_usd": int(flight) if flight is not None else None,
+            "hotel_price_usd": int(hotel) if hotel is not None else None,
+            "total_usd": int((flight or 0) + (hotel or 0)),
+        })
+    return sorted(options, key=lambda o: (o["total_usd"], o["date"]))[:top]
@@ -1,10 +1,12 @@
 # tools/search_tools.py
 import os
-import requests
+from typing import Optional
 from crewai.tools import BaseTool
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.cache_manager import cache
+from utils.cache_manager import cached
+from utils.http_client import http_client
+from utils.upstream_guard import upstreams
 
 # =====================================================
 # FAST WEB SEARCH (Serper API - Replace DuckDuckGo)
@@ -15,56 +17,49 @@ class WebSearchTool(BaseTool):
 
     def _run(self, query: str) -> str:
         """Search the web with caching"""
-        # Generate cache key
-        cache_key = cache._generate_key("web_search", query)
-        
-        # Check cache first
-        cached = cache.get(cache_key)
-        if cached:
-            print(f"[WebSearch] Cache HIT: {query}")
-            return cached
-        
+        if not os.getenv("SERPER_API_KEY"):
+            print("[WebSearch] SERPER_API_KEY not found, using fallback")
+            return self._fallback_search(query)
+        if not upstreams.available("serper"):
+            print("[WebSearch] Serper circuit open, using fallback")
+            return self._fallback_search(query)
+
         try:
-            api_key = os.getenv("SERPER_API_KEY")
-            if not api_key:
-                print("[WebSearch] SERPER_API_KEY not found, using fallback")
-                return self._fallback_search(query)
-            
-            print(f"[WebSearch] Querying: {query}")
-            
-            url = "https://google.serper.dev/search"
-            headers = {
-                "X-API-KEY": api_key,
-                "Content-Type": "application/json"
-            }
-            payload = {
-                "q": query,
-                "num": 5  # Only top 5 results
-            }
-            
-            response = requests.post(url, json=payload, headers=headers, timeout=5)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Extract results
-                results = []
-                for item in data.get("organic", [])[:3]:
-                    title = item.get("title", "")
-                    snippet = item.get("snippet", "")
-                    results.append(f"• {title}: {snippet}")
-                
-                output = "\n".join(results) if results else "No results found."
-                
-                # Cache for 6 hours
-                cache.set(cache_key, output, ttl_hours=6)
-                return output
-            else:
-                return self._fallback_search(query)
-                
+            return self._search(query) or self._fallback_search(query)
         except Exception as e:
             print(f"[WebSearch] Error: {e}")
             return self._fallback_search(query)
+
+    # Cache for 6 hours; failed searches are retried after a short negative TTL
+    @cached("web_search", ttl_hours=6)
+    def _search(self, query: str) -> Optional[str]:
+        """Top Serper results, None on a non-200 response"""
+        print(f"[WebSearch] Querying: {query}")
+
+        url = "https://google.serper.dev/search"
+        headers = {
+            "X-API-KEY": os.getenv("SERPER_API_KEY"),
+            "Content-Type": "application/json"
+        }
+        payload = {
+            "q": query,
+            "num": 5  # Only top 5 results
+        }
+
+        response = http_client.post(url, json=payload, headers=headers, retry_post=True)  # Search is idempotent
+        if response.status_code != 200:
+            return None
+
+        data = response.json()
+
+        # Extract results
+        results = []
+        for item in data.get("organic", [])[:3]:
+            title = item.get("title", "")
+            snippet = item.get("snippet", "")
+            results.append(f"• {title}: {snippet}")
+
+        return "\n".join(results) if results else "No results found."
     
     def _fallback_search(self, query: str) -> str:
         """Fallback when API is unavailable"""
@@ -79,44 +74,34 @@ class WikipediaSearchTool(BaseTool):
 
     def _run(self, title: str) -> str:
         """Fetch Wikipedia summary with aggressive caching"""
-        # Generate cache key
-        cache_key = cache._generate_key("wikipedia", title)
-        
-        # Check cache (Wikipedia data is very stable, cache for 1 week)
-        cached = cache.get(cache_key)
-        if cached:
-            print(f"[Wikipedia] Cache HIT: {title}")
-            return cached
-        
+        title_clean = title.replace(" ", "_")
         try:
-            title_clean = title.replace(" ", "_")
-            api_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{title_clean}"
-            headers = {
-                "User-Agent": "TripPlanner/2.0 (Educational)",
-                "Accept": "application/json"
-            }
-
-            print(f"[Wikipedia] Fetching: {title_clean}")
-            response = requests.get(api_url, headers=headers, timeout=5)
-
-            if response.status_code == 200:
-                data = response.json()
-                extract = data.get("extract", "").strip()
-                
-                if extract:
-                    # Cache for 1 week (Wikipedia data changes slowly)
-                    cache.set(cache_key, extract, ttl_hours=168)
-                    return extract
-            
-            # Fallback message
-            fallback = f"Information about {title} is available on Wikipedia at: https://en.wikipedia.org/wiki/{title_clean}"
-            cache.set(cache_key, fallback, ttl_hours=24)
-            return fallback
-
+            extract = self._summary(title_clean)
         except Exception as e:
             print(f"[Wikipedia] Error: {e}")
             return f"Unable to fetch Wikipedia data for {title}."
 
+        if extract:
+            return extract
+        # Fallback message
+        return f"Information about {title} is available on Wikipedia at: https://en.wikipedia.org/wiki/{title_clean}"
+
+    # Wikipedia data changes slowly: cache for 1 week, missing articles for a day
+    @cached("wikipedia", ttl_hours=168, empty_ttl_hours=24)
+    def _summary(self, title_clean: str) -> Optional[str]:
+        """Article summary, None if there is none"""
+        api_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{title_clean}"
+        headers = {
+            "User-Agent": "TripPlanner/2.0 (Educational)",
+            "Accept": "application/json"
+        }
+
+        print(f"[Wikipedia] Fetching: {title_clean}")
+        response = http_client.get(api_url, headers=headers)
+        if response.status_code != 200:
+            return None
+        return response.json().get("extract", "").strip() or None
+
 # =====================================================
 # FAST WEATHER LOOKUP (Reduced Timeout)
 # =====================================================
@@ -126,51 +111,45 @@ class WeatherLookupTool(BaseTool):
 
     def _run(self, destination: str, start_date: str = None, end_date: str = None) -> str:
         """Get weather with caching"""
-        # Generate cache key
-        cache_key = cache._generate_key("weather", destination)
-        
-        # Check cache (weather data valid for 3 hours)
-        cached = cache.get(cache_key)
-        if cached:
-            print(f"[Weather] Cache HIT: {destination}")
-            return cached
-        
+        if not os.getenv("OPENWEATHER_API_KEY"):
+            return "[Weather] API key not configured. Check weather manually."
+
+        city = destination.split(",")[0].strip()
         try:
-            api_key = os.getenv("OPENWEATHER_API_KEY")
-            if not api_key:
-                return "[Weather] API key not configured. Check weather manually."
-            
-            city = destination.split(",")[0].strip()
-            url = f"https://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric"
-            
-            print(f"[Weather] Fetching: {city}")
-            response = requests.get(url, timeout=3)  # Fast timeout
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                if "weather" in data and "main" in data:
-                    desc = data["weather"][0]["description"].capitalize()
-                    temp = data["main"].get("temp")
-                    feels_like = data["main"].get("feels_like")
-                    humidity = data["main"].get("humidity")
-                    
-                    result = (
-                        f"{city} weather: {desc}, {temp}°C "
-                        f"(feels like {feels_like}°C), humidity {humidity}%. "
-                        f"Pack accordingly for your trip."
-                    )
-                    
-                    # Cache for 3 hours
-                    cache.set(cache_key, result, ttl_hours=3)
-                    return result
-            
-            return f"Weather data unavailable for {city}. Check local forecasts."
-            
+            result = self._current(city)
         except Exception as e:
             print(f"[Weather] Error: {e}")
             return f"Unable to fetch weather for {destination}."
 
+        return result or f"Weather data unavailable for {city}. Check local forecasts."
+
+    # Weather data valid for 3 hours
+    @cached("weather", ttl_hours=3)
+    def _current(self, city: str) -> Optional[str]:
+        """Current conditions for a city, None if OpenWeather has none"""
+        api_key = os.getenv("OPENWEATHER_API_KEY")
+        url = f"https://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric"
+
+        print(f"[Weather] Fetching: {city}")
+        response = http_client.get(url)  # Fast timeout (see HOST_TIMEOUTS)
+        if response.status_code != 200:
+            return None
+
+        data = response.json()
+        if "weather" not in data or "main" not in data:
+            return None
+
+        desc = data["weather"][0]["description"].capitalize()
+        temp = data["main"].get("temp")
+        feels_like = data["main"].get("feels_like")
+        humidity = data["main"].get("humidity")
+
+        return (
+            f"{city} weather: {desc}, {temp}°C "
+            f"(feels like {feels_like}°C), humidity {humidity}%. "
+            f"Pack accordingly for your trip."
+        )
+
 # =====================================================
 # STATIC SAFETY ADVISORY (No API Call)
 # =====================================================
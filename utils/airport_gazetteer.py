@@ -0,0 +1,294 @@
+# utils/airport_gazetteer.py
+"""
+Airport Gazetteer
+Offline city/airport -> IATA resolution over a bundled airport dataset:
+exact and alias lookup, fuzzy matching for misspellings, and k-nearest
+airport search through a KD-tree.
+"""
+
+import csv
+import difflib
+import heapq
+import math
+import os
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from utils.attraction_gazetteer import CITY_ALIASES, COUNTRY_ALIASES, DATA_DIR, tokenize
+
+AIRPORTS_PATH = os.path.join(DATA_DIR, "airports.csv")
+EARTH_RADIUS_KM = 6371.0
+
+# Spellings that differ from the dataset's city names. Cities without an
+# airport of their own map to the city whose airport serves them.
+AIRPORT_CITY_ALIASES = {
+    **CITY_ALIASES,
+    "makkah": "Jeddah", "mecca": "Jeddah", "madinah": "Medina", "giza": "Cairo",
+    "rawalpindi": "Islamabad", "calcutta": "Kolkata", "madras": "Chennai",
+    "bengaluru": "Bangalore", "cochin": "Kochi", "trivandrum": "Thiruvananthapuram",
+    "peking": "Beijing", "canton": "Guangzhou", "macao": "Macau",
+    "denpasar": "Bali", "kuwait": "Kuwait City", "marrakesh": "Marrakech", "fez": "Fes",
+    "kiev": "Kyiv", "st petersburg": "Saint Petersburg", "napoli": "Naples",
+    "koln": "Cologne", "sevilla": "Seville", "bruxelles": "Brussels",
+    "nur sultan": "Astana", "al ula": "AlUla", "goreme": "Cappadocia",
+    "mallorca": "Palma de Mallorca", "majorca": "Palma de Mallorca",
+}
+
+# States, provinces and nations that qualify a city name ("Paris, Texas").
+# A region that contradicts the matched city's country rejects the match.
+REGION_COUNTRIES = {
+    **{state: "United States" for state in (
+        "alabama", "alaska", "arizona", "arkansas", "california", "colorado", "connecticut",
+        "delaware", "florida", "georgia", "hawaii", "idaho", "illinois", "indiana", "iowa",
+        "kansas", "kentucky", "louisiana", "maine", "maryland", "massachusetts", "michigan",
+        "minnesota", "mississippi", "missouri", "montana", "nebraska", "nevada", "new hampshire",
+        "new jersey", "new mexico", "new york", "north carolina", "north dakota", "ohio",
+        "oklahoma", "oregon", "pennsylvania", "rhode island", "south carolina", "south dakota",
+        "tennessee", "texas", "utah", "vermont", "virginia", "washington", "west virginia",
+        "wisconsin", "wyoming",
+    )},
+    **{province: "Canada" for province in (
+        "alberta", "british columbia", "manitoba", "new brunswick", "newfoundland",
+        "nova scotia", "ontario", "prince edward island", "quebec", "saskatchewan", "yukon",
+    )},
+    **{state: "Australia" for state in (
+        "new south wales", "queensland", "south australia", "tasmania", "victoria",
+        "western australia", "northern territory",
+    )},
+    **{state: "India" for state in (
+        "telangana", "andhra pradesh", "maharashtra", "karnataka", "tamil nadu", "kerala",
+        "gujarat", "rajasthan", "uttar pradesh", "west bengal", "goa", "bihar",
+    )},
+    **{province: "Pakistan" for province in (
+        "sindh", "balochistan", "khyber pakhtunkhwa", "gilgit baltistan",
+    )},
+    "wales": "United Kingdom", "northern ireland": "United Kingdom",
+}
+
+
+class Airport(NamedTuple):
+    iata: str
+    name: str
+    city: str
+    country: str
+    metro: str      # Multi-airport city code (LON, NYC, ...) or ""
+    lat: float
+    lon: float
+
+
+def _unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    lat, lon = math.radians(lat), math.radians(lon)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def _chord_to_km(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+class KDTree:
+    """
+    Static 3-d tree over points on the unit sphere.
+
+    Straight-line (chord) distance between unit vectors is monotonic in
+    great-circle distance, so nearest neighbours need no trigonometry in the
+    inner loop and there are no special cases at the poles or antimeridian.
+    """
+
+    def __init__(self, points: Sequence[Tuple[float, float, float]]):
+        self.points = list(points)
+        # Flat node arrays: point index, split axis, left and right child
+        self._idx: List[int] = []
+        self._axis: List[int] = []
+        self._left: List[int] = []
+        self._right: List[int] = []
+        self._root = self._build(list(range(len(self.points))), 0)
+
+    def _build(self, indices: List[int], depth: int) -> int:
+        if not indices:
+            return -1
+        axis = depth % 3
+        indices.sort(key=lambda i: self.points[i][axis])
+        mid = len(indices) // 2
+        node = len(self._idx)
+        self._idx.append(indices[mid])
+        self._axis.append(axis)
+        self._left.append(-1)
+        self._right.append(-1)
+        self._left[node] = self._build(indices[:mid], depth + 1)
+        self._right[node] = self._build(indices[mid + 1:], depth + 1)
+        return node
+
+    def query(self, point: Tuple[float, float, float], k: int = 1) -> List[Tuple[float, int]]:
+        """k nearest points as (squared chord distance, index), nearest first"""
+        heap: List[Tuple[float, int]] = []  # max-heap of (-dist2, index)
+        points, idx, axes, left, right = self.points, self._idx, self._axis, self._left, self._right
+
+        def visit(node: int):
+            if node < 0:
+                return
+            p = points[idx[node]]
+            d2 = (p[0] - point[0]) ** 2 + (p[1] - point[1]) ** 2 + (p[2] - point[2]) ** 2
+            if len(heap) < k:
+                heapq.heappush(heap, (-d2, idx[node]))
+            elif d2 < -heap[0][0]:
+                heapq.heapreplace(heap, (-d2, idx[node]))
+            diff = point[axes[node]] - p[axes[node]]
+            near, far = (left[node], right[node]) if diff < 0 else (right[node], left[node])
+            visit(near)
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visit(far)
+
+        visit(self._root)
+        return sorted((-d, i) for d, i in heap)
+
+
+class AirportGazetteer:
+    """In-memory airport index: city/alias/IATA lookup and nearest-airport search"""
+
+    def __init__(self, airports: List[Airport], city_aliases: Dict[str, str] = None):
+        self.airports = airports
+        self.by_iata: Dict[str, Airport] = {a.iata: a for a in airports}
+        self.metros: Dict[str, List[Airport]] = {}
+        self._city_code: Dict[str, str] = {}
+        self._country_code: Dict[str, str] = {}
+
+        for a in airports:
+            if a.metro:
+                self.metros.setdefault(a.metro, []).append(a)
+            # The first airport listed for a city is its primary one
+            self._city_code.setdefault(a.city.lower(), a.metro or a.iata)
+            self._country_code.setdefault(a.country.lower(), a.metro or a.iata)
+
+        # name tokens -> code; aliases first so they override, then cities,
+        # countries (their primary airport) and full airport names
+        self._index: Dict[Tuple[str, ...], str] = {}
+        for alias, city in (city_aliases or {}).items():
+            if city.lower() in self._city_code:
+                self._index[tuple(tokenize(alias))] = self._city_code[city.lower()]
+        for alias, country in COUNTRY_ALIASES.items():
+            if country.lower() in self._country_code:
+                self._index.setdefault(tuple(tokenize(alias)), self._country_code[country.lower()])
+        for city, code in self._city_code.items():
+            self._index.setdefault(tuple(tokenize(city)), code)
+        for a in airports:
+            # "San Jose, Costa Rica" vs "San Jose" (California)
+            self._index.setdefault(tuple(tokenize(f"{a.city} {a.country}")), a.metro or a.iata)
+        for country, code in self._country_code.items():
+            self._index.setdefault(tuple(tokenize(country)), code)
+        for a in airports:
+            self._index.setdefault(tuple(tokenize(a.name)), a.iata)
+        self._max_ngram = max(len(k) for k in self._index)
+        self._fuzzy_keys = {" ".join(k): code for k, code in self._index.items()}
+        self._countries = {tuple(tokenize(c)) for c in self._country_code} | \
+                          {tuple(tokenize(a)) for a in COUNTRY_ALIASES}
+        # country / alias / region tokens -> countries they can mean ("georgia": the country or the state)
+        self._places: Dict[Tuple[str, ...], Set[str]] = {}
+        for name, country in [(c, c) for c in self._country_code] + list(COUNTRY_ALIASES.items()) + \
+                list(REGION_COUNTRIES.items()):
+            self._places.setdefault(tuple(tokenize(name)), set()).add(country.lower())
+        self._max_place_ngram = max(len(k) for k in self._places)
+
+        self._tree = KDTree([_unit_vector(a.lat, a.lon) for a in airports])
+
+    @classmethod
+    def from_csv(cls, path: str = AIRPORTS_PATH, city_aliases: Dict[str, str] = None) -> "AirportGazetteer":
+        with open(path, newline="", encoding="utf-8") as f:
+            airports = [
+                Airport(row["iata"], row["name"], row["city"], row["country"], row["metro"],
+                        float(row["lat"]), float(row["lon"]))
+                for row in csv.DictReader(f)
+            ]
+        return cls(airports, AIRPORT_CITY_ALIASES if city_aliases is None else city_aliases)
+
+    def is_code(self, code: str) -> bool:
+        return code in self.by_iata or code in self.metros
+
+    def airports_for(self, code: str) -> List[Airport]:
+        """Airports behind an airport or metro code"""
+        if code in self.metros:
+            return list(self.metros[code])
+        return [self.by_iata[code]] if code in self.by_iata else []
+
+    def airport_codes(self, code: str) -> Set[str]:
+        """Airport codes behind a code ({"LHR", "LGW", ...} for LON); unknown codes map to themselves"""
+        return {a.iata for a in self.airports_for(code)} or {code}
+
+    def lookup(self, query: str) -> Optional[str]:
+        """
+        IATA city/airport code for a free-form place name, or None.
+
+        Tries, in order: an IATA code typed as-is, the whole name, the
+        longest known city inside it ("Lahore, Pakistan"), and finally a
+        fuzzy match for misspellings ("Istambul"). A country resolves to its
+        primary airport only when it is the whole query: "Springfield, USA"
+        is an unknown city, not New York. A country or region that
+        contradicts the city ("Paris, Texas") makes the name unknown too.
+        """
+        query = (query or "").strip()
+        if len(query) == 3 and query.isalpha() and query.isupper() and self.is_code(query):
+            return query
+        return self._lookup_normalized(" ".join(tokenize(query)))
+
+    @lru_cache(maxsize=4096)
+    def _lookup_normalized(self, normalized: str) -> Optional[str]:
+        tokens = normalized.split()
+        if not tokens:
+            return None
+
+        code = self._index.get(tuple(tokens))
+        if code:
+            return code
+
+        # Word-bounded n-grams, longest first; country names only qualify the city
+        found = []
+        for i in range(len(tokens)):
+            for n in range(min(self._max_ngram, len(tokens) - i), 0, -1):
+                key = tuple(tokens[i:i + n])
+                if key in self._index and key not in self._countries:
+                    found.append((-n, self._index[key], i))
+                    break
+        if found:
+            neg_len, code, i = min(found)
+            if self._contradicted(tokens[:i] + tokens[i - neg_len:], code):
+                return None  # e.g. Hyderabad, Pakistan: not the Indian HYD
+            return code
+
+        if len(tokens) == 1 and len(tokens[0]) == 3 and self.is_code(tokens[0].upper()):
+            return tokens[0].upper()
+
+        close = difflib.get_close_matches(normalized, self._fuzzy_keys, n=1, cutoff=0.85)
+        return self._fuzzy_keys[close[0]] if close else None
+
+    def _contradicted(self, tokens: List[str], code: str) -> bool:
+        """True if the tokens name a country or region none of the code's airports are in"""
+        countries = {a.country.lower() for a in self.airports_for(code)}
+        i = 0
+        while i < len(tokens):
+            for n in range(min(self._max_place_ngram, len(tokens) - i), 0, -1):
+                named = self._places.get(tuple(tokens[i:i + n]))
+                if named is not None:
+                    if not named & countries:
+                        return True
+                    i += n
+                    break
+            else:
+                i += 1
+        return False
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> List[Tuple[Airport, float]]:
+        """k nearest airports to a coordinate as (airport, distance_km)"""
+        hits = self._tree.query(_unit_vector(lat, lon), k=min(k, len(self.airports)))
+        return [(self.airports[i], _chord_to_km(math.sqrt(d2))) for d2, i in hits]
+
+    def nearest_to(self, code: str, k: int = 3) -> List[Tuple[Airport, float]]:
+        """k nearest other airports to an airport or metro code (alternate airports)"""
+        own = self.airports_for(code)
+        if not own:
+            return []
+        codes = {a.iata for a in own}
+        hits = self.nearest(own[0].lat, own[0].lon, k + len(codes))
+        return [(a, km) for a, km in hits if a.iata not in codes][:k]
+
+
+# Global gazetteer instance
+airport_gazetteer = AirportGazetteer.from_csv()
@@ -0,0 +1,295 @@
+# utils/attraction_gazetteer.py
+"""
+Attraction Gazetteer
+Detects off-destination landmarks (LLM hallucinations) in itineraries using a
+compiled Aho-Corasick automaton over a bundled landmark -> city dataset.
+Destinations outside that dataset are placed in their country through the
+bundled airport cities, so day trips within the country are not flagged.
+"""
+
+import csv
+import os
+import re
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+LANDMARKS_PATH = os.path.join(DATA_DIR, "landmarks.csv")
+PLACES_PATH = os.path.join(DATA_DIR, "airports.csv")  # city -> country for destinations without landmarks
+
+# Alternate spellings users and LLMs use for dataset cities/countries
+CITY_ALIASES = {
+    "makkah": "Mecca", "madinah": "Medina", "saigon": "Ho Chi Minh City",
+    "ho chi minh": "Ho Chi Minh City", "bombay": "Mumbai", "new delhi": "Delhi",
+    "new york city": "New York", "nyc": "New York",
+    "washington dc": "Washington", "firenze": "Florence",
+    "roma": "Rome", "venezia": "Venice", "milano": "Milan", "praha": "Prague",
+    "wien": "Vienna", "munchen": "Munich", "lisboa": "Lisbon", "giza": "Cairo",
+}
+
+COUNTRY_ALIASES = {
+    "uae": "United Arab Emirates", "emirates": "United Arab Emirates",
+    "uk": "United Kingdom", "england": "United Kingdom", "scotland": "United Kingdom",
+    "britain": "United Kingdom", "great britain": "United Kingdom",
+    "usa": "United States", "united states of america": "United States",
+    "ksa": "Saudi Arabia", "korea": "South Korea", "holland": "Netherlands",
+    "czechia": "Czech Republic", "turkiye": "Turkey",
+}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, strip accents and split into alphanumeric word tokens"""
+    text = (text or "").lower()
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    return _TOKEN.findall(text)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip accents and collapse punctuation to single spaces"""
+    return " ".join(tokenize(text))
+
+
+class Landmark(NamedTuple):
+    name: str
+    city: str
+    country: str
+    lat: float
+    lon: float
+
+
+class Match(NamedTuple):
+    kind: str       # "landmark", "city", "country" or "place" (city without landmarks)
+    name: str
+    city: Optional[str]
+    country: str
+    start: int
+    end: int
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: finds every pattern in a sequence in a single pass.
+
+    Patterns and texts are sequences of word tokens, so matches always fall
+    on word boundaries and the automaton steps once per word, not per char.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, ...]]):
+        self.patterns = [tuple(p) for p in patterns]
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for pid, pattern in enumerate(self.patterns):
+            state = 0
+            for token in pattern:
+                nxt = self._goto[state].get(token)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][token] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(pid)
+
+        # Breadth-first construction of failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(token, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, tokens: List[str]):
+        """Yield (start, end, pattern_id) token spans for every occurrence, overlaps included"""
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self.patterns
+        root = goto[0]
+        state = 0
+        for i, token in enumerate(tokens):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0) if state else root.get(token, 0)
+            if not state:
+                continue
+            for pid in out[state]:
+                yield i - len(patterns[pid]) + 1, i + 1, pid
+
+
+class AttractionGazetteer:
+    """Landmark, city and country index for destination consistency checks"""
+
+    def __init__(self, landmarks: List[Landmark], places: Dict[str, str] = None):
+        self.landmarks = landmarks
+        self.by_name: Dict[str, Landmark] = {lm.name: lm for lm in landmarks}
+        self.city_country: Dict[str, str] = {}
+        entries: List[Tuple[str, str, Optional[str], str]] = []
+        patterns: List[List[str]] = []
+
+        def add(pattern, kind, name, city, country):
+            pattern = tokenize(pattern)
+            if pattern:
+                patterns.append(pattern)
+                entries.append((kind, name, city, country))
+
+        for lm in landmarks:
+            add(lm.name, "landmark", lm.name, lm.city, lm.country)
+            self.city_country.setdefault(lm.city, lm.country)
+        for city, country in self.city_country.items():
+            add(city, "city", city, city, country)
+        for alias, city in CITY_ALIASES.items():
+            if city in self.city_country:
+                add(alias, "city", city, city, self.city_country[city])
+        places = {p: c for p, c in (places or {}).items() if p not in self.city_country}
+        for place, country in places.items():
+            add(place, "place", place, None, country)
+        for country in set(self.city_country.values()) | set(places.values()):
+            add(country, "country", country, None, country)
+        for alias, country in COUNTRY_ALIASES.items():
+            add(alias, "country", country, None, country)
+
+        self._entries = entries
+        self._matcher = AhoCorasick(patterns)
+
+        # Landmark names embedded in a longer landmark of another city
+        # ("Louvre" inside "Louvre Abu Dhabi") are ambiguous for that city
+        self._ambiguous_in: Dict[str, Set[str]] = {}
+        for pid, (kind, _, city, _) in enumerate(entries):
+            if kind != "landmark":
+                continue
+            pattern = patterns[pid]
+            for start, end, inner in self._matcher.iter_matches(pattern):
+                if inner != pid and self._entries[inner][0] == "landmark":
+                    self._ambiguous_in.setdefault(self._entries[inner][1], set()).add(city)
+
+    @classmethod
+    def from_csv(cls, path: str = LANDMARKS_PATH, places_path: str = PLACES_PATH) -> "AttractionGazetteer":
+        with open(path, newline="", encoding="utf-8") as f:
+            landmarks = [
+                Landmark(row["name"], row["city"], row["country"], float(row["lat"]), float(row["lon"]))
+                for row in csv.DictReader(f)
+            ]
+        places = {}
+        if places_path and os.path.exists(places_path):
+            with open(places_path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    places.setdefault(row["city"], row["country"])
+        return cls(landmarks, places)
+
+    def find(self, text: str, kinds: Tuple[str, ...] = ("landmark",)) -> List[Match]:
+        """Return whole-word, leftmost-longest matches (token spans) of the given kinds"""
+        entries = self._entries
+        candidates = [
+            (start, end, pid)
+            for start, end, pid in self._matcher.iter_matches(tokenize(text))
+            if entries[pid][0] in kinds
+        ]
+        candidates.sort(key=lambda m: (m[0], m[0] - m[1]))
+
+        matches, last_end = [], -1
+        for start, end, pid in candidates:
+            if start < last_end:
+                continue
+            kind, name, city, country = self._entries[pid]
+            matches.append(Match(kind, name, city, country, start, end))
+            last_end = end
+        return matches
+
+    def landmarks_in(self, city: str) -> List[Landmark]:
+        """All landmarks of a city, e.g. as candidates for route planning"""
+        return [lm for lm in self.landmarks if lm.city == city]
+
+    def resolve_destination(self, destination: str) -> Tuple[Set[str], Set[str]]:
+        """Return the (cities, countries) named in a destination string"""
+        cities, countries, _ = self._resolve(destination)
+        return cities, countries
+
+    def _resolve(self, destination: str) -> Tuple[Set[str], Set[str], bool]:
+        """(cities, countries, known): known if a landmark city or a country was named"""
+        cities, countries, known = set(), set(), False
+        for m in self.find(destination or "", kinds=("city", "country", "place")):
+            if m.city:
+                cities.add(m.city)
+            countries.add(m.country)
+            known = known or m.kind != "place"
+        return cities, countries, known
+
+    def is_off_destination(self, match: Match, destination: str, _resolved=None) -> bool:
+        """True if a landmark/city match does not belong to the requested destination"""
+        cities, countries = _resolved or self.resolve_destination(destination)
+        if match.city in cities:
+            return False
+        if match.kind == "landmark" and cities & self._ambiguous_in.get(match.name, set()):
+            return False
+        if countries:
+            # Day trips within the destination country are fine
+            return match.country not in countries
+        return True
+
+    def off_destination_cities(self, text: str, destination: str) -> List[Match]:
+        """Cities mentioned in text that are not part of the requested destination"""
+        resolved = self.resolve_destination(destination)
+        return [m for m in self.find(text, kinds=("city",)) if self.is_off_destination(m, destination, resolved)]
+
+    def check_itinerary(self, daily_plans: list, destination: str, strip: bool = True) -> List[dict]:
+        """
+        Scan every activity title and description in one pass.
+
+        Activities whose title names an off-destination landmark are removed
+        when strip is True; description-only mentions are flagged. Nothing is
+        removed for destinations outside the landmark dataset (a city we only
+        know the country of, or no match at all): their own landmarks may
+        share a name with one elsewhere ("Notre Dame Basilica" in Montreal).
+        Returns the list of findings.
+        """
+        cities, countries, known = self._resolve(destination)
+        resolved = (cities, countries)
+        strip = strip and known
+        findings = []
+
+        for day_plan in daily_plans:
+            activities = day_plan.get("activities", []) if isinstance(day_plan, dict) else day_plan.activities
+            day_num = day_plan.get("day") if isinstance(day_plan, dict) else day_plan.day
+            kept = []
+            for activity in activities:
+                if isinstance(activity, dict):
+                    title, description = activity.get("title", ""), activity.get("description", "")
+                else:
+                    title, description = getattr(activity, "title", ""), getattr(activity, "description", "")
+
+                in_title = [m for m in self.find(title) if self.is_off_destination(m, destination, resolved)]
+                in_desc = [m for m in self.find(description) if self.is_off_destination(m, destination, resolved)]
+                action = "stripped" if in_title and strip else "flagged"
+
+                for m in in_title + in_desc:
+                    findings.append({
+                        "day": day_num,
+                        "activity": title,
+                        "landmark": m.name,
+                        "city": m.city,
+                        "country": m.country,
+                        "action": action,
+                    })
+                if action != "stripped":
+                    kept.append(activity)
+
+            if len(kept) != len(activities):
+                if isinstance(day_plan, dict):
+                    day_plan["activities"] = kept
+                else:
+                    day_plan.activities = kept
+
+        return findings
+
+
+# Global gazetteer instance
+attraction_gazetteer = AttractionGazetteer.from_csv()
@@ -3,9 +3,13 @@ Budget Analysis Utility
 Analyzes trip budget and provides recommendations
 """
 
-from typing import Dict, List
+from typing import Dict, List, Sequence, Union
 from datetime import datetime
 
+import numpy as np
+
+ArrayLike = Union[float, Sequence[float], np.ndarray]
+
 
 class BudgetAnalyzer:
     """Analyzes budget against estimated costs and provides recommendations"""
@@ -137,6 +141,107 @@ class BudgetAnalyzer:
             "suggested_budget": max(user_budget, total_cost + (BudgetAnalyzer.BASELINE_COSTS["budget"]["total_per_day"] * trip_duration_days))
         }
     
+    TIER_LABELS = {
+        "luxury": "Luxury",
+        "moderate": "Comfortable",
+        "budget": "Budget-Friendly",
+        "tight": "Tight Budget"
+    }
+    
+    @staticmethod
+    def analyze_budget_batch(
+        user_budgets: ArrayLike,
+        trip_durations_days: ArrayLike,
+        flight_costs: ArrayLike = 0,
+        hotel_costs: ArrayLike = 0,
+        activities_costs: ArrayLike = 0
+    ) -> Dict[str, np.ndarray]:
+        """
+        Vectorized analyze_budget over arrays of scenarios
+        
+        Inputs broadcast against each other (e.g. budgets[:, None] with
+        durations[None, :] gives a budget x duration grid). Numeric results
+        match analyze_budget element for element.
+        
+        Returns:
+            Dictionary of arrays: tier, tier_label, total_cost, remaining_budget,
+            daily_remaining, utilization_percent, is_sufficient, suggested_budget
+        """
+        budget, days, flight, hotel, activities = np.broadcast_arrays(
+            *(np.asarray(x, dtype=np.float64) for x in
+              (user_budgets, trip_durations_days, flight_costs, hotel_costs, activities_costs))
+        )
+        costs = BudgetAnalyzer.BASELINE_COSTS
+        
+        total_cost = flight + hotel + activities
+        remaining_budget = budget - total_cost
+        daily_remaining = np.divide(remaining_budget, days, out=np.zeros_like(remaining_budget), where=days > 0)
+        
+        # Tier index 0..3 = tight, budget, moderate, luxury (thresholds are ascending)
+        tier_index = (
+            (daily_remaining >= costs["budget"]["total_per_day"]).astype(np.int8)
+            + (daily_remaining >= costs["moderate"]["total_per_day"])
+            + (daily_remaining >= costs["luxury"]["total_per_day"])
+        )
+        tier_names = ["tight", "budget", "moderate", "luxury"]
+        tier = np.array(tier_names)[tier_index]
+        tier_label = np.array([BudgetAnalyzer.TIER_LABELS[name] for name in tier_names])[tier_index]
+        
+        utilization = np.divide(total_cost, budget, out=np.zeros_like(total_cost), where=budget > 0) * 100
+        utilization_percent = np.round(utilization, 1)
+        # np.round and round() can disagree right at a .x5 boundary - defer to round() there
+        scaled = utilization * 10
+        halfway = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+        if halfway.any():
+            utilization_percent[halfway] = [round(float(u), 1) for u in utilization[halfway]]
+        
+        suggested_budget = np.maximum(budget, total_cost + costs["budget"]["total_per_day"] * days)
+        
+        return {
+            "tier": tier,
+            "tier_label": tier_label,
+            "total_cost": total_cost,
+            "remaining_budget": remaining_budget,
+            "daily_remaining": daily_remaining,
+            "utilization_percent": utilization_percent,
+            "is_sufficient": remaining_budget >= 0,
+            "suggested_budget": suggested_budget
+        }
+    
+    @staticmethod
+    def budget_matrix(
+        budgets: Sequence[float],
+        durations: Sequence[int],
+        flight_cost: float = 0,
+        hotel_per_night: float = 0,
+        activities_per_day: float = 0
+    ) -> Dict:
+        """
+        Budget x duration what-if grid for the UI
+        
+        Hotel and activity costs scale with the number of days; the flight
+        cost is fixed. Rows follow budgets, columns follow durations.
+        """
+        budget_grid = np.asarray(budgets, dtype=np.float64)[:, None]
+        day_grid = np.asarray(durations, dtype=np.float64)[None, :]
+        
+        result = BudgetAnalyzer.analyze_budget_batch(
+            user_budgets=budget_grid,
+            trip_durations_days=day_grid,
+            flight_costs=flight_cost,
+            hotel_costs=hotel_per_night * day_grid,
+            activities_costs=activities_per_day * day_grid
+        )
+        
+        return {
+            "budgets": list(budgets),
+            "durations": list(durations),
+            "tier": result["tier"].tolist(),
+            "daily_remaining": np.round(result["daily_remaining"], 2).tolist(),
+            "utilization_percent": result["utilization_percent"].tolist(),
+            "suggested_budget": result["suggested_budget"].tolist()
+        }
+    
     @staticmethod
     def get_budget_message_for_itinerary(analysis: Dict) -> str:
         """Generate a user-friendly budget message for the itinerary"""
@@ -0,0 +1,87 @@
+# utils/cache_codec.py
+"""
+Cache Codec
+Packs cached values into bytes: pickle protocol 5, compressed with zstd
+(when the zstandard package is installed) or zlib once the pickle is at
+least COMPRESS_MIN_BYTES and compression actually pays off. The same
+packed form is kept in memory and written to the disk tier.
+"""
+
+import os
+import pickle
+import threading
+import zlib
+from typing import Any, NamedTuple, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# ZstdCompressor / ZstdDecompressor must not be shared across threads: one pair per thread
+_zstd = threading.local()
+
+
+def _zstd_compress(raw: bytes) -> bytes:
+    compressor = getattr(_zstd, "compressor", None)
+    if compressor is None:
+        compressor = _zstd.compressor = zstandard.ZstdCompressor(level=3)
+    return compressor.compress(raw)
+
+
+def _zstd_decompress(data: bytes) -> bytes:
+    decompressor = getattr(_zstd, "decompressor", None)
+    if decompressor is None:
+        decompressor = _zstd.decompressor = zstandard.ZstdDecompressor()
+    return decompressor.decompress(data)
+
+
+COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "4096"))
+MAX_COMPRESSED_RATIO = 0.9  # keep the plain pickle unless compression saves at least 10%
+
+# Packed = raw pickle (always starts with the PROTO opcode 0x80), or a codec tag + compressed pickle
+_ZLIB = b"z"
+_ZSTD = b"s"
+CODEC = "zstd" if zstandard is not None else "zlib"
+
+
+class Packed(NamedTuple):
+    data: bytes
+    raw_size: int       # pickled size before compression
+    compressed: bool
+
+
+def pack(value: Any, min_bytes: int = COMPRESS_MIN_BYTES) -> Optional[Packed]:
+    """Packed value, None if it can't be pickled"""
+    try:
+        raw = pickle.dumps(value, protocol=5)
+    except Exception:
+        return None
+    if len(raw) >= min_bytes:
+        if zstandard is not None:
+            data = _ZSTD + _zstd_compress(raw)
+        else:
+            data = _ZLIB + zlib.compress(raw, 6)
+        if len(data) <= len(raw) * MAX_COMPRESSED_RATIO:
+            return Packed(data, len(raw), True)
+    return Packed(raw, len(raw), False)
+
+
+def is_compressed(data: bytes) -> bool:
+    return data[:1] in (_ZLIB, _ZSTD)
+
+
+def decompress(data: bytes) -> bytes:
+    """Packed -> raw pickle"""
+    tag = data[:1]
+    if tag == _ZLIB:
+        return zlib.decompress(data[1:])
+    if tag == _ZSTD:
+        if zstandard is None:
+            raise ValueError("zstd-compressed cache value but zstandard is not installed")
+        return _zstd_decompress(data[1:])
+    return data
+
+
+def unpack(data: bytes) -> Any:
+    return pickle.loads(decompress(data))
@@ -0,0 +1,162 @@
+# utils/cache_keys.py
+"""
+Cache Keys
+Canonical encoding of call arguments (nested dicts, lists, sets, dates,
+pydantic models) into stable bytes, hashed with xxh3-128 when xxhash is
+installed and BLAKE2b-128 otherwise. Equal arguments give equal keys
+regardless of dict / set ordering, across processes and restarts.
+
+The common case goes through the C JSON encoder with sorted keys. Values
+it would conflate or can't order (dicts with any non-str key: JSON turns
+1 and True into "1" and "true") fall back to a type-tagged pure-Python
+encoding.
+"""
+
+import hashlib
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List
+
+try:
+    import xxhash
+
+    def _digest(data: bytes) -> str:
+        return xxhash.xxh3_128_hexdigest(data)
+
+    KEY_HASH = "xxh3_128"
+except ImportError:
+    def _digest(data: bytes) -> str:
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    KEY_HASH = "blake2b_128"
+
+
+def _encode_str(obj: str, out: List[str]):
+    out.append(f"s{len(obj)}:")  # length-prefixed, so no escaping is needed
+    out.append(obj)
+
+
+def _encode_dict(obj: dict, out: List[str]):
+    items = sorted((canonical_str(k), v) for k, v in obj.items())
+    out.append(f"d{len(items)}{{")
+    for key, value in items:
+        out.append(key)
+        _encode(value, out)
+    out.append("}")
+
+
+def _encode_seq(obj, out: List[str]):
+    out.append(f"l{len(obj)}[")
+    for value in obj:
+        _encode(value, out)
+    out.append("]")
+
+
+def _encode_set(obj, out: List[str]):
+    out.append(f"e{len(obj)}[")
+    out.extend(sorted(canonical_str(value) for value in obj))
+    out.append("]")
+
+
+# Exact-type dispatch (bool before int is implied: type(True) is bool)
+_ENCODERS: Dict[type, Callable[[Any, List[str]], None]] = {
+    str: _encode_str,
+    int: lambda obj, out: out.append(f"i{obj};"),
+    float: lambda obj, out: out.append(f"f{obj!r};"),
+    bool: lambda obj, out: out.append("T" if obj else "F"),
+    type(None): lambda obj, out: out.append("N"),
+    dict: _encode_dict,
+    list: _encode_seq,
+    tuple: _encode_seq,
+    set: _encode_set,
+    frozenset: _encode_set,
+    datetime: lambda obj, out: out.append(f"t{obj.isoformat()};"),
+    date: lambda obj, out: out.append(f"D{obj.isoformat()};"),
+}
+
+
+def _encode(obj: Any, out: List[str]):
+    encoder = _ENCODERS.get(type(obj))
+    if encoder is not None:
+        encoder(obj, out)
+    elif isinstance(obj, dict):
+        _encode_dict(obj, out)
+    elif isinstance(obj, (list, tuple)):
+        _encode_seq(obj, out)
+    elif hasattr(obj, "model_dump"):  # pydantic models
+        _encode_dict(obj.model_dump(), out)
+    else:
+        out.append(f"r{repr(obj)};")
+
+
+def canonical_str(obj: Any) -> str:
+    out: List[str] = []
+    _encode(obj, out)
+    return "".join(out)
+
+
+def _json_default(obj: Any) -> Any:
+    """JSON form of types json can't encode natively"""
+    if isinstance(obj, (set, frozenset)):
+        return {"__set__": sorted(canonical_str(value) for value in obj)}
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()  # same key as the ISO string the tools pass around
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    return {"__repr__": repr(obj)}
+
+
+try:
+    # Built once: JSONEncoder.encode would construct a new C encoder on every call
+    from json.encoder import c_make_encoder, encode_basestring
+    _c_encode = c_make_encoder(None, _json_default, encode_basestring, None, ":", ",", True, False, True)
+
+    def _json_encode(obj: Any) -> str:
+        return "".join(_c_encode(obj, 0))
+except ImportError:
+    _json_encode = json.JSONEncoder(sort_keys=True, separators=(",", ":"), default=_json_default).encode
+
+
+_NESTED = (dict, list, tuple)
+
+
+def _str_keys(obj: Any) -> bool:
+    """True if every dict reachable through dicts/lists/tuples has only str keys"""
+    if type(obj) is dict:
+        for key in obj:
+            if type(key) is not str:
+                return False
+        values = obj.values()
+    else:
+        values = obj
+    for value in values:
+        if type(value) in _NESTED and not _str_keys(value):
+            return False
+    return True
+
+
+def canonical_bytes(obj: Any) -> bytes:
+    """Stable encoding; 1, 1.0, "1" and True all differ, as values and as dict keys"""
+    text = None
+    if type(obj) not in _NESTED or _str_keys(obj):
+        try:
+            text = _json_encode(obj)
+        except (TypeError, ValueError, RecursionError):  # unencodable keys, circular references
+            pass
+    if text is None:
+        text = "\0" + canonical_str(obj)
+    return text.encode("utf-8", "surrogatepass")
+
+
+DEFAULT_NAMESPACE = "default"
+
+
+def namespace_of(key: str) -> str:
+    """Keys look like "<namespace>:<hash>"; bare keys share the default namespace"""
+    namespace, sep, _ = key.partition(":")
+    return namespace if sep else DEFAULT_NAMESPACE
+
+
+def make_key(prefix: str, *args, **kwargs) -> str:
+    """"<prefix>:<hash>" for the arguments; kwargs order doesn't matter"""
+    return f"{prefix}:{_digest(canonical_bytes((args, kwargs)))}"
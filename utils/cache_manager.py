@@ -1,99 +1,761 @@
 # utils/cache_manager.py
-import hashlib
-import json
-from datetime import datetime, timedelta
-from typing import Optional, Any
+import asyncio
+import functools
+import heapq
+import inspect
+import itertools
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Any, Callable, Dict, List, NamedTuple, Tuple
 import pickle
+import sqlite3
+
+from utils.cache_codec import decompress, is_compressed, pack, unpack
+from utils.cache_keys import make_key, namespace_of
+from utils.disk_cache import DiskCache
+
+# Refresh-ahead: entries read at least HOT_HITS times are refreshed once
+# they are within REFRESH_AHEAD (fraction of their TTL) of going stale
+HOT_HITS = 3
+REFRESH_AHEAD = 0.2
+
+# Global bounds (entries, approximate bytes); override via environment
+MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "20000"))
+MAX_BYTES = int(float(os.getenv("CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+# Per-namespace (max_entries, max_bytes). Namespaces not listed may use up
+# to DEFAULT_NAMESPACE_SHARE of each global bound, so no single namespace
+# (e.g. large plan blobs) can push every other one out.
+NAMESPACE_QUOTAS: Dict[str, Tuple[int, int]] = {
+    "plan": (500, 64 * 1024 * 1024),
+    "llm": (5000, 64 * 1024 * 1024),
+}
+DEFAULT_NAMESPACE_SHARE = 0.5
+
+# Background expiry: every EXPIRY_INTERVAL seconds each shard pops at most
+# EXPIRY_BATCH due records off its expiry heap
+EXPIRY_INTERVAL = 1.0
+EXPIRY_BATCH = 512
+
+# Persist entries to the on-disk L2 tier (utils/disk_cache.py) unless CACHE_L2=0
+CACHE_L2 = os.getenv("CACHE_L2", "1") != "0"
+
+STAT_KEYS = ("hits", "l2_hits", "misses", "stale_hits", "evictions")
+
+# Lookup latency percentiles are computed over the most recent LATENCY_SAMPLES
+# get() calls per namespace; get_stats lists the HOT_KEYS most-hit live keys
+LATENCY_SAMPLES = 1024
+HOT_KEYS = 5
+
+# Per-namespace counters recorded by the @cached decorator
+CALL_STAT_KEYS = ("calls", "coalesced", "negative_hits", "errors")
+
+
+def _approx_size(value: Any) -> int:
+    """Approximate memory footprint: pickled size, or sys.getsizeof if unpicklable"""
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class CacheEntry:
+    """
+    Cached value with soft and hard expiry (time.monotonic() seconds).
+
+    Before `expiry` the value is fresh. Between `expiry` and `stale_until`
+    it is served stale while `refresh` recomputes it in the background.
+
+    Large values are held only as compressed bytes (`packed`, with `value`
+    None) and unpacked on each read; `size` is what is held in memory and
+    `raw_size` the uncompressed pickle.
+    """
+    __slots__ = ("value", "expiry", "stale_until", "ttl_hours", "stale_hours", "refresh", "hits", "size",
+                 "packed", "raw_size")
+
+    def __init__(self, value: Any, ttl_hours: float, stale_hours: float = 0, refresh: Callable[[], Any] = None,
+                 size: int = None, packed: bytes = None, raw_size: int = None):
+        self.value = value
+        self.expiry = time.monotonic() + ttl_hours * 3600
+        self.stale_until = self.expiry + (stale_hours * 3600 if refresh else 0)
+        self.ttl_hours = ttl_hours
+        self.stale_hours = stale_hours
+        self.refresh = refresh
+        self.hits = 0
+        self.packed = packed
+        self.size = len(packed) if packed is not None else _approx_size(value) if size is None else size
+        self.raw_size = self.size if raw_size is None else raw_size
+
+    @classmethod
+    def build(cls, value: Any, ttl_hours: float, stale_hours: float = 0,
+              refresh: Callable[[], Any] = None) -> Tuple["CacheEntry", Optional[bytes]]:
+        """Entry for a new value plus its packed bytes for the disk tier (None if unpicklable)"""
+        packed = pack(value)
+        if packed is None:
+            return cls(value, ttl_hours, stale_hours, refresh, size=sys.getsizeof(value)), None
+        if packed.compressed:
+            return cls(None, ttl_hours, stale_hours, refresh, packed=packed.data, raw_size=packed.raw_size), packed.data
+        return cls(value, ttl_hours, stale_hours, refresh, size=packed.raw_size), packed.data
+
+
+class Namespace:
+    """LRU-ordered entries of one key prefix, with their byte total, quota and counters"""
+    __slots__ = ("entries", "bytes", "raw_bytes", "compressed", "max_entries", "max_bytes", "stats")
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.bytes = 0
+        self.raw_bytes = 0   # what the entries would take uncompressed
+        self.compressed = 0  # number of compressed entries
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = dict.fromkeys(STAT_KEYS, 0)
+
+    def over_quota(self) -> bool:
+        return len(self.entries) > self.max_entries or self.bytes > self.max_bytes
+
+    def pressure(self) -> float:
+        """How full this namespace is relative to its quota (eviction order under global pressure)"""
+        return max(len(self.entries) / self.max_entries, self.bytes / self.max_bytes)
+
+
+class CacheShard:
+    """
+    One lock stripe: its own lock, namespaces and totals.
+
+    Bounds and namespace quotas are the global ones divided by the number
+    of shards, so eviction is LRU within a shard (approximately LRU overall)
+    and never needs more than this shard's lock.
+
+    Expiry is a min-heap of (stale_until, seq, key, entry) records pushed on
+    insert. Records of replaced, deleted or evicted entries are skipped when
+    popped, and the heap is rebuilt once they outnumber the live entries.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, namespace_quotas: Dict[str, Tuple[int, int]]):
+        self.lock = threading.Lock()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.namespace_quotas = namespace_quotas
+        self.namespaces: Dict[str, Namespace] = {}
+        self.entries = 0
+        self.bytes = 0
+        self.deletes = 0  # bumped by delete/clear/purge so an in-flight L2 read can't resurrect a key
+        self.heap: List[tuple] = []
+        self.seq = itertools.count()  # heap tie-breaker; entries aren't comparable
+
+    def namespace_for(self, name: str) -> Namespace:
+        namespace = self.namespaces.get(name)
+        if namespace is None:
+            max_entries, max_bytes = self.namespace_quotas.get(name, (
+                self.max_entries * DEFAULT_NAMESPACE_SHARE,
+                self.max_bytes * DEFAULT_NAMESPACE_SHARE,
+            ))
+            namespace = self.namespaces[name] = Namespace(max(1, int(max_entries)), max(1, int(max_bytes)))
+        return namespace
+
+    def remove(self, namespace: Namespace, key: str) -> Optional[CacheEntry]:
+        entry = namespace.entries.pop(key, None)
+        if entry is not None:
+            namespace.bytes -= entry.size
+            namespace.raw_bytes -= entry.raw_size
+            namespace.compressed -= entry.packed is not None
+            self.entries -= 1
+            self.bytes -= entry.size
+        return entry
+
+    def evict(self, namespace: Namespace):
+        key = next(iter(namespace.entries))  # least recently used
+        self.remove(namespace, key)
+        namespace.stats["evictions"] += 1
+
+    def enforce_limits(self, namespace: Namespace):
+        while namespace.entries and namespace.over_quota():
+            self.evict(namespace)
+        while self.entries > self.max_entries or self.bytes > self.max_bytes:
+            victim = max((n for n in self.namespaces.values() if n.entries), key=Namespace.pressure, default=None)
+            if victim is None:
+                break
+            self.evict(victim)
+
+    def insert(self, key: str, entry: CacheEntry):
+        namespace = self.namespace_for(namespace_of(key))
+        self.remove(namespace, key)
+        if entry.size > namespace.max_bytes:
+            # Larger than the whole namespace quota: caching it would only flush the namespace
+            return
+        namespace.entries[key] = entry
+        namespace.bytes += entry.size
+        namespace.raw_bytes += entry.raw_size
+        namespace.compressed += entry.packed is not None
+        self.entries += 1
+        self.bytes += entry.size
+        heapq.heappush(self.heap, (entry.stale_until, next(self.seq), key, entry))
+        self.enforce_limits(namespace)
+        if len(self.heap) > 2 * self.entries + 1024:
+            self.rebuild_heap()
+
+    def rebuild_heap(self):
+        """Drop records of entries that are no longer cached (amortized O(1) per insert)"""
+        self.heap = [
+            (entry.stale_until, next(self.seq), key, entry)
+            for namespace in self.namespaces.values() for key, entry in namespace.entries.items()
+        ]
+        heapq.heapify(self.heap)
+
+    def expire(self, now: float, limit: Optional[int] = None) -> int:
+        """Remove entries past their hard expiry, popping at most `limit` heap records"""
+        heap = self.heap
+        removed = popped = 0
+        while heap and heap[0][0] <= now and (limit is None or popped < limit):
+            _, _, key, entry = heapq.heappop(heap)
+            popped += 1
+            namespace = self.namespaces.get(namespace_of(key))
+            if namespace is not None and namespace.entries.get(key) is entry:
+                self.remove(namespace, key)
+                removed += 1
+        return removed
+
 
 class CacheManager:
-    """In-memory cache with TTL support. Can be extended to Redis for production."""
-    
-    def __init__(self):
-        self._cache = {}
-        self._stats = {"hits": 0, "misses": 0}
-    
+    """
+    In-memory cache with TTL support. Can be extended to Redis for production.
+
+    Bounded by entry count and approximate byte size. Each namespace (key
+    prefix) keeps its own LRU order and quota: a namespace over its quota
+    evicts its own least-recently-used entries; when the cache as a whole
+    is over its bounds, the namespace under the most quota pressure gives
+    up its LRU entry. Every operation is O(1) in the number of entries.
+
+    Thread-safe without a global lock: keys are striped over `shards`
+    independently locked shards (executor threads and the event loop hit
+    different shards concurrently). Values are pickled for sizing outside
+    any lock, and background refreshes are started after the lock is released.
+
+    With an `l2` DiskCache, every set is also queued for the on-disk tier
+    and L1 misses fall through to it; L2 hits are promoted back into L1
+    for their remaining TTL. Only the value is persisted, so promoted
+    entries are plain TTL entries until their tool sets them again.
+
+    Expired entries are dropped lazily on read and, incrementally, by a
+    background expiry thread working off each shard's expiry heap, so no
+    request ever pays for a full scan.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES,
+                 namespace_quotas: Dict[str, Tuple[int, int]] = None, shards: int = 16,
+                 refresh_workers: int = 2, max_pending_refreshes: int = 32, l2: DiskCache = None,
+                 expiry_interval: float = EXPIRY_INTERVAL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.namespace_quotas = NAMESPACE_QUOTAS if namespace_quotas is None else namespace_quotas
+        per_shard_quotas = {
+            name: (entries / shards, size / shards) for name, (entries, size) in self.namespace_quotas.items()
+        }
+        self._shards = [
+            CacheShard(max(1, max_entries // shards), max(1, max_bytes // shards), per_shard_quotas)
+            for _ in range(shards)
+        ]
+        # Bounded background refresh: few workers, and at most max_pending keys queued
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="cache-refresh")
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._refresh_stats = {"refreshes": 0, "refresh_errors": 0}
+        self._call_stats: Dict[str, Dict[str, int]] = {}
+        self._latencies: Dict[str, deque] = {}  # namespace -> recent get() durations (s)
+        self._max_pending = max_pending_refreshes
+        self.l2 = l2
+        self._closed = threading.Event()
+        # Holds only a weak reference, so a discarded cache doesn't keep its thread alive
+        threading.Thread(target=_expiry_loop, args=(weakref.ref(self), self._closed, expiry_interval),
+                         name="cache-expiry", daemon=True).start()
+
+    def record(self, namespace: str, stat: str):
+        """Count a decorator event (see CALL_STAT_KEYS) for a namespace"""
+        with self._refresh_lock:
+            counts = self._call_stats.get(namespace)
+            if counts is None:
+                counts = self._call_stats[namespace] = dict.fromkeys(CALL_STAT_KEYS, 0)
+            counts[stat] += 1
+
     def _generate_key(self, prefix: str, *args, **kwargs) -> str:
-        """Generate a unique cache key from arguments"""
-        # Combine all inputs into a single string
-        key_data = f"{prefix}:{args}:{sorted(kwargs.items())}"
-        # Hash it for consistent length
-        return hashlib.md5(key_data.encode()).hexdigest()
-    
-    def get(self, key: str) -> Optional[Any]:
-        """Retrieve cached value if not expired"""
-        if key in self._cache:
-            value, expiry = self._cache[key]
-            if datetime.now() < expiry:
-                self._stats["hits"] += 1
-                return value
+        """Generate a unique cache key from arguments: "<prefix>:<hash>" (see utils/cache_keys.py)"""
+        return make_key(prefix, *args, **kwargs)
+
+    def _shard(self, key: str) -> CacheShard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _lookup(self, key: str) -> Optional[CacheEntry]:
+        shard = self._shard(key)
+        with shard.lock:
+            namespace = shard.namespaces.get(namespace_of(key))
+            return namespace.entries.get(key) if namespace else None
+
+    def get(self, key: str, default: Any = None) -> Optional[Any]:
+        """
+        Retrieve cached value if not expired, else `default`.
+
+        Stale values (past the soft TTL, within the hard one) are returned
+        immediately while a background refresh replaces them; hot fresh
+        values are refreshed shortly before they go stale.
+        """
+        start = time.perf_counter()
+        name = namespace_of(key)
+        try:
+            return self._get(key, name, default)
+        finally:
+            samples = self._latencies.get(name)
+            if samples is None:
+                samples = self._latencies.setdefault(name, deque(maxlen=LATENCY_SAMPLES))
+            samples.append(time.perf_counter() - start)  # deque.append is atomic: no lock needed
+
+    def _get(self, key: str, name: str, default: Any) -> Optional[Any]:
+        shard = self._shard(key)
+        refresh = None
+        with shard.lock:
+            namespace = shard.namespace_for(name)
+            entry = namespace.entries.get(key)
+            if entry is None:
+                if self.l2 is None:
+                    namespace.stats["misses"] += 1
+                    return default
+                deletes = shard.deletes
             else:
-                # Expired, remove it
-                del self._cache[key]
-        
-        self._stats["misses"] += 1
-        return None
-    
-    def set(self, key: str, value: Any, ttl_hours: int = 24):
-        """Store value with expiration time"""
-        expiry = datetime.now() + timedelta(hours=ttl_hours)
-        self._cache[key] = (value, expiry)
-    
+                now = time.monotonic()
+                if now < entry.expiry:
+                    namespace.entries.move_to_end(key)
+                    namespace.stats["hits"] += 1
+                    entry.hits += 1
+                    if entry.refresh and entry.hits >= HOT_HITS and \
+                            now >= entry.expiry - entry.ttl_hours * 3600 * REFRESH_AHEAD:
+                        refresh = entry
+                elif now < entry.stale_until:
+                    namespace.entries.move_to_end(key)
+                    namespace.stats["hits"] += 1
+                    namespace.stats["stale_hits"] += 1
+                    entry.hits += 1
+                    refresh = entry
+                else:
+                    # Expired, remove it (its L2 copy expired at the same time)
+                    shard.remove(namespace, key)
+                    namespace.stats["misses"] += 1
+                    return default
+                value, packed = entry.value, entry.packed
+        if entry is None:
+            return self._get_l2(key, shard, deletes, default)
+        if refresh is not None:
+            self._schedule_refresh(key, refresh)
+        if packed is not None:
+            value = unpack(packed)  # outside the lock
+        return value
+
+    def _get_l2(self, key: str, shard: CacheShard, deletes: int, default: Any = None) -> Optional[Any]:
+        """L1 miss: read the disk tier outside the shard lock and promote a hit into L1"""
+        found = self.l2.get(key)
+        if found is not None:
+            try:
+                raw = decompress(found.data)
+                value = pickle.loads(raw)
+            except Exception as e:
+                print(f"[Cache] Unreadable disk entry {key}: {e}")
+                found = None
+        with shard.lock:
+            namespace = shard.namespace_for(namespace_of(key))
+            if found is None or shard.deletes != deletes:
+                # Not on disk, or deleted while we were reading it
+                namespace.stats["misses"] += 1
+                return default
+            namespace.stats["l2_hits"] += 1
+            if key not in namespace.entries:  # a concurrent set wins over the disk copy
+                ttl_hours = (found.expires - time.time()) / 3600
+                if is_compressed(found.data):  # stays compressed in L1 too
+                    entry = CacheEntry(None, ttl_hours, packed=found.data, raw_size=len(raw))
+                else:
+                    entry = CacheEntry(value, ttl_hours, size=len(raw))
+                shard.insert(key, entry)
+        return value
+
+    def set(self, key: str, value: Any, ttl_hours: int = 24, stale_hours: float = 0,
+            refresh: Callable[[], Any] = None):
+        """
+        Store value with expiration time.
+
+        With a `refresh` callable the value may be served up to `stale_hours`
+        past its TTL while it is recomputed in the background.
+        """
+        entry, blob = CacheEntry.build(value, ttl_hours, stale_hours, refresh)  # packed outside the lock
+        shard = self._shard(key)
+        with shard.lock:
+            shard.insert(key, entry)
+        self._persist(key, entry, blob)
+
+    def _persist(self, key: str, entry: CacheEntry, blob: Optional[bytes]):
+        if self.l2 is not None and blob is not None:
+            # The disk tier outlives this process, so it gets wall-clock expiry
+            self.l2.put(key, blob, time.time() + entry.expiry - time.monotonic())
+
+    def _replace(self, key: str, old: CacheEntry, new: CacheEntry) -> bool:
+        """Atomically swap in a refreshed entry unless `old` was already replaced or deleted"""
+        shard = self._shard(key)
+        with shard.lock:
+            namespace = shard.namespaces.get(namespace_of(key))
+            if namespace is None or namespace.entries.get(key) is not old:
+                return False
+            shard.insert(key, new)
+            return True
+
+    def _schedule_refresh(self, key: str, entry: CacheEntry):
+        with self._refresh_lock:
+            if key in self._refreshing or len(self._refreshing) >= self._max_pending:
+                return
+            self._refreshing.add(key)
+        self._refresher.submit(self._refresh, key, entry)
+
+    def _refresh(self, key: str, entry: CacheEntry):
+        outcome = "refreshes"
+        try:
+            value = entry.refresh()
+            if value is not None:
+                new, blob = CacheEntry.build(value, entry.ttl_hours, entry.stale_hours, entry.refresh)
+                if self._replace(key, entry, new):
+                    self._persist(key, new, blob)
+        except Exception as e:
+            outcome = "refresh_errors"
+            print(f"[Cache] Background refresh failed: {e}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(key)
+                self._refresh_stats[outcome] += 1
+
     def delete(self, key: str):
         """Remove specific key from cache"""
-        if key in self._cache:
-            del self._cache[key]
-    
+        shard = self._shard(key)
+        with shard.lock:
+            namespace = shard.namespaces.get(namespace_of(key))
+            if namespace is not None:
+                shard.remove(namespace, key)
+            shard.deletes += 1
+        if self.l2 is not None:
+            self.l2.delete(key)
+
     def clear(self):
         """Clear entire cache"""
-        self._cache.clear()
-        self._stats = {"hits": 0, "misses": 0}
-    
-    def get_stats(self) -> dict:
-        """Get cache performance statistics"""
-        total = self._stats["hits"] + self._stats["misses"]
-        hit_rate = (self._stats["hits"] / total * 100) if total > 0 else 0
-        
+        for shard in self._shards:
+            with shard.lock:
+                shard.namespaces.clear()
+                shard.entries = 0
+                shard.bytes = 0
+                shard.deletes += 1
+                shard.heap = []
+        with self._refresh_lock:
+            self._refresh_stats = dict.fromkeys(self._refresh_stats, 0)
+            self._call_stats.clear()
+        self._latencies.clear()
+        if self.l2 is not None:
+            self.l2.clear()
+
+    def purge_namespace(self, name: str) -> int:
+        """Drop every entry of one namespace (both tiers); its counters are kept"""
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                namespace = shard.namespaces.get(name)
+                if namespace is not None:
+                    for key in list(namespace.entries):
+                        shard.remove(namespace, key)
+                        removed += 1
+                shard.deletes += 1
+        if self.l2 is not None:
+            self.l2.purge(name)
+        return removed
+
+    def close(self):
+        """Stop background expiry and flush queued L2 writes (on shutdown)"""
+        self._closed.set()
+        if self.l2 is not None:
+            self.l2.close()
+
+    def __len__(self) -> int:
+        return sum(shard.entries for shard in self._shards)
+
+    def get_stats(self, top_n: int = HOT_KEYS) -> dict:
+        """Get cache performance statistics, overall and per namespace (consistent per shard)"""
+        totals = dict.fromkeys(STAT_KEYS, 0)
+        entries = size = 0
+        namespaces: Dict[str, dict] = {}
+        hot: Dict[str, list] = {}
+        for shard in self._shards:
+            with shard.lock:
+                entries += shard.entries
+                size += shard.bytes
+                for name, n in shard.namespaces.items():
+                    ns = namespaces.get(name)
+                    if ns is None:
+                        ns = namespaces[name] = _empty_namespace_stats()
+                    for k, v in n.stats.items():
+                        ns[k] += v
+                        totals[k] += v
+                    ns["entries"] += len(n.entries)
+                    ns["bytes"] += n.bytes
+                    ns["raw_bytes"] += n.raw_bytes
+                    ns["compressed_entries"] += n.compressed
+                    ns["max_entries"] += n.max_entries
+                    ns["max_bytes"] += n.max_bytes
+                    if top_n:
+                        hot.setdefault(name, []).extend(
+                            (entry.hits, key) for key, entry in
+                            heapq.nlargest(top_n, n.entries.items(), key=lambda item: item[1].hits)
+                            if entry.hits
+                        )
+        with self._refresh_lock:
+            refresh_stats = dict(self._refresh_stats)
+            for name, counts in self._call_stats.items():
+                namespaces.setdefault(name, _empty_namespace_stats()).update(counts)
+
+        for name, ns in namespaces.items():
+            ns["hit_rate"] = _hit_rate(ns["hits"] + ns["l2_hits"], ns["misses"])
+            ns["hits"] += ns["l2_hits"]
+            ns["saved_bytes"] = ns["raw_bytes"] - ns["bytes"]
+            ns["compression_ratio"] = round(ns["raw_bytes"] / ns["bytes"], 2) if ns["bytes"] else 1.0
+            samples = sorted(self._latencies.get(name, ()))
+            ns["lookups_sampled"] = len(samples)
+            ns["p50_ms"] = round(samples[(len(samples) - 1) // 2] * 1000, 4) if samples else None
+            ns["p99_ms"] = round(samples[int((len(samples) - 1) * 0.99)] * 1000, 4) if samples else None
+            ns["hot_keys"] = [{"key": key, "hits": hits} for hits, key in heapq.nlargest(top_n, hot.get(name, []))]
+
+        hits = totals["hits"] + totals["l2_hits"]
+        l1_misses = totals["l2_hits"] + totals["misses"]
+
         return {
-            "hits": self._stats["hits"],
-            "misses": self._stats["misses"],
-            "hit_rate": f"{hit_rate:.2f}%",
-            "cache_size": len(self._cache)
+            "hits": hits,
+            "misses": totals["misses"],
+            "hit_rate": _hit_rate(hits, totals["misses"]),
+            "l1_hits": totals["hits"],
+            "l1_hit_rate": _hit_rate(totals["hits"], l1_misses),
+            "l2_hits": totals["l2_hits"],
+            "l2_hit_rate": _hit_rate(totals["l2_hits"], totals["misses"]),  # of L1 misses
+            "l2": self.l2.get_stats() if self.l2 is not None else None,
+            "stale_hits": totals["stale_hits"],
+            "background_refreshes": refresh_stats["refreshes"],
+            "refresh_errors": refresh_stats["refresh_errors"],
+            "evictions": totals["evictions"],
+            "cache_size": entries,
+            "bytes": size,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "namespaces": namespaces
         }
-    
-    def cleanup_expired(self):
-        """Remove all expired entries"""
-        now = datetime.now()
-        expired_keys = [
-            key for key, (_, expiry) in self._cache.items()
-            if now >= expiry
-        ]
-        for key in expired_keys:
-            del self._cache[key]
-        
-        return len(expired_keys)
 
-# Global cache instance
-cache = CacheManager()
+    def get_namespace_stats(self, name: str, top_n: int = HOT_KEYS) -> Optional[dict]:
+        return self.get_stats(top_n)["namespaces"].get(name)
+
+    def cleanup_expired(self, max_per_shard: Optional[int] = None) -> int:
+        """
+        Remove entries past their hard expiry, one shard at a time.
+
+        Only due heap records are visited; `max_per_shard` bounds the work
+        (and lock hold time) per shard for incremental cleanup.
+        """
+        now = time.monotonic()
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                removed += shard.expire(now, max_per_shard)
+        return removed
+
+
+def _empty_namespace_stats() -> dict:
+    return {**dict.fromkeys(STAT_KEYS, 0), **dict.fromkeys(CALL_STAT_KEYS, 0),
+            "entries": 0, "bytes": 0, "raw_bytes": 0, "compressed_entries": 0, "max_entries": 0, "max_bytes": 0}
+
+
+def _hit_rate(hits: int, misses: int) -> str:
+    total = hits + misses
+    return f"{(hits / total * 100) if total > 0 else 0:.2f}%"
+
+
+def _expiry_loop(ref: "weakref.ref[CacheManager]", closed: threading.Event, interval: float):
+    """Background expiry: a bounded batch per shard every `interval` seconds"""
+    while not closed.wait(interval):
+        cache = ref()
+        if cache is None:
+            return
+        try:
+            cache.cleanup_expired(max_per_shard=EXPIRY_BATCH)
+        except Exception as e:
+            print(f"[Cache] Background expiry failed: {e}")
+        del cache
+
+
+def _default_l2() -> Optional[DiskCache]:
+    if not CACHE_L2:
+        return None
+    try:
+        return DiskCache()
+    except (OSError, sqlite3.Error) as e:
+        print(f"⚠️ [Cache] Disk tier unavailable, running memory-only: {e}")
+        return None
+
+
+# Global cache instance (L1 in memory, L2 on disk)
+cache = CacheManager(l2=_default_l2())
+
+# =====================================================
+# @cached DECORATOR
+# =====================================================
+# Negative caching: errors are remembered (and re-raised) for ERROR_TTL_HOURS,
+# empty results (None, "", [], {}) for EMPTY_TTL_HOURS, so a failing or
+# fruitless lookup isn't repeated on every call
+ERROR_TTL_HOURS = 1 / 60
+EMPTY_TTL_HOURS = 0.25
+
+
+class Negative(NamedTuple):
+    """Cached empty result or error"""
+    value: Any
+    error: Optional[BaseException] = None
+
+
+def _is_empty(result: Any) -> bool:
+    return result is None or (isinstance(result, (str, bytes, list, tuple, dict, set)) and not result)
+
+
+def cached(prefix: str, ttl_hours: float = 24, stale_hours: float = 0, empty_ttl_hours: float = EMPTY_TTL_HOURS,
+           error_ttl_hours: float = ERROR_TTL_HOURS, is_empty: Callable[[Any], bool] = _is_empty,
+           cache_instance: "CacheManager" = None):
+    """
+    Cache a function's results in the `prefix` namespace. Works on plain
+    functions, methods (self / cls are not part of the key) and coroutines.
+
+    - Keys come from the bound arguments, so f(a, b=1), f(b=1, a=a) and
+      dicts with reordered keys all share an entry.
+    - Concurrent calls with the same key run the function once (per-key
+      single-flight); the others wait for and share its result or error.
+    - Errors and empty results are cached briefly (see Negative).
+    - `stale_hours` serves results stale while a background call refreshes
+      them (sync functions only; the refresher is a thread pool). A refresh
+      that comes back empty keeps serving the stale result.
+    - calls / coalesced / negative_hits / errors are counted per namespace
+      in the cache's stats.
+
+    The wrapper's `invalidate(*args, **kwargs)` drops one entry.
+    """
+    store = cache if cache_instance is None else cache_instance
 
-# Decorator for easy caching
-def cached(ttl_hours: int = 24, prefix: str = "default"):
-    """Decorator to cache function results"""
     def decorator(func):
-        def wrapper(*args, **kwargs):
-            # Generate cache key
-            cache_key = cache._generate_key(f"{prefix}:{func.__name__}", *args, **kwargs)
-            
-            # Try to get from cache
-            result = cache.get(cache_key)
-            if result is not None:
-                return result
-            
-            # Execute function
-            result = func(*args, **kwargs)
-            
-            # Store in cache
-            cache.set(cache_key, result, ttl_hours)
-            return result
-        
+        signature = inspect.signature(func)
+        name = f"{prefix}:{func.__module__}.{func.__qualname__}"
+
+        def key_for(args, kwargs) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {k: v for k, v in bound.arguments.items() if k not in ("self", "cls")}
+            return make_key(prefix, name, params)
+
+        def unwrap(hit):
+            if isinstance(hit, Negative):
+                store.record(prefix, "negative_hits")
+                if hit.error is not None:
+                    raise hit.error.with_traceback(None)
+                return hit.value
+            return hit
+
+        def save(key: str, result: Any = None, error: BaseException = None, refresh: Callable[[], Any] = None):
+            if error is not None:
+                store.record(prefix, "errors")
+                store.set(key, Negative(None, error), ttl_hours=error_ttl_hours)
+            elif is_empty(result):
+                store.set(key, Negative(result), ttl_hours=empty_ttl_hours)
+            else:
+                store.set(key, result, ttl_hours=ttl_hours, stale_hours=stale_hours, refresh=refresh)
+
+        def refresher(args, kwargs) -> Callable[[], Any]:
+            def refresh():
+                result = func(*args, **kwargs)
+                return None if is_empty(result) else result  # None: keep the stale entry
+            return refresh
+
+        if inspect.iscoroutinefunction(func):
+            inflight: Dict[str, asyncio.Future] = {}
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = key_for(args, kwargs)
+                loop = asyncio.get_running_loop()
+                while True:
+                    hit = store.get(key)
+                    if hit is not None:
+                        return unwrap(hit)
+                    future = inflight.get(key)
+                    if future is None or future.get_loop() is not loop:
+                        break
+                    store.record(prefix, "coalesced")
+                    try:
+                        return await asyncio.shield(future)
+                    except asyncio.CancelledError:
+                        if not future.cancelled():  # this caller was cancelled, not the leader
+                            raise
+                        # The leader was cancelled: look the key up again, or lead the next call
+                future = inflight[key] = loop.create_future()
+                store.record(prefix, "calls")
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    save(key, error=e)
+                    future.set_exception(e)
+                    future.exception()  # retrieved: no "never retrieved" warning without followers
+                    raise
+                else:
+                    save(key, result)
+                    future.set_result(result)
+                    return result
+                finally:
+                    if inflight.get(key) is future:
+                        del inflight[key]
+                    if not future.done():  # leader cancelled: followers wake up and retry
+                        future.cancel()
+
+            wrapper = async_wrapper
+        else:
+            inflight: Dict[str, Future] = {}
+            lock = threading.Lock()
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = key_for(args, kwargs)
+                hit = store.get(key)
+                if hit is not None:
+                    return unwrap(hit)
+                with lock:
+                    future = inflight.get(key)
+                    leader = future is None
+                    if leader:
+                        future = inflight[key] = Future()
+                if not leader:
+                    store.record(prefix, "coalesced")
+                    return future.result()
+                store.record(prefix, "calls")
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    save(key, error=e)
+                    future.set_exception(e)
+                    raise
+                else:
+                    save(key, result, refresh=refresher(args, kwargs) if stale_hours else None)
+                    future.set_result(result)
+                    return result
+                finally:
+                    with lock:
+                        del inflight[key]
+                    if not future.done():  # BaseException (e.g. KeyboardInterrupt) in the leader
+                        future.cancel()
+
+        wrapper.invalidate = lambda *args, **kwargs: store.delete(key_for(args, kwargs))
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
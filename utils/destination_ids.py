@@ -0,0 +1,149 @@
+# utils/destination_ids.py
+"""
+Destination IDs
+Persistent index of Booking.com (RapidAPI) destination IDs. The city ->
+dest_id mapping practically never changes, so it is kept on disk for
+months and hotel searches need only the search call itself. Names the API
+does not know are remembered too (for a shorter time).
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+from utils.attraction_gazetteer import CITY_ALIASES, COUNTRY_ALIASES, DATA_DIR, normalize_text
+
+DEST_IDS_PATH = os.getenv("BOOKING_DEST_IDS_PATH", os.path.join(DATA_DIR, "cache", "booking_dest_ids.json"))
+POSITIVE_TTL_DAYS = 120
+NEGATIVE_TTL_DAYS = 14
+
+# Destinations worth resolving ahead of the first search
+TOP_DESTINATIONS = [
+    "Dubai", "Abu Dhabi", "Doha", "Riyadh", "Jeddah", "Mecca", "Medina", "Istanbul", "Muscat",
+    "Lahore", "Karachi", "Islamabad", "Delhi", "Mumbai", "Colombo", "Kathmandu", "Maldives",
+    "Bangkok", "Phuket", "Kuala Lumpur", "Singapore", "Bali", "Hanoi", "Ho Chi Minh City", "Manila",
+    "Tokyo", "Osaka", "Seoul", "Beijing", "Shanghai", "Hong Kong",
+    "London", "Paris", "Rome", "Milan", "Barcelona", "Madrid", "Amsterdam", "Berlin", "Munich",
+    "Vienna", "Prague", "Lisbon", "Athens", "Zurich", "Baku", "Cairo", "Marrakech",
+    "New York", "Los Angeles", "Toronto", "Vancouver", "Cancun", "Sydney", "Melbourne",
+]
+
+# fetch(name) -> {"dest_id", "dest_type"}, None if the API doesn't know the name; raises on API failure
+DestinationFetcher = Callable[[str], Optional[Dict[str, str]]]
+
+
+def destination_key(name: str) -> str:
+    """Canonical index key: "Makkah, KSA" and "mecca, saudi arabia" share one entry"""
+    parts = [normalize_text(part) for part in (name or "").split(",")]
+    parts = [part for part in parts if part]
+    if not parts:
+        return ""
+    parts[0] = CITY_ALIASES.get(parts[0], parts[0]).lower()
+    parts[1:] = [COUNTRY_ALIASES.get(part, part).lower() for part in parts[1:]]
+    return ", ".join(parts)
+
+
+class DestinationIdIndex:
+    """
+    name -> {"dest_id", "dest_type"} with a months-long TTL, persisted as JSON.
+
+    Entries are {"info": {...} or null, "expires": unix time}; a null info
+    is a negative entry for a name the API returned nothing for. Failed
+    API calls are never cached.
+    """
+
+    def __init__(self, path: str = DEST_IDS_PATH, ttl_days: float = POSITIVE_TTL_DAYS,
+                 negative_ttl_days: float = NEGATIVE_TTL_DAYS):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.negative_ttl = negative_ttl_days * 86400
+        self._entries: Dict[str, Dict] = {}
+        self._stats = {"hits": 0, "negative_hits": 0, "fetches": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"⚠️ [DestinationIds] Ignoring unreadable index {self.path}: {e}")
+            return
+        now = time.time()
+        self._entries = {k: v for k, v in entries.items() if v.get("expires", 0) > now}
+        print(f"[DestinationIds] Loaded {len(self._entries)} destination IDs")
+
+    def _save(self):
+        """Atomic rewrite; caller holds the lock"""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=0, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠️ [DestinationIds] Could not persist index: {e}")
+
+    def get(self, name: str):
+        """(known, info): known is False on a miss or an expired entry"""
+        entry = self._entries.get(destination_key(name))
+        if entry is None or entry["expires"] <= time.time():
+            return False, None
+        return True, entry["info"]
+
+    def put(self, name: str, info: Optional[Dict[str, str]], save: bool = True):
+        ttl = self.ttl if info else self.negative_ttl
+        with self._lock:
+            self._entries[destination_key(name)] = {"info": info, "expires": time.time() + ttl}
+            if save:
+                self._save()
+
+    def lookup(self, name: str, fetch: DestinationFetcher) -> Optional[Dict[str, str]]:
+        """Indexed destination info, calling fetch only on a miss"""
+        known, info = self.get(name)
+        if known:
+            self._stats["hits" if info else "negative_hits"] += 1
+            return info
+        try:
+            self._stats["fetches"] += 1
+            info = fetch(name)
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"[DestinationIds] Lookup failed for {name}: {e}")
+            return None
+        self.put(name, info)
+        return info
+
+    def preload(self, names: Iterable[str], fetch: DestinationFetcher, max_workers: int = 4) -> int:
+        """Resolve every name not already indexed; returns how many were fetched"""
+        missing = list({destination_key(n): n for n in names if not self.get(n)[0]}.values())
+        if not missing:
+            return 0
+
+        def resolve(name):
+            try:
+                self.put(name, fetch(name), save=False)
+                return True
+            except Exception:
+                self._stats["errors"] += 1
+                return False
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            fetched = sum(pool.map(resolve, missing))
+        with self._lock:
+            self._save()
+        self._stats["fetches"] += len(missing)
+        print(f"[DestinationIds] Preloaded {fetched}/{len(missing)} destinations")
+        return fetched
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self._stats, "entries": len(self._entries)}
+
+
+# Global destination ID index
+destination_ids = DestinationIdIndex()
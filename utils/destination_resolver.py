@@ -0,0 +1,239 @@
+# utils/destination_resolver.py
+"""
+Destination Resolver
+Maps free-form destination strings ("New York, USA", "Makkah", "Romania")
+to entries of the accommodation cost table through a prebuilt index with
+alias handling and city -> country fallback.
+"""
+
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from utils.attraction_gazetteer import CITY_ALIASES, COUNTRY_ALIASES, attraction_gazetteer, tokenize
+
+# Average hotel costs per night by region/country (in USD)
+AVERAGE_ACCOMMODATION_COSTS = {
+    # Middle East
+    "saudi arabia": 80, "riyadh": 90, "jeddah": 85, "mecca": 100, "medina": 95, "makkah": 100, "madinah": 95,
+    "united arab emirates": 120, "dubai": 150, "abu dhabi": 130, "uae": 120,
+    "qatar": 110, "doha": 110,
+    "kuwait": 90,
+    "bahrain": 85,
+    "oman": 75,
+    "jordan": 65, "amman": 70,
+    "turkey": 60, "istanbul": 75, "ankara": 55,
+    
+    # South Asia
+    "pakistan": 50, "lahore": 55, "karachi": 60, "islamabad": 65, "multan": 45, "sialkot": 40,
+    "india": 45, "delhi": 60, "mumbai": 70, "bangalore": 65, "new delhi": 60,
+    "bangladesh": 40, "dhaka": 45,
+    "sri lanka": 50, "colombo": 55,
+    "nepal": 35, "kathmandu": 40,
+    
+    # Southeast Asia
+    "thailand": 40, "bangkok": 50, "phuket": 60,
+    "malaysia": 45, "kuala lumpur": 55,
+    "singapore": 120,
+    "indonesia": 35, "bali": 50, "jakarta": 45,
+    "vietnam": 35, "hanoi": 40, "ho chi minh": 40,
+    "philippines": 40, "manila": 45,
+    
+    # Europe
+    "united kingdom": 120, "london": 150, "uk": 120,
+    "france": 100, "paris": 130,
+    "germany": 90, "berlin": 100, "munich": 95,
+    "spain": 80, "barcelona": 95, "madrid": 90,
+    "italy": 85, "rome": 100, "milan": 95,
+    "netherlands": 110, "amsterdam": 120,
+    "greece": 70, "athens": 80,
+    "portugal": 70, "lisbon": 80,
+    
+    # North America
+    "united states": 120, "new york": 180, "los angeles": 150, "usa": 120,
+    "canada": 100, "toronto": 110, "vancouver": 115,
+    "mexico": 60, "cancun": 80,
+    
+    # East Asia
+    "china": 70, "beijing": 85, "shanghai": 90,
+    "japan": 100, "tokyo": 120, "osaka": 100,
+    "south korea": 80, "seoul": 95,
+    
+    # Africa
+    "egypt": 50, "cairo": 60,
+    "south africa": 65, "cape town": 75,
+    "morocco": 55, "marrakech": 65,
+    "kenya": 60, "nairobi": 70,
+    
+    # Oceania
+    "australia": 110, "sydney": 130, "melbourne": 120,
+    "new zealand": 95, "auckland": 105,
+}
+
+# Country of every city in the cost table (used when only the country is priced)
+CITY_COUNTRY = {
+    "riyadh": "saudi arabia", "jeddah": "saudi arabia", "mecca": "saudi arabia",
+    "medina": "saudi arabia", "makkah": "saudi arabia", "madinah": "saudi arabia",
+    "dubai": "united arab emirates", "abu dhabi": "united arab emirates",
+    "doha": "qatar", "amman": "jordan", "istanbul": "turkey", "ankara": "turkey",
+    "lahore": "pakistan", "karachi": "pakistan", "islamabad": "pakistan",
+    "multan": "pakistan", "sialkot": "pakistan",
+    "delhi": "india", "mumbai": "india", "bangalore": "india", "new delhi": "india",
+    "dhaka": "bangladesh", "colombo": "sri lanka", "kathmandu": "nepal",
+    "bangkok": "thailand", "phuket": "thailand", "kuala lumpur": "malaysia",
+    "bali": "indonesia", "jakarta": "indonesia", "hanoi": "vietnam",
+    "ho chi minh": "vietnam", "manila": "philippines",
+    "london": "united kingdom", "paris": "france", "berlin": "germany",
+    "munich": "germany", "barcelona": "spain", "madrid": "spain", "rome": "italy",
+    "milan": "italy", "amsterdam": "netherlands", "athens": "greece", "lisbon": "portugal",
+    "new york": "united states", "los angeles": "united states",
+    "toronto": "canada", "vancouver": "canada", "cancun": "mexico",
+    "beijing": "china", "shanghai": "china", "tokyo": "japan", "osaka": "japan",
+    "seoul": "south korea", "cairo": "egypt", "cape town": "south africa",
+    "marrakech": "morocco", "nairobi": "kenya",
+    "sydney": "australia", "melbourne": "australia", "auckland": "new zealand",
+}
+
+# Extra spellings on top of the gazetteer aliases
+ALIASES = {
+    "ho chi minh city": "ho chi minh", "saigon": "ho chi minh",
+    "bengaluru": "bangalore", "new york city": "new york",
+    "united states of america": "united states", "america": "united states",
+    "great britain": "united kingdom", "britain": "united kingdom",
+    "england": "united kingdom", "scotland": "united kingdom",
+    "emirates": "united arab emirates", "ksa": "saudi arabia",
+    "korea": "south korea", "holland": "netherlands", "turkiye": "turkey",
+}
+
+# Places whose name contains a country they are not in ("New Mexico" is
+# not Mexico). Matched as whole n-grams before the country inside them;
+# None means the place has no entry, so it falls back instead.
+LOOKALIKES = {
+    "new mexico": "united states", "new england": "united states", "new jersey": "united states",
+    "west virginia": "united states", "new south wales": "australia",
+    "british columbia": "canada", "north korea": None, "south sudan": None,
+    "papua new guinea": None, "new caledonia": None, "east timor": None,
+}
+
+
+class Resolution(NamedTuple):
+    query: str
+    key: Optional[str]       # Matching entry of the cost table
+    kind: Optional[str]      # "city" or "country"
+    cost: int
+    via: str                 # "exact", "alias", "partial", "country" or "fallback"
+
+
+class DestinationResolver:
+    """Prebuilt token index over a destination -> value table"""
+
+    def __init__(self, table: Dict[str, int], city_country: Dict[str, str] = None, aliases: Dict[str, str] = None,
+                 lookalikes: Dict[str, Optional[str]] = None):
+        self.table = table
+        self.city_country = dict(city_country or {})
+        aliases = dict(aliases or {})
+
+        # Cities known to the gazetteer extend the hierarchy beyond the table
+        for city, country in attraction_gazetteer.city_country.items():
+            self.city_country.setdefault(city.lower(), country.lower())
+        countries = set(self.city_country.values())
+
+        # name tokens -> (canonical name, is_alias); aliases take precedence
+        self._index: Dict[Tuple[str, ...], Tuple[Optional[str], bool]] = {}
+        for alias, target in {**aliases, **(lookalikes or {})}.items():
+            self._index[tuple(tokenize(alias))] = (target, True)
+        for name in list(table) + list(self.city_country) + list(countries):
+            self._index.setdefault(tuple(tokenize(name)), (name, False))
+        # First token -> longest n-gram starting with it; other tokens are skipped outright
+        self._starts: Dict[str, int] = {}
+        for key in self._index:
+            self._starts[key[0]] = max(self._starts.get(key[0], 0), len(key))
+        # Canonical name -> (table key, kind, cost, walked up to the country), resolved once
+        self._targets: Dict[str, Tuple[str, str, int, bool]] = {}
+        self._country_names = set()
+        for name, _ in self._index.values():
+            kind = "country" if name in countries and name not in self.city_country else "city"
+            if name in table:
+                self._targets[name] = (name, kind, table[name], False)
+            elif self.city_country.get(name) in table:
+                country = self.city_country[name]
+                self._targets[name] = (country, "country", table[country], True)
+            if kind == "country":
+                self._country_names.add(name)
+
+    def resolve(self, destination: str, fallback: int = 75) -> Resolution:
+        """Resolve one destination string"""
+        tokens = tokenize(destination)
+        if not tokens:
+            return Resolution(destination, None, None, fallback, "fallback")
+        index, targets = self._index, self._targets
+
+        # 1. Whole string
+        hit = index.get(tuple(tokens))
+        if hit and hit[0] in targets:
+            key, kind, cost, walked = targets[hit[0]]
+            return Resolution(destination, key, kind, cost, "country" if walked else "alias" if hit[1] else "exact")
+
+        # 2. Word-bounded n-grams, longest first; the first city wins, else the first country
+        starts, country_names = self._starts, self._country_names
+        countries = []
+        i, count = 0, len(tokens)
+        while i < count:
+            longest = starts.get(tokens[i])
+            if longest:
+                for n in range(min(longest, count - i), 0, -1):
+                    hit = index.get(tuple(tokens[i:i + n]))
+                    if hit:
+                        name = hit[0]
+                        if name in country_names:
+                            countries.append(name)
+                        elif name in targets:
+                            key, kind, cost, walked = targets[name]
+                            return Resolution(destination, key, kind, cost, "country" if walked else "partial")
+                        i += n - 1
+                        break
+            i += 1
+
+        for name in countries:
+            if name in targets:
+                key, kind, cost, _ = targets[name]
+                return Resolution(destination, key, kind, cost, "partial")
+        return Resolution(destination, None, None, fallback, "fallback")
+
+    def resolve_many(self, destinations: Iterable[str], fallback: int = 75) -> List[Resolution]:
+        """Resolve a batch of destinations; repeated inputs are resolved once"""
+        seen: Dict[str, Resolution] = {}
+        results = []
+        for destination in destinations:
+            found = seen.get(destination)
+            if found is None:
+                found = seen[destination] = self.resolve(destination, fallback)
+            results.append(found)
+        return results
+
+
+def _build_aliases() -> Dict[str, str]:
+    aliases = {k: v.lower() for k, v in {**CITY_ALIASES, **COUNTRY_ALIASES}.items()}
+    aliases.update(ALIASES)
+    # The cost table spells Ho Chi Minh City without "city"
+    return {k: ("ho chi minh" if v == "ho chi minh city" else v) for k, v in aliases.items()}
+
+
+# Global resolver instance
+destination_resolver = DestinationResolver(AVERAGE_ACCOMMODATION_COSTS, CITY_COUNTRY, _build_aliases(), LOOKALIKES)
+
+
+@lru_cache(maxsize=4096)
+def _cached_cost(destination: str, fallback: int) -> int:
+    return destination_resolver.resolve(destination, fallback).cost
+
+
+def estimate_accommodation_cost(destination: str, fallback: int = 75) -> int:
+    """Estimate average accommodation cost per night based on destination"""
+    if not destination:
+        return fallback
+    return _cached_cost(destination, fallback)
+
+
+def estimate_accommodation_costs(destinations: Iterable[str], fallback: int = 75) -> List[int]:
+    """Batch version of estimate_accommodation_cost"""
+    return [r.cost for r in destination_resolver.resolve_many(destinations, fallback)]
@@ -0,0 +1,249 @@
+# utils/disk_cache.py
+"""
+Disk Cache
+SQLite-backed L2 tier for CacheManager, so cached Wikipedia summaries,
+weather, IATA lookups and search results survive deploys and restarts.
+Writes are queued and committed in batches by a background writer;
+expired rows are compacted away in the background.
+"""
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from utils.attraction_gazetteer import DATA_DIR
+from utils.cache_keys import namespace_of
+
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", os.path.join(DATA_DIR, "cache", "cache.sqlite3"))
+
+_DELETE = object()   # queued tombstone
+_CLEAR = object()
+_PURGE = object()     # queued as (_PURGE, namespace, None)
+
+
+class DiskEntry(NamedTuple):
+    data: bytes      # packed value (utils/cache_codec.py)
+    expires: float   # Unix time
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires);
+"""
+
+
+class DiskCache:
+    """
+    key -> (packed value, wall-clock expiry) in one SQLite file (WAL mode).
+
+    put/delete only enqueue; a writer thread commits up to batch_size
+    operations per transaction, at least every flush_interval seconds.
+    Until then the latest queued operation for a key is served from
+    memory, so reads never see a value that was overwritten or deleted;
+    while a clear or purge is queued, the rows it covers read as misses.
+    Every compact_interval seconds expired rows are deleted and freed
+    pages returned to the filesystem.
+    """
+
+    def __init__(self, path: str = CACHE_DB_PATH, batch_size: int = 256, flush_interval: float = 1.0,
+                 compact_interval: float = 600.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            db.executescript(_SCHEMA)
+        self._local = threading.local()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._pending: Dict[str, Tuple[Any, float]] = {}   # key -> (blob or _DELETE, expires)
+        self._pending_lock = threading.Lock()
+        self._clears = 0   # queued clears not yet committed
+        self._purges: Dict[str, int] = {}   # namespace -> queued purges not yet committed
+        self._idle = threading.Event()
+        self._idle.set()
+        self._closed = False
+        self._stats = {"reads": 0, "hits": 0, "writes": 0, "batches": 0, "compacted": 0, "errors": 0}
+        self._writer = threading.Thread(target=self._write_loop, name="cache-l2-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        db.execute("PRAGMA journal_mode = WAL")
+        db.execute("PRAGMA synchronous = NORMAL")
+        return db
+
+    def _reader(self) -> sqlite3.Connection:
+        """One read connection per thread (WAL readers don't block the writer)"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = self._connect()
+        return db
+
+    # --- reads ---
+    def get(self, key: str) -> Optional[DiskEntry]:
+        """The live entry for key, else None"""
+        now = time.time()
+        with self._pending_lock:
+            self._stats["reads"] += 1
+            pending = self._pending.get(key)
+            if pending is None and (self._clears or self._purges and namespace_of(key) in self._purges):
+                return None   # the row is about to be deleted
+        if pending is not None:
+            blob, expires = pending
+            if blob is _DELETE or expires <= now:
+                return None
+        else:
+            try:
+                row = self._reader().execute(
+                    "SELECT value, expires FROM entries WHERE key = ? AND expires > ?", (key, now)
+                ).fetchone()
+            except sqlite3.Error as e:
+                self._stats["errors"] += 1
+                print(f"⚠️ [Cache L2] Read failed: {e}")
+                return None
+            if row is None:
+                return None
+            blob, expires = row
+        with self._pending_lock:
+            self._stats["hits"] += 1
+        return DiskEntry(blob, expires)
+
+    # --- writes (queued) ---
+    def put(self, key: str, blob: bytes, expires: float):
+        """Queue a packed value for persistence until `expires` (Unix time)"""
+        self._enqueue(key, blob, expires)
+
+    def delete(self, key: str):
+        self._enqueue(key, _DELETE, 0.0)
+
+    def clear(self):
+        with self._pending_lock:
+            self._pending.clear()
+            self._clears += 1
+            self._idle.clear()
+            self._queue.put((_CLEAR, None, None))
+
+    def purge(self, namespace: str):
+        """Delete every row of one namespace"""
+        with self._pending_lock:
+            for key in [k for k in self._pending if namespace_of(k) == namespace]:
+                del self._pending[key]
+            self._purges[namespace] = self._purges.get(namespace, 0) + 1
+            self._idle.clear()
+            self._queue.put((_PURGE, namespace, None))
+
+    def _enqueue(self, key: str, blob, expires: float):
+        if self._closed:
+            return
+        with self._pending_lock:
+            self._pending[key] = (blob, expires)
+            self._idle.clear()
+            self._queue.put((key, blob, expires))
+
+    def _write_loop(self):
+        db = self._connect()
+        next_compaction = time.monotonic() + self.compact_interval
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                first = None
+            if first is not None:
+                batch = [first]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if any(op[0] is None for op in batch):   # close() sentinel
+                    self._commit(db, [op for op in batch if op[0] is not None])
+                    db.close()
+                    return
+                self._commit(db, batch)
+            if time.monotonic() >= next_compaction:
+                self.compact(db)
+                next_compaction = time.monotonic() + self.compact_interval
+
+    def _commit(self, db: sqlite3.Connection, batch):
+        try:
+            with db:
+                for key, blob, expires in batch:
+                    if key is _CLEAR:
+                        db.execute("DELETE FROM entries")
+                    elif key is _PURGE:
+                        db.execute("DELETE FROM entries WHERE namespace = ?", (blob,))
+                    elif blob is _DELETE:
+                        db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    else:
+                        db.execute(
+                            "INSERT OR REPLACE INTO entries (key, namespace, value, expires) VALUES (?, ?, ?, ?)",
+                            (key, namespace_of(key), blob, expires)
+                        )
+            self._stats["writes"] += len(batch)
+            self._stats["batches"] += 1
+        except sqlite3.Error as e:
+            self._stats["errors"] += 1
+            print(f"⚠️ [Cache L2] Batch write failed: {e}")
+        finally:
+            with self._pending_lock:
+                # Drop pending entries this batch persisted, unless overwritten meanwhile
+                for key, blob, expires in batch:
+                    if key is _CLEAR:
+                        self._clears -= 1
+                    elif key is _PURGE:
+                        self._purges[blob] -= 1
+                        if not self._purges[blob]:
+                            del self._purges[blob]
+                    elif isinstance(key, str) and self._pending.get(key) == (blob, expires):
+                        del self._pending[key]
+                if self._queue.empty():
+                    self._idle.set()
+
+    def compact(self, db: sqlite3.Connection = None) -> int:
+        """Delete expired rows and release freed pages"""
+        own = db is None
+        db = db or self._connect()
+        try:
+            with db:
+                removed = db.execute("DELETE FROM entries WHERE expires <= ?", (time.time(),)).rowcount
+            db.execute("PRAGMA incremental_vacuum")
+            self._stats["compacted"] += removed
+            return removed
+        except sqlite3.Error as e:
+            self._stats["errors"] += 1
+            print(f"⚠️ [Cache L2] Compaction failed: {e}")
+            return 0
+        finally:
+            if own:
+                db.close()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until every queued write is committed"""
+        return self._idle.wait(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put((None, None, None))
+        self._writer.join(timeout=10)
+
+    def __len__(self) -> int:
+        return self._reader().execute("SELECT COUNT(*) FROM entries WHERE expires > ?", (time.time(),)).fetchone()[0]
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {**self._stats, "pending_writes": pending}
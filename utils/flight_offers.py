@@ -0,0 +1,165 @@
+# utils/flight_offers.py
+"""
+Flight Offers
+Columnar (NumPy-backed) view of an Amadeus flight-offers response: one
+pass extracts price, departure/arrival times, duration, stops and carrier
+into arrays; sorting is vectorized and rows become FlightOption dicts only
+when asked for. Used where a response is ranked per leg (round trips) or
+reduced to its cheapest fare (price calendar); the one-way top-4 parse in
+booking_tools stays dict-based, which is faster for a single pass.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+_ISO_DURATION = re.compile(r"PT(?:(\d+)H)?(?:(\d+)M)?")
+
+
+@lru_cache(maxsize=2048)
+def duration_minutes(value: str) -> int:
+    """ISO-8601 "PT7H25M" -> 445, -1 if missing; few distinct values, so cached"""
+    match = _ISO_DURATION.fullmatch(value or "")
+    if not match or not any(match.groups()):  # "PT" alone carries no duration
+        return -1
+    return int(match.group(1) or 0) * 60 + int(match.group(2) or 0)
+
+
+def _datetimes(values: List[str]) -> np.ndarray:
+    try:
+        return np.array(values, dtype="datetime64[s]")
+    except ValueError:
+        # Offsets/"Z" suffixes: keep the local wall-clock part
+        return np.array([v[:19] if v != "NaT" else v for v in values], dtype="datetime64[s]")
+
+
+def _row(offer: dict, leg: int = 0) -> Optional[tuple]:
+    """(price, departure, arrival, duration_min, stops, carrier, offer) or None"""
+    try:
+        itinerary = offer["itineraries"][leg]
+        segments = itinerary["segments"]
+        first, last = segments[0], segments[-1]
+    except (KeyError, IndexError, TypeError):
+        return None
+    try:
+        price, departure, arrival = offer["price"]["total"], first["departure"]["at"], last["arrival"]["at"]
+    except (KeyError, TypeError):
+        price = offer.get("price", {}).get("total") or "nan"
+        departure = first.get("departure", {}).get("at") or "NaT"
+        arrival = last.get("arrival", {}).get("at") or "NaT"
+    return (price, departure, arrival, duration_minutes(itinerary.get("duration")),
+            len(segments) - 1, first.get("carrierCode", ""), offer)
+
+
+class FlightOffers:
+    """
+    Parallel arrays, one row per offer, for one of its itineraries
+    (0 = outbound, 1 = return of a round-trip offer). price is always the
+    offer's total, i.e. the round-trip fare for round-trip offers.
+
+    departure/arrival are local wall-clock datetime64[s] values as reported
+    by Amadeus; duration_min comes from the itinerary's ISO duration, or
+    arrival - departure when missing. Missing values are NaN/NaT/-1.
+    Less-used fields (airports, flight numbers) are read from the raw offer
+    on demand.
+    """
+
+    __slots__ = ("price", "departure", "arrival", "duration_min", "stops", "carrier", "_offers", "leg")
+
+    def __init__(self, price, departure, arrival, duration_min, stops, carrier, offers, leg: int = 0):
+        self.price = price
+        self.departure = departure
+        self.arrival = arrival
+        self.duration_min = duration_min
+        self.stops = stops
+        self.carrier = carrier
+        self._offers = offers
+        self.leg = leg
+
+    @classmethod
+    def from_amadeus(cls, data: Dict, leg: int = 0) -> "FlightOffers":
+        """Build from a flight-offers response ({"data": [...]}) or its data list"""
+        offers = data.get("data", []) if isinstance(data, dict) else list(data or [])
+        rows = [row for row in (_row(offer, leg) for offer in offers) if row]
+        if not rows:
+            return cls.empty(leg)
+        price, departure, arrival, duration, stops, carrier, kept = zip(*rows)
+
+        # Whole-column conversions: one C-level parse per column, not per offer
+        departure = _datetimes(departure)
+        arrival = _datetimes(arrival)
+        duration_min = np.array(duration, dtype=np.int32)
+        missing = duration_min < 0
+        if missing.any():
+            elapsed = (arrival - departure).astype("timedelta64[m]").astype(np.float64)
+            duration_min[missing] = np.nan_to_num(elapsed[missing], nan=-1).astype(np.int32)
+
+        return cls(
+            price=np.array(price, dtype=np.float64),
+            departure=departure,
+            arrival=arrival,
+            duration_min=duration_min,
+            stops=np.array(stops, dtype=np.int16),
+            carrier=np.array(carrier, dtype="U3"),
+            offers=list(kept),
+            leg=leg,
+        )
+
+    @classmethod
+    def empty(cls, leg: int = 0) -> "FlightOffers":
+        return cls(
+            np.empty(0, np.float64), np.empty(0, "datetime64[s]"), np.empty(0, "datetime64[s]"),
+            np.empty(0, np.int32), np.empty(0, np.int16), np.empty(0, "U3"), [], leg,
+        )
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    def order(self, *keys: str) -> np.ndarray:
+        """
+        Row order for a multi-key ascending sort, e.g. order("price", "duration_min").
+
+        Rows without a price sort last.
+        """
+        keys = keys or ("price",)
+        columns = []
+        for key in reversed(keys):  # np.lexsort sorts by the last key first
+            column = getattr(self, key)
+            if column.dtype.kind == "f":
+                column = np.where(np.isnan(column), np.inf, column)
+            columns.append(column)
+        return np.lexsort(columns)
+
+    def offer(self, i: int) -> Optional[dict]:
+        """Raw Amadeus offer behind row i"""
+        return self._offers[i]
+
+    def option(self, i: int, booking_url: str = None, airline_names: Dict[str, str] = None) -> dict:
+        """Row i as a FlightOption-shaped dict"""
+        carrier = str(self.carrier[i])
+        airline = (airline_names or {}).get(carrier, f"{carrier} Airlines")
+        stops = int(self.stops[i])
+        duration = int(self.duration_min[i])
+        return {
+            "airline": airline,
+            "price_usd": int(self.price[i]) if not np.isnan(self.price[i]) else 0,
+            "duration_hours": round(duration / 60, 1) if duration >= 0 else 0.0,
+            "stops": stops,
+            "booking_url": booking_url,
+            "departure_time": _clock(self.departure[i]),
+            "arrival_time": _clock(self.arrival[i]),
+            "flight_type": "direct" if stops == 0 else f"{stops} stop(s)",
+        }
+
+    def options(self, limit: int = None, **kwargs) -> Iterable[dict]:
+        """Lazily yield rows as FlightOption-shaped dicts"""
+        for i in range(len(self) if limit is None else min(limit, len(self))):
+            yield self.option(i, **kwargs)
+
+
+def _clock(value: np.datetime64) -> str:
+    if np.isnat(value):
+        return "N/A"
+    return str(value)[11:16]
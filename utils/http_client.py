@@ -0,0 +1,164 @@
+# utils/http_client.py
+"""
+HTTP Client
+Shared pooled HTTP layer for all upstream APIs (Amadeus, Booking.com via
+RapidAPI, Serper, Wikipedia, OpenWeather). Connections are kept alive per
+host; timeouts and retry/backoff are applied consistently. Every attempt
+consults the upstream guard (quota-aware throttling and a per-upstream
+circuit breaker) and, when given one, the caller's rate limiter.
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.upstream_guard import CircuitOpenError, upstreams
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# (connect, read) timeouts in seconds per upstream host
+HOST_TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    "api.amadeus.com": (5, 30),
+    "test.api.amadeus.com": (5, 30),
+    "booking-com.p.rapidapi.com": (5, 15),
+    "google.serper.dev": (3, 5),
+    "en.wikipedia.org": (3, 5),
+    "api.openweathermap.org": (3, 3),
+}
+DEFAULT_TIMEOUT = (5, 15)
+USER_AGENT = "TripPlanner/2.0 (Educational)"
+
+
+def _host(url: str) -> str:
+    return url.split("://", 1)[-1].split("/", 1)[0].split(":", 1)[0]
+
+
+def _retry_after(response) -> Optional[float]:
+    """Seconds from a Retry-After header (delta or HTTP date)"""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, capped; honors Retry-After"""
+
+    def __init__(self, retries: int = 2, backoff: float = 0.5, max_backoff: float = 8.0):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def should_retry(self, method: str, attempt: int, response=None, error: Exception = None,
+                     retry_post: bool = False) -> bool:
+        if attempt >= self.retries:
+            return False
+        if method.upper() not in RETRY_METHODS and not retry_post:
+            return False
+        if error is not None:
+            return True
+        return response is not None and response.status_code in RETRY_STATUSES
+
+    def delay(self, attempt: int, response=None) -> float:
+        hinted = _retry_after(response)
+        if hinted is not None:
+            return min(hinted, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+
+class HttpClient:
+    """
+    Thread-safe sync client over one pooled requests.Session.
+
+    The session keeps a connection pool per host, so repeated calls to the
+    same API reuse the TCP+TLS connection. POSTs are only retried when the
+    caller marks them safe (e.g. OAuth token requests).
+    """
+
+    def __init__(self, pool_size: int = 20, retry: RetryPolicy = None):
+        self.retry = retry or RetryPolicy()
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=len(HOST_TIMEOUTS) + 4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._stats = {"requests": 0, "retries": 0, "errors": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def request(self, method: str, url: str, timeout=None, retry_post: bool = False, limiter=None,
+                **kwargs) -> requests.Response:
+        """Send a request with the host's default timeout and the retry policy; retries take a limiter token too"""
+        host = _host(url)
+        timeout = timeout if timeout is not None else HOST_TIMEOUTS.get(host, DEFAULT_TIMEOUT)
+        upstream = upstreams.for_host(host)
+        attempt = 0
+        settled = upstream is None   # the upstream got its one verdict for this call
+        try:
+            while True:
+                if upstream is not None:
+                    try:
+                        wait = upstream.before_request(retry=attempt > 0)
+                    except CircuitOpenError:
+                        self._count("rejected")
+                        settled = True
+                        raise
+                    if wait:
+                        time.sleep(wait)
+                if limiter is not None:
+                    limiter.acquire()
+                self._count("requests")
+                try:
+                    response = self.session.request(method, url, timeout=timeout, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    if not self.retry.should_retry(method, attempt, error=e, retry_post=retry_post):
+                        self._count("errors")
+                        if upstream is not None:
+                            upstream.record(error=e)
+                            settled = True
+                        raise
+                    time.sleep(self.retry.delay(attempt))
+                else:
+                    if not self.retry.should_retry(method, attempt, response=response, retry_post=retry_post):
+                        if upstream is not None:
+                            upstream.record(response)
+                            settled = True
+                        return response
+                    if upstream is not None:
+                        upstream.observe(response)
+                    time.sleep(self.retry.delay(attempt, response))
+                attempt += 1
+                self._count("retries")
+        finally:
+            if not settled:
+                # Ended without a verdict (invalid URL, interrupted wait): free a half-open probe
+                upstream.release()
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+
+# Global client instance
+http_client = HttpClient()
@@ -0,0 +1,121 @@
+# utils/json_stream.py
+"""
+Streaming JSON helpers for LLM output.
+Decodes each day object of a curation response as soon as its closing brace
+arrives, so the complete days of a truncated response are kept.
+"""
+
+import json
+from typing import List, Optional
+
+
+class IncrementalDayParser:
+    """
+    Incremental parser for the curator's ``{"days": [...]}`` response.
+
+    Feed it text as it arrives (a whole response or LLM stream chunks); every
+    day object is decoded the moment its closing brace is seen, so
+    complete days survive even if the response is truncated or malformed
+    further on. A bare top-level array is treated as the days array.
+    """
+
+    def __init__(self, key: str = "days"):
+        self.key = key
+        self.items: List[dict] = []
+        self.done = False
+
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string = []
+        self._last_string = None
+        self._key = None
+        self._array_depth = None
+        self._item = None
+
+    @property
+    def truncated(self) -> bool:
+        """True if the root value has not been closed yet"""
+        return not self.done
+
+    def feed(self, chunk: str) -> List[dict]:
+        """Consume a chunk of text and return the day objects it completed"""
+        completed = []
+        if self.done:
+            return completed
+
+        stack = self._stack
+        for ch in chunk:
+            item = self._item
+            if item is not None:
+                item.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._array_depth is None and len(stack) == 1:
+                        self._last_string = "".join(self._string)
+                    continue
+                if self._array_depth is None and len(stack) == 1:
+                    self._string.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string = []
+            elif ch == ":":
+                if len(stack) == 1:
+                    self._key = self._last_string
+            elif ch == "{":
+                if self._array_depth is not None and len(stack) == self._array_depth:
+                    self._item = ["{"]
+                stack.append(ch)
+            elif ch == "[":
+                if self._array_depth is None and (
+                    not stack or (stack == ["{"] and self._key == self.key)
+                ):
+                    self._array_depth = len(stack) + 1
+                stack.append(ch)
+            elif ch in "}]":
+                if not stack:
+                    continue
+                stack.pop()
+                if ch == "}" and item is not None and len(stack) == self._array_depth:
+                    self._item = None
+                    day = self._decode("".join(item))
+                    if day is not None:
+                        completed.append(day)
+                if not stack:
+                    self.done = True
+                    break
+
+        self.items.extend(completed)
+        return completed
+
+    def finish(self) -> List[dict]:
+        """Return every complete day seen; a trailing partial day is dropped"""
+        self._item = None
+        return self.items
+
+    @staticmethod
+    def _decode(text: str) -> Optional[dict]:
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            print(f"[JSONStream] Skipping malformed item ({len(text)} chars)")
+            return None
+        return value if isinstance(value, dict) else None
+
+
+def parse_days(raw: str, key: str = "days") -> List[dict]:
+    """Extract every complete day object from a (possibly truncated) LLM response"""
+    parser = IncrementalDayParser(key=key)
+    parser.feed(str(raw))
+    days = parser.finish()
+    if parser.truncated:
+        print(f"[JSONStream] Response truncated - recovered {len(days)} complete day(s)")
+    return days
@@ -0,0 +1,147 @@
+# utils/price_calendar.py
+"""
+Price Calendar
+Flexible-date price sweeps. Cheapest prices are cached per route x date
+cell, so overlapping windows ("what if I leave a day earlier?") reuse
+cells and only the missing dates are searched, concurrently, through the
+API clients' own rate limiting.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional
+
+# fetch(date) -> cheapest price for that date, None if nothing was found; raises on API failure
+PriceFetcher = Callable[[str], Optional[float]]
+
+
+class DatePrice(NamedTuple):
+    date: str
+    price: float
+
+
+def date_window(start_date: str, days: int, earliest: str = None) -> List[str]:
+    """start_date +- days as YYYY-MM-DD, skipping dates before earliest (default: today)"""
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    earliest = earliest or datetime.now().strftime("%Y-%m-%d")
+    dates = [(start + timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(-days, days + 1)]
+    return [d for d in dates if d >= earliest]
+
+
+def shift_date(date: str, days: int) -> str:
+    return (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+class PriceCalendar:
+    """
+    route -> {date -> (price or None, expiry)}.
+
+    A route is any hashable describing what is priced, e.g.
+    ("flight", "LHE", "DXB", 7, 1) for a 7-night round trip for one adult.
+    Dates with no offers are cached as None for a shorter time; failed
+    searches are not cached. A date being searched by one sweep is awaited,
+    not re-searched, by overlapping sweeps.
+
+    Expired cells are dropped when their route is read or written, and
+    routes are evicted least recently used beyond max_routes.
+    """
+
+    def __init__(self, ttl_hours: float = 6, empty_ttl_hours: float = 1, max_workers: int = 6,
+                 max_routes: int = 2000):
+        self.ttl = ttl_hours * 3600
+        self.empty_ttl = empty_ttl_hours * 3600
+        self.max_routes = max_routes
+        self._cells: "OrderedDict[Hashable, Dict[str, tuple]]" = OrderedDict()
+        self._pending: Dict[tuple, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="price-calendar")
+        self._lock = threading.Lock()
+        self._stats = {"cell_hits": 0, "searches": 0, "errors": 0, "evicted_routes": 0}
+
+    def cell(self, route: Hashable, date: str):
+        """(known, price) for one cached cell; caller holds self._lock"""
+        entry = self._cells.get(route, {}).get(date)
+        if entry is None or entry[1] <= time.monotonic():
+            return False, None
+        return True, entry[0]
+
+    def _route_cells(self, route: Hashable) -> Dict[str, tuple]:
+        """Live cells of a route, expired ones removed and the route marked recently used; caller holds self._lock"""
+        cells = self._cells.get(route)
+        if cells is None:
+            return {}
+        now = time.monotonic()
+        for date in [d for d, (_, expiry) in cells.items() if expiry <= now]:
+            del cells[date]
+        if not cells:
+            del self._cells[route]
+        else:
+            self._cells.move_to_end(route)
+        return cells
+
+    def _store(self, route: Hashable, date: str, price: Optional[float], ttl: float):
+        """Write one cell, evicting least recently used routes past max_routes; caller holds self._lock"""
+        cells = self._route_cells(route)
+        if not cells:
+            cells = self._cells[route] = {}
+        cells[date] = (price, time.monotonic() + ttl)
+        while len(self._cells) > self.max_routes:
+            self._cells.popitem(last=False)
+            self._stats["evicted_routes"] += 1
+
+    def _search(self, route: Hashable, date: str, fetch: PriceFetcher) -> Optional[float]:
+        try:
+            price = fetch(date)
+        except BaseException as e:
+            with self._lock:
+                self._stats["errors"] += 1
+                self._pending.pop((route, date), None)
+            print(f"[PriceCalendar] {date} search failed: {e}")
+            raise
+        ttl = self.ttl if price is not None else self.empty_ttl
+        with self._lock:
+            # Cell first, then the pending entry, in one step: a sweep never sees neither
+            self._store(route, date, price, ttl)
+            self._pending.pop((route, date), None)
+        return price
+
+    def sweep(self, route: Hashable, dates: List[str], fetch: PriceFetcher) -> Dict[str, Optional[float]]:
+        """Prices for every date, searching only cells that aren't cached"""
+        prices: Dict[str, Optional[float]] = {}
+        futures: Dict[str, Future] = {}
+        with self._lock:
+            self._route_cells(route)
+            for date in dates:
+                known, price = self.cell(route, date)
+                if known:
+                    prices[date] = price
+                    self._stats["cell_hits"] += 1
+                    continue
+                future = self._pending.get((route, date))
+                if future is None:
+                    future = self._executor.submit(self._search, route, date, fetch)
+                    self._pending[(route, date)] = future
+                    self._stats["searches"] += 1
+                futures[date] = future
+        for date, future in futures.items():
+            try:
+                prices[date] = future.result()
+            except Exception:
+                prices[date] = None
+        return {date: prices[date] for date in dates}
+
+    @staticmethod
+    def cheapest(prices: Dict[str, Optional[float]], n: int = 3) -> List[DatePrice]:
+        found = [DatePrice(date, price) for date, price in prices.items() if price is not None]
+        return sorted(found, key=lambda dp: (dp.price, dp.date))[:n]
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "routes": len(self._cells),
+                    "cells": sum(len(cells) for cells in self._cells.values())}
+
+
+# Global route x date price matrix shared by the flight and hotel tools
+price_calendar = PriceCalendar()
@@ -0,0 +1,70 @@
+# utils/rate_limiter.py
+"""
+Rate Limiter
+Thread-safe token bucket shared by every caller of an upstream API, so
+concurrent searches stay within the provider's requests-per-second quota.
+"""
+
+import os
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket: up to `burst` requests at once, refilled at `rate` per second.
+
+    acquire() blocks until a token is available; waiting happens outside the
+    lock so other threads keep refilling and taking tokens.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available right now"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout: float = None) -> bool:
+        """Block until a token is available; False if timeout expires first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            time.sleep(wait)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+# Amadeus Self-Service allows 10 transactions/second on the test environment
+# and 40 on production; stay under the stricter one unless configured
+amadeus_rate_limiter = RateLimiter(
+    rate=float(os.getenv("AMADEUS_MAX_RPS", "10")),
+    burst=int(os.getenv("AMADEUS_BURST", "5"))
+)
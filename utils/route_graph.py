@@ -0,0 +1,253 @@
+# utils/route_graph.py
+"""
+Route Graph
+Time-expanded flight graph built from observed Amadeus offers. Answers
+earliest-arrival, cheapest and k-best itinerary queries with minimum and
+maximum connection times at each hub.
+"""
+
+import heapq
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from utils.flight_offers import duration_minutes
+
+DEFAULT_MIN_CONNECTION_MINUTES = 60
+DEFAULT_MAX_CONNECTION_HOURS = 24
+
+
+def parse_local_time(value: str) -> Optional[float]:
+    """
+    Amadeus "at" timestamp -> seconds.
+
+    Amadeus reports local wall-clock times without an offset; they are
+    read as if UTC, which is consistent at any one airport, so connection
+    times at a hub are exact. Cross-airport durations come from the offer's
+    own ISO-8601 duration instead.
+    """
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "")).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+def parse_duration_hours(value: str) -> Optional[float]:
+    """ISO-8601 "PT7H25M" -> 7.42 (parsed by flight_offers.duration_minutes)"""
+    minutes = duration_minutes(value)
+    return minutes / 60 if minutes >= 0 else None
+
+
+class FlightLeg(NamedTuple):
+    origin: str
+    destination: str
+    departure: float        # Local wall-clock seconds at origin
+    arrival: float          # Local wall-clock seconds at destination
+    price: float
+    duration_hours: float
+    carrier: str
+    flight_number: str
+    segments: int
+    offer: Any = None       # Raw Amadeus offer this leg came from
+
+
+class Itinerary(NamedTuple):
+    legs: Tuple[FlightLeg, ...]
+    price: float
+    departure: float
+    arrival: float
+    duration_hours: float   # Flying time plus layovers
+    stops: int
+
+    @property
+    def hubs(self) -> List[str]:
+        return [leg.destination for leg in self.legs[:-1]]
+
+
+def leg_from_offer(offer: dict) -> Optional[FlightLeg]:
+    """Edge for the first itinerary of an Amadeus flight offer"""
+    try:
+        itinerary = offer["itineraries"][0]
+        segments = itinerary["segments"]
+        first, last = segments[0], segments[-1]
+        departure = parse_local_time(first["departure"]["at"])
+        arrival = parse_local_time(last["arrival"]["at"])
+        if departure is None or arrival is None:
+            return None
+        duration = parse_duration_hours(itinerary.get("duration"))
+        if duration is None:
+            duration = max(0.0, (arrival - departure) / 3600)
+        return FlightLeg(
+            origin=first["departure"]["iataCode"],
+            destination=last["arrival"]["iataCode"],
+            departure=departure,
+            arrival=arrival,
+            price=float(offer.get("price", {}).get("total", 0)),
+            duration_hours=duration,
+            carrier=first.get("carrierCode", ""),
+            flight_number=f"{first.get('carrierCode', '')}{first.get('number', '')}",
+            segments=len(segments),
+            offer=offer,
+        )
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+
+
+class RouteGraph:
+    """
+    Flight legs indexed by origin and departure time.
+
+    Airports x times form the implicit time-expanded graph: from a leg
+    landing at a hub, the feasible next legs are one bisect range of that
+    hub's departures, [arrival + min connection, arrival + max connection].
+    Identical legs (same flight and departure) keep the cheapest fare.
+    """
+
+    def __init__(self, min_connection_minutes: int = DEFAULT_MIN_CONNECTION_MINUTES,
+                 max_connection_hours: float = DEFAULT_MAX_CONNECTION_HOURS,
+                 ttl_hours: float = 2):
+        self.min_connection = min_connection_minutes * 60
+        self.max_connection = max_connection_hours * 3600
+        self.ttl = ttl_hours * 3600
+        self._legs: Dict[Tuple[str, str, float, str], Tuple[FlightLeg, float]] = {}
+        self._by_origin: Dict[str, Tuple[List[float], List[FlightLeg]]] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._legs)
+
+    def add_leg(self, leg: FlightLeg):
+        key = (leg.origin, leg.destination, leg.departure, leg.flight_number)
+        with self._lock:
+            existing = self._legs.get(key)
+            if existing is None or leg.price < existing[0].price:
+                self._legs[key] = (leg, time.monotonic() + self.ttl)
+                self._dirty = True
+
+    def add_offers(self, offers: List[dict]) -> int:
+        """Add every parseable offer of an Amadeus response; returns how many"""
+        self.prune()
+        added = 0
+        for offer in offers or []:
+            leg = leg_from_offer(offer)
+            if leg:
+                self.add_leg(leg)
+                added += 1
+        return added
+
+    def prune(self) -> int:
+        """Drop legs whose observed fares have expired"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, (_, expiry) in self._legs.items() if expiry <= now]
+            for key in expired:
+                del self._legs[key]
+            if expired:
+                self._dirty = True
+        return len(expired)
+
+    def _index(self) -> Dict[str, Tuple[List[float], List[FlightLeg]]]:
+        with self._lock:
+            if self._dirty:
+                by_origin: Dict[str, List[FlightLeg]] = {}
+                for leg, _ in self._legs.values():
+                    by_origin.setdefault(leg.origin, []).append(leg)
+                self._by_origin = {}
+                for origin, legs in by_origin.items():
+                    legs.sort(key=lambda l: l.departure)
+                    self._by_origin[origin] = ([l.departure for l in legs], legs)
+                self._dirty = False
+            return self._by_origin
+
+    def departures(self, airport: str, earliest: float, latest: float) -> List[FlightLeg]:
+        """Legs leaving an airport within [earliest, latest]"""
+        times, legs = self._index().get(airport, ([], []))
+        return legs[bisect_left(times, earliest):bisect_right(times, latest)]
+
+    @staticmethod
+    def _objective(objective: str, price: float, hours: float, first: FlightLeg) -> Tuple:
+        """Heap key; hours is elapsed time since the first departure (flying plus layovers)"""
+        if objective == "price":
+            return (price, hours)
+        if objective == "arrival":
+            # Origin-local arrival time: comparable across paths despite time zones
+            return (first.departure + hours * 3600, price)
+        if objective == "duration":
+            return (hours, price)
+        raise ValueError(f"Unknown objective: {objective}")
+
+    def k_best(self, origin: Union[str, Iterable[str]], destination: Union[str, Iterable[str]],
+               depart_after: float = None, depart_before: float = None, k: int = 5, max_legs: int = 2,
+               objective: str = "price") -> List[Itinerary]:
+        """
+        The k best itineraries by "price", "arrival" or "duration".
+
+        origin and destination are an airport code or a set of codes (all
+        airports of a metro area).
+
+        Best-first search over partial itineraries: every objective is
+        non-decreasing as legs are appended, so complete itineraries leave
+        the heap in order. Each leg is expanded at most k times.
+        """
+        origins = {origin} if isinstance(origin, str) else set(origin)
+        destinations = {destination} if isinstance(destination, str) else set(destination)
+        earliest = float("-inf") if depart_after is None else depart_after
+        latest = float("inf") if depart_before is None else depart_before
+
+        heap: List[Tuple] = []
+        counter = 0
+        for airport in origins:
+            for leg in self.departures(airport, earliest, latest):
+                key = self._objective(objective, leg.price, leg.duration_hours, leg)
+                heapq.heappush(heap, (key, counter, leg.price, leg.duration_hours, (leg,)))
+                counter += 1
+
+        results: List[Itinerary] = []
+        expanded: Dict[int, int] = {}
+        while heap and len(results) < k:
+            _, _, price, hours, path = heapq.heappop(heap)
+            last = path[-1]
+            if last.destination in destinations:
+                results.append(Itinerary(
+                    legs=path, price=price, departure=path[0].departure, arrival=last.arrival,
+                    duration_hours=hours, stops=sum(leg.segments for leg in path) - 1
+                ))
+                continue
+            if len(path) >= max_legs:
+                continue
+            seen = expanded.get(id(last), 0)
+            if seen >= k:
+                continue
+            expanded[id(last)] = seen + 1
+
+            visited = {l.origin for l in path} | origins
+            final = len(path) + 1 == max_legs
+            for nxt in self.departures(last.destination, last.arrival + self.min_connection,
+                                       last.arrival + self.max_connection):
+                if nxt.destination in visited or (final and nxt.destination not in destinations):
+                    continue
+                total = price + nxt.price
+                elapsed = hours + (nxt.departure - last.arrival) / 3600 + nxt.duration_hours
+                key = self._objective(objective, total, elapsed, path[0])
+                heapq.heappush(heap, (key, counter, total, elapsed, path + (nxt,)))
+                counter += 1
+        return results
+
+    def cheapest(self, origin: str, destination: str, depart_after: float = None,
+                 depart_before: float = None, max_legs: int = 2) -> Optional[Itinerary]:
+        found = self.k_best(origin, destination, depart_after, depart_before, 1, max_legs, "price")
+        return found[0] if found else None
+
+    def earliest_arrival(self, origin: str, destination: str, depart_after: float = None,
+                         depart_before: float = None, max_legs: int = 2) -> Optional[Itinerary]:
+        found = self.k_best(origin, destination, depart_after, depart_before, 1, max_legs, "arrival")
+        return found[0] if found else None
+
+
+# Global graph of observed offers, shared by all flight searches
+route_graph = RouteGraph()
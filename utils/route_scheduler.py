@@ -0,0 +1,220 @@
+# utils/route_scheduler.py
+"""
+Route Scheduler
+Reorders a day's activities into a short walking/driving route using the
+offline landmark coordinates (nearest neighbour + 2-opt), keeping evening
+activities after 18:00.
+"""
+
+import math
+import re
+from typing import Any, List, Optional, Sequence, Tuple
+
+from utils.attraction_gazetteer import Landmark, attraction_gazetteer
+
+EVENING_START = 18 * 60
+EVENING_END = 23 * 60 + 30   # latest evening start time
+EVENING_GAP = 90             # preferred minutes between evening activities
+EVENING_KEYWORDS = ("evening", "dinner", "night", "sunset")
+_TIME = re.compile(r"(\d{1,2})(?::(\d{2}))?\s*([ap]\.?m\.?)?", re.IGNORECASE)
+
+Point = Tuple[float, float]
+
+
+def haversine_km(a: Point, b: Point) -> float:
+    """Great-circle distance between two (lat, lon) points"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+def route_length(points: Sequence[Point], order: Sequence[int]) -> float:
+    return sum(haversine_km(points[order[i]], points[order[i + 1]]) for i in range(len(order) - 1))
+
+
+def order_route(points: Sequence[Point], start: Optional[int] = None) -> List[int]:
+    """
+    Open-path TSP heuristic: nearest neighbour tour improved with 2-opt.
+
+    Returns the visiting order as indices into points. When start is None
+    every point is tried as the nearest-neighbour seed and the shortest
+    result is kept; 50+ points still take only milliseconds.
+    """
+    n = len(points)
+    if n <= 2:
+        return list(range(n))
+
+    dist = [[haversine_km(p, q) for q in points] for p in points]
+
+    def nearest_neighbour(seed: int) -> List[int]:
+        tour, remaining = [seed], set(range(n)) - {seed}
+        while remaining:
+            last = dist[tour[-1]]
+            nxt = min(remaining, key=last.__getitem__)
+            tour.append(nxt)
+            remaining.remove(nxt)
+        return tour
+
+    def tour_cost(tour: List[int]) -> float:
+        return sum(dist[tour[i]][tour[i + 1]] for i in range(n - 1))
+
+    seeds = [start] if start is not None else range(n)
+    best = min((nearest_neighbour(seed) for seed in seeds), key=tour_cost)
+
+    # 2-opt on an open path: reverse best[i..j] when it shortens the route.
+    # The first stop stays fixed only if the caller pinned a start.
+    first = 1 if start is not None else 0
+    improved = True
+    while improved:
+        improved = False
+        for i in range(first, n - 1):
+            a_prev = best[i - 1] if i > 0 else None
+            a = best[i]
+            for j in range(i + 1, n):
+                b = best[j]
+                b_next = best[j + 1] if j + 1 < n else None
+                before = (dist[a_prev][a] if a_prev is not None else 0) + (dist[b][b_next] if b_next is not None else 0)
+                after = (dist[a_prev][b] if a_prev is not None else 0) + (dist[a][b_next] if b_next is not None else 0)
+                if after < before - 1e-9:
+                    best[i:j + 1] = reversed(best[i:j + 1])
+                    a = best[i]
+                    improved = True
+    return best
+
+
+def _parse_minutes(value: str) -> Optional[int]:
+    match = _TIME.search(value or "")
+    if not match:
+        return None
+    hours, minutes, meridiem = int(match.group(1)), int(match.group(2) or 0), (match.group(3) or "").lower()
+    if meridiem.startswith("p") and hours < 12:
+        hours += 12
+    elif meridiem.startswith("a") and hours == 12:
+        hours = 0
+    if hours > 23 or minutes > 59:
+        return None
+    return hours * 60 + minutes
+
+
+def _format_minutes(minutes: int) -> str:
+    minutes = min(minutes, 23 * 60 + 59)
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _get(activity: Any, name: str) -> Any:
+    return activity.get(name) if isinstance(activity, dict) else getattr(activity, name, None)
+
+
+def _set(activity: Any, name: str, value: Any):
+    if isinstance(activity, dict):
+        activity[name] = value
+    else:
+        setattr(activity, name, value)
+
+
+class RouteScheduler:
+    """Reorders itinerary activities along short routes between known landmarks"""
+
+    def __init__(self, gazetteer=attraction_gazetteer):
+        self.gazetteer = gazetteer
+
+    def _accepts(self, landmark: Landmark, cities: set, countries: set) -> bool:
+        if cities:
+            return landmark.city in cities
+        if countries:
+            return landmark.country in countries
+        return True
+
+    def locate_activity(self, activity: Any, cities: set = None, countries: set = None) -> Optional[Landmark]:
+        """Landmark for an activity from its title, then location, then description"""
+        for field in ("title", "location", "description"):
+            for m in self.gazetteer.find(_get(activity, field) or ""):
+                landmark = self.gazetteer.by_name[m.name]
+                if self._accepts(landmark, cities or set(), countries or set()):
+                    return landmark
+        return None
+
+    @staticmethod
+    def is_evening(activity: Any) -> bool:
+        minutes = _parse_minutes(_get(activity, "time") or "")
+        if minutes is not None and minutes >= EVENING_START:
+            return True
+        kind = f"{_get(activity, 'type') or ''} {_get(activity, 'title') or ''}".lower()
+        return any(word in kind for word in EVENING_KEYWORDS)
+
+    def _route_part(self, activities: List[Any], landmarks: List[Optional[Landmark]], start: Optional[Point]) -> List[Any]:
+        """Reorder located activities along a route; unlocated ones keep their slots"""
+        located = [i for i, lm in enumerate(landmarks) if lm is not None]
+        if len(located) < 2:
+            return activities
+        points = [(landmarks[i].lat, landmarks[i].lon) for i in located]
+        if start is not None:
+            order = order_route([start] + points, start=0)[1:]
+            order = [k - 1 for k in order]
+        else:
+            order = order_route(points)
+        result = list(activities)
+        for slot, k in zip(located, order):
+            result[slot] = activities[located[k]]
+        return result
+
+    def schedule_day(self, day_plan: Any, destination: str) -> Tuple[float, float]:
+        """
+        Reorder one DailyPlan (model or dict) in place.
+
+        Daytime activities are routed first and evening ones after them;
+        the day's existing time slots are reassigned in the new order with
+        evening activities starting no earlier than 18:00, EVENING_GAP
+        apart, or spread evenly up to EVENING_END when that doesn't fit.
+        Returns (km_before, km_after) over the located activities.
+        """
+        activities = list(_get(day_plan, "activities") or [])
+        if len(activities) < 2:
+            return 0.0, 0.0
+        cities, countries = self.gazetteer.resolve_destination(destination)
+        landmarks = {id(a): self.locate_activity(a, cities, countries) for a in activities}
+
+        def km(seq):
+            pts = [(landmarks[id(a)].lat, landmarks[id(a)].lon) for a in seq if landmarks[id(a)]]
+            return route_length(pts, range(len(pts)))
+
+        km_before = km(activities)
+        daytime = [a for a in activities if not self.is_evening(a)]
+        evening = [a for a in activities if self.is_evening(a)]
+
+        daytime = self._route_part(daytime, [landmarks[id(a)] for a in daytime], None)
+        last = next((landmarks[id(a)] for a in reversed(daytime) if landmarks[id(a)]), None)
+        evening = self._route_part(evening, [landmarks[id(a)] for a in evening], (last.lat, last.lon) if last else None)
+        ordered = daytime + evening
+
+        # Reassign the day's time slots in the new order
+        slots = [_parse_minutes(_get(a, "time") or "") for a in activities]
+        if all(s is not None for s in slots):
+            slots.sort()
+            times = slots[:len(daytime)]
+            for minutes in slots[len(daytime):]:
+                previous = times[-1] if len(times) > len(daytime) else -1
+                times.append(max(minutes, EVENING_START, previous + EVENING_GAP))
+            if len(evening) > 1 and times[-1] > EVENING_END:
+                # Too many evening activities for the gap: spread them over the rest of the evening
+                first = max(EVENING_START, min(times[len(daytime)], EVENING_END - (len(evening) - 1) * 30))
+                step = (EVENING_END - first) // (len(evening) - 1)
+                times[len(daytime):] = [first + k * step for k in range(len(evening))]
+            for activity, minutes in zip(ordered, times):
+                _set(activity, "time", _format_minutes(minutes))
+
+        _set(day_plan, "activities", ordered)
+        return km_before, km(ordered)
+
+    def schedule_itinerary(self, daily_plans: List[Any], destination: str) -> Tuple[float, float]:
+        """Reorder every day; returns total (km_before, km_after)"""
+        before = after = 0.0
+        for day_plan in daily_plans:
+            b, a = self.schedule_day(day_plan, destination)
+            before += b
+            after += a
+        return before, after
+
+
+# Global scheduler instance
+route_scheduler = RouteScheduler()
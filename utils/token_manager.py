@@ -0,0 +1,147 @@
+# utils/token_manager.py
+"""
+Token Manager
+Thread-safe OAuth access-token holder: one refresh in flight at a time,
+proactive background refresh shortly before expiry, and lock-free reads
+while a valid token exists.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from utils.http_client import http_client
+
+# fetch() -> (access_token, expires_in_seconds), or None on failure
+TokenFetcher = Callable[[], Optional[Tuple[str, float]]]
+
+
+def client_credentials(token_url: str, client_id: str, client_secret: str) -> TokenFetcher:
+    """Fetcher for the OAuth2 client-credentials grant (Amadeus and most APIs)"""
+    def fetch() -> Optional[Tuple[str, float]]:
+        response = http_client.post(token_url, retry_post=True, data={
+            "grant_type": "client_credentials",
+            "client_id": client_id,
+            "client_secret": client_secret,
+        })
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        token = data.get("access_token")
+        return (token, float(data.get("expires_in", 1800))) if token else None
+    return fetch
+
+
+class OAuthTokenManager:
+    """
+    Single-flight token cache.
+
+    get() returns the current token without locking while it is valid.
+    Once it is within refresh_margin of expiry, the first caller starts a
+    background refresh and everyone keeps using the old token meanwhile.
+    Only when there is no valid token do callers block, and then a single
+    thread fetches while the rest wait for its result. After a failed
+    fetch, callers get None for retry_after seconds instead of hammering
+    the token endpoint. The timer refresh ahead of expiry only fires if the
+    token was used since it was fetched, so an idle process stops renewing.
+    """
+
+    def __init__(self, fetch: TokenFetcher, name: str = "OAuth",
+                 refresh_margin: float = 300, retry_after: float = 5):
+        self.fetch = fetch
+        self.name = name
+        self.refresh_margin = refresh_margin
+        self.retry_after = retry_after
+        self._state: Tuple[Optional[str], float, float] = (None, 0.0, 0.0)  # (token, refresh_at, expires_at)
+        self._failed_until = 0.0
+        self._lock = threading.Lock()         # held by the thread fetching a token
+        self._refreshing = False
+        self._timer: Optional[threading.Timer] = None
+        self._used = False                    # get() served the current token
+        self._stats = {"fetches": 0, "failures": 0, "background_refreshes": 0}
+
+    def get(self) -> Optional[str]:
+        token, refresh_at, expiry = self._state  # single tuple read: consistent without the lock
+        now = time.monotonic()
+        if token and now < expiry:
+            self._used = True
+            if now >= refresh_at:
+                self._refresh_in_background()
+            return token
+        return self._refresh_blocking()
+
+    def invalidate(self, token: str = None):
+        """Drop the token (e.g. after a 401); no-op if it was already replaced"""
+        with self._lock:
+            if token is None or self._state[0] == token:
+                self._state = (None, 0.0, 0.0)
+
+    def _fetch(self) -> Optional[str]:
+        """Fetch and store a new token; caller holds self._lock"""
+        self._stats["fetches"] += 1
+        try:
+            result = self.fetch()
+        except Exception as e:
+            print(f"⚠️ [{self.name}] Token fetch error: {e}")
+            result = None
+        if not result:
+            self._stats["failures"] += 1
+            self._failed_until = time.monotonic() + self.retry_after
+            return None
+        token, expires_in = result
+        # Short-lived tokens refresh at half-life rather than constantly
+        ahead = min(self.refresh_margin, expires_in / 2)
+        now = time.monotonic()
+        self._state = (token, now + expires_in - ahead, now + expires_in)
+        self._failed_until = 0.0
+        self._used = False
+        self._schedule(expires_in - ahead)
+        return token
+
+    def _refresh_blocking(self) -> Optional[str]:
+        if time.monotonic() < self._failed_until:
+            return None
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            token, _, expiry = self._state
+            if token and time.monotonic() < expiry:
+                return token
+            if time.monotonic() < self._failed_until:
+                return None
+            return self._fetch()
+
+    def _refresh_in_background(self):
+        if self._refreshing or time.monotonic() < self._failed_until or not self._lock.acquire(blocking=False):
+            return
+        self._refreshing = True
+
+        def run():
+            try:
+                token, refresh_at, _ = self._state
+                now = time.monotonic()
+                # Re-check under the lock: a failure may have started a backoff meanwhile
+                if now >= self._failed_until and (not token or now >= refresh_at):
+                    self._stats["background_refreshes"] += 1
+                    self._fetch()
+            finally:
+                self._refreshing = False
+                self._lock.release()
+
+        threading.Thread(target=run, name=f"{self.name}-token-refresh", daemon=True).start()
+
+    def _schedule(self, delay: float):
+        """Refresh ahead of expiry even if nobody calls get() in the window"""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(max(1.0, delay), self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        # Idle since the last fetch: let the token lapse; the next get() fetches a new one
+        if self._used:
+            self._refresh_in_background()
+
+    def get_stats(self) -> Dict[str, int]:
+        token, _, expiry = self._state
+        return {**self._stats, "valid_for_seconds": max(0, int(expiry - time.monotonic())) if token else 0}
@@ -0,0 +1,162 @@
+# utils/trip_optimizer.py
+"""
+Trip Combination Optimizer
+Picks the outbound flight x return flight x hotel combination that fits the
+user's budget, using Pareto pruning so hundreds of options per leg stay cheap.
+"""
+
+from typing import Any, List, NamedTuple, Optional, Sequence
+
+
+class TripCombination(NamedTuple):
+    outbound: Any
+    return_flight: Optional[Any]
+    hotel: Optional[Any]
+    flight_cost: float
+    hotel_cost: float
+    total_cost: float
+    duration_hours: float
+    stops: int
+    rating: float
+
+
+def _field(option: Any, name: str, default=0):
+    """Read a field from a pydantic model or a plain dict"""
+    if option is None:
+        return default
+    if isinstance(option, dict):
+        value = option.get(name, default)
+    else:
+        value = getattr(option, name, default)
+    return default if value is None else value
+
+
+def pareto_flights(flights: Sequence[Any]) -> List[Any]:
+    """
+    Drop flights dominated on (price, duration, stops).
+
+    A dominated flight can never be part of a Pareto-optimal combination,
+    so pruning each leg first keeps the cross product small. O(n log n).
+    """
+    ordered = sorted(
+        flights,
+        key=lambda f: (_field(f, "price_usd"), _field(f, "duration_hours"), _field(f, "stops"))
+    )
+    kept = []
+    best_duration_by_stops = {}  # stops -> shortest duration among cheaper kept flights
+    for flight in ordered:
+        duration, stops = _field(flight, "duration_hours"), _field(flight, "stops")
+        dominated = any(
+            s <= stops and d <= duration
+            for s, d in best_duration_by_stops.items()
+        )
+        if dominated:
+            continue
+        kept.append(flight)
+        if duration < best_duration_by_stops.get(stops, float("inf")):
+            best_duration_by_stops[stops] = duration
+    return kept
+
+
+def pareto_hotels(hotels: Sequence[Any]) -> List[Any]:
+    """Drop hotels that are both pricier and no better rated than another"""
+    ordered = sorted(hotels, key=lambda h: (_field(h, "price_per_night_usd"), -_field(h, "rating", 0.0)))
+    kept, best_rating = [], float("-inf")
+    for hotel in ordered:
+        rating = _field(hotel, "rating", 0.0)
+        if rating > best_rating:
+            kept.append(hotel)
+            best_rating = rating
+    return kept
+
+
+def _dominates(a: TripCombination, b: TripCombination) -> bool:
+    return (
+        a.total_cost <= b.total_cost and a.duration_hours <= b.duration_hours
+        and a.stops <= b.stops and a.rating >= b.rating
+        and (a.total_cost < b.total_cost or a.duration_hours < b.duration_hours
+             or a.stops < b.stops or a.rating > b.rating)
+    )
+
+
+def pareto_combinations(
+    outbound_flights: Sequence[Any],
+    return_flights: Sequence[Any],
+    hotels: Sequence[Any],
+    nights: int
+) -> List[TripCombination]:
+    """
+    Pareto frontier of total cost vs total duration, stops and hotel rating.
+
+    Options without a price (e.g. Google fallback links) are ignored, except
+    return flights included in a round-trip fare: an outbound option with a
+    fare_id is priced for both legs and is combined only with the return
+    flight(s) of the same fare_id. The frontier is returned sorted by total cost.
+    """
+    priced = [f for f in outbound_flights if _field(f, "price_usd") > 0]
+    # Round-trip fares aren't pruned per leg: their return leg decides as much as the outbound
+    outbound = pareto_flights([f for f in priced if not _field(f, "fare_id", None)]) + \
+        [f for f in priced if _field(f, "fare_id", None)]
+    separate = pareto_flights([
+        f for f in return_flights if _field(f, "price_usd") > 0 and not _field(f, "fare_id", None)
+    ]) or [None]
+    included = {}
+    for flight in return_flights:
+        if _field(flight, "fare_id", None):
+            included.setdefault(_field(flight, "fare_id", None), []).append(flight)
+    stays = pareto_hotels([h for h in hotels if _field(h, "price_per_night_usd") > 0]) or [None]
+    if not outbound:
+        return []
+
+    combos = []
+    for out in outbound:
+        fare_id = _field(out, "fare_id", None)
+        returns = (included.get(fare_id) or [None]) if fare_id else separate
+        for ret in returns:
+            flight_cost = _field(out, "price_usd") + _field(ret, "price_usd")
+            duration = _field(out, "duration_hours") + _field(ret, "duration_hours")
+            stops = _field(out, "stops") + _field(ret, "stops")
+            for hotel in stays:
+                hotel_cost = _field(hotel, "price_per_night_usd") * nights
+                combos.append(TripCombination(
+                    outbound=out, return_flight=ret, hotel=hotel,
+                    flight_cost=flight_cost, hotel_cost=hotel_cost,
+                    total_cost=flight_cost + hotel_cost,
+                    duration_hours=duration, stops=stops,
+                    rating=_field(hotel, "rating", 0.0)
+                ))
+
+    # Skyline sweep: a combination can only be dominated by a cheaper-or-equal one
+    combos.sort(key=lambda c: (c.total_cost, c.duration_hours, c.stops, -c.rating))
+    frontier: List[TripCombination] = []
+    for combo in combos:
+        if not any(_dominates(kept, combo) for kept in frontier):
+            frontier.append(combo)
+    return frontier
+
+
+def best_combination(
+    outbound_flights: Sequence[Any],
+    return_flights: Sequence[Any],
+    hotels: Sequence[Any],
+    nights: int,
+    budget_usd: Optional[float] = None,
+    reserve_usd: float = 0
+) -> Optional[TripCombination]:
+    """
+    Best affordable combination on the Pareto frontier.
+
+    reserve_usd is held back from the budget for daily expenses. Within
+    budget: highest hotel rating, then fewest stops, then shortest total
+    duration, then lowest cost. If nothing fits (or no budget is given)
+    the cheapest combination is returned.
+    """
+    frontier = pareto_combinations(outbound_flights, return_flights, hotels, nights)
+    if not frontier:
+        return None
+
+    limit = (budget_usd or 0) - reserve_usd
+    affordable = [c for c in frontier if budget_usd and c.total_cost <= limit]
+    if not affordable:
+        return frontier[0]
+    return min(affordable, key=lambda c: (-c.rating, c.stops, c.duration_hours, c.total_cost))
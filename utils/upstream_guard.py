@@ -0,0 +1,263 @@
+# utils/upstream_guard.py
+"""
+Upstream Guard
+Per-upstream quota tracking and circuit breaking for the shared HTTP
+clients. Remaining quota is read from rate-limit response headers and
+requests are spaced out as it runs low; repeated failures or timeouts open
+a breaker so callers fail fast to their fallbacks (Google Flights/Hotels
+links, cached or canned answers) instead of waiting on a sick API.
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import requests
+
+# Upstream name -> hosts (a host also matches its subdomains)
+UPSTREAM_HOSTS: Dict[str, Tuple[str, ...]] = {
+    "amadeus": ("api.amadeus.com",),
+    "rapidapi": ("p.rapidapi.com",),
+    "serper": ("google.serper.dev",),
+    "openweather": ("api.openweathermap.org",),
+    "wikipedia": ("en.wikipedia.org",),
+}
+
+# Header spellings used by the providers above (looked up case-insensitively)
+REMAINING_HEADERS = ("X-RateLimit-Requests-Remaining", "X-RateLimit-Remaining", "RateLimit-Remaining")
+LIMIT_HEADERS = ("X-RateLimit-Requests-Limit", "X-RateLimit-Limit", "RateLimit-Limit")
+RESET_HEADERS = ("X-RateLimit-Requests-Reset", "X-RateLimit-Reset", "RateLimit-Reset", "Retry-After")
+
+FAILURE_STATUSES = {429, 500, 502, 503, 504}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of sending a request to an upstream whose breaker is open"""
+
+
+def _header(headers, names) -> Optional[float]:
+    for name in names:
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value)
+        except ValueError:
+            continue
+    return None
+
+
+class QuotaTracker:
+    """
+    Remaining quota as last reported by the upstream.
+
+    Above low_water (fraction of the limit) requests go out unthrottled.
+    Below it, the remaining requests are spread evenly over the time left
+    until the quota resets; with nothing left, callers wait for the reset
+    or, if that is further than max_wait away, are told to give up. A 429
+    without any reset hint counts as exhausted for penalty_window seconds.
+    """
+
+    def __init__(self, low_water: float = 0.1, max_wait: float = 10.0, penalty_window: float = 5.0):
+        self.low_water = low_water
+        self.max_wait = max_wait
+        self.penalty_window = penalty_window
+        self.remaining: Optional[float] = None
+        self.limit: Optional[float] = None
+        self.reset_at: Optional[float] = None   # monotonic
+        self._lock = threading.Lock()
+
+    def observe(self, response):
+        headers = response.headers
+        remaining = _header(headers, REMAINING_HEADERS)
+        limit = _header(headers, LIMIT_HEADERS)
+        reset = _header(headers, RESET_HEADERS)
+        with self._lock:
+            if response.status_code == 429:
+                remaining = 0
+                if reset is None:
+                    reset = self.penalty_window
+            elif remaining is None and response.status_code < 400 and self.remaining is not None and self.remaining <= 0:
+                # Served without quota headers: the exhaustion we inferred from a 429 is over
+                self.remaining = self.reset_at = None
+            if remaining is not None:
+                self.remaining = remaining
+            if limit is not None:
+                self.limit = limit
+            if reset is not None:
+                # Either seconds until reset or a Unix timestamp
+                seconds = reset - time.time() if reset > 1e9 else reset
+                self.reset_at = time.monotonic() + max(0.0, seconds)
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before the next request; None when quota is exhausted for longer than max_wait"""
+        with self._lock:
+            if self.remaining is None:
+                return 0.0
+            now = time.monotonic()
+            until_reset = max(0.0, self.reset_at - now) if self.reset_at is not None else None
+            if until_reset == 0.0:
+                # Window has rolled over; forget the stale reading
+                self.remaining = self.reset_at = None
+                return 0.0
+            if self.remaining <= 0:
+                if until_reset is None:
+                    return min(1.0, self.max_wait)
+                return until_reset if until_reset <= self.max_wait else None
+            if self.limit and self.remaining / self.limit >= self.low_water:
+                return 0.0
+            if until_reset is None:
+                return 0.0
+            # Optimistically count this request so concurrent callers spread out
+            self.remaining -= 1
+            return min(self.max_wait, until_reset / (self.remaining + 1))
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            reset_in = max(0, int(self.reset_at - time.monotonic())) if self.reset_at is not None else None
+            return {"remaining": self.remaining, "limit": self.limit, "reset_in_seconds": reset_in}
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker.
+
+    closed: requests flow; failure_threshold consecutive failures open it.
+    open: requests are rejected until reset_timeout has passed.
+    half_open: a single probe is let through; success closes the breaker,
+    failure reopens it for another reset_timeout.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._stats = {"opened": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def release(self):
+        """Free the half-open probe of a request that ended without a verdict"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self._stats["opened"] += 1
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            retry_in = max(0, int(self.reset_timeout - (time.monotonic() - self._opened_at))) \
+                if self.state == OPEN else 0
+            return {"state": self.state, "consecutive_failures": self.failures,
+                    "retry_in_seconds": retry_in, **self._stats}
+
+
+class Upstream:
+    """Quota tracker and breaker for one provider"""
+
+    def __init__(self, name: str, hosts: Tuple[str, ...]):
+        self.name = name
+        self.hosts = hosts
+        self.quota = QuotaTracker()
+        self.breaker = CircuitBreaker()
+
+    @property
+    def available(self) -> bool:
+        """Cheap pre-check for callers with a fallback; doesn't consume the half-open probe"""
+        return self.breaker.state != OPEN or \
+            time.monotonic() - self.breaker._opened_at >= self.breaker.reset_timeout
+
+    def before_request(self, retry: bool = False) -> float:
+        """
+        Seconds to wait before sending; raises CircuitOpenError to fail fast.
+
+        Retries within one call skip the breaker: the call already holds its
+        permission (and, when half-open, the probe) and gets one verdict.
+        """
+        if not retry and not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name} circuit open")
+        delay = self.quota.delay()
+        if delay is None:
+            self.breaker.record_failure()
+            raise CircuitOpenError(f"{self.name} quota exhausted")
+        return delay
+
+    def observe(self, response):
+        """Quota headers of an attempt that will be retried (no breaker verdict yet)"""
+        self.quota.observe(response)
+
+    def release(self):
+        self.breaker.release()
+
+    def record(self, response=None, error: Exception = None):
+        """Final outcome of one call, however many attempts it took"""
+        if response is not None:
+            self.quota.observe(response)
+        if error is not None or (response is not None and response.status_code in FAILURE_STATUSES):
+            self.breaker.record_failure()
+            if self.breaker.state == OPEN:
+                print(f"⚠️ [Upstream] {self.name} circuit open after {self.breaker.failures} failures")
+        else:
+            self.breaker.record_success()
+
+    def get_stats(self) -> Dict:
+        return {**self.breaker.get_stats(), "quota": self.quota.get_stats()}
+
+
+class UpstreamRegistry:
+    def __init__(self, hosts: Dict[str, Tuple[str, ...]] = UPSTREAM_HOSTS):
+        self.upstreams = {name: Upstream(name, h) for name, h in hosts.items()}
+        self._by_host: Dict[str, Optional[Upstream]] = {}
+
+    def __getitem__(self, name: str) -> Upstream:
+        return self.upstreams[name]
+
+    def for_host(self, host: str) -> Optional[Upstream]:
+        if host not in self._by_host:
+            self._by_host[host] = next(
+                (u for u in self.upstreams.values()
+                 if any(host == h or host.endswith("." + h) for h in u.hosts)),
+                None
+            )
+        return self._by_host[host]
+
+    def available(self, name: str) -> bool:
+        return self.upstreams[name].available
+
+    def get_stats(self) -> Dict[str, Dict]:
+        return {name: u.get_stats() for name, u in self.upstreams.items()}
+
+
+# Global registry consulted by the pooled HTTP client (utils/http_client.py) and the tools
+upstreams = UpstreamRegistry()